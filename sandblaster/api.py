@@ -0,0 +1,152 @@
+import os
+from contextlib import ExitStack
+from typing import (
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
+
+from sandblaster.export.records import OperationRecord, RuleRecord, operation_record
+from sandblaster.loader import LoadedProfile, open_profile, read_sandbox_operations
+from sandblaster.parsers.analysis.budget import Budget
+from sandblaster.parsers.analysis.z3_lock import Z3_LOCK
+
+Operations = Union[str, os.PathLike, Sequence[str]]
+
+__all__ = ["OperationRecord", "Profile", "RuleRecord"]
+
+
+class Profile:
+    def __init__(
+        self,
+        loaded: LoadedProfile,
+        stack: Optional[ExitStack] = None,
+        parsed: Optional[MutableMapping] = None,
+        timeout_ms: int = 600,
+        operation_budget: Optional[float] = None,
+    ):
+        self.loaded = loaded
+        self._stack = stack if stack is not None else ExitStack()
+        self._parsed = parsed if parsed is not None else {}
+        self.timeout_ms = timeout_ms
+        self.operation_budget = operation_budget
+        self._policies = None
+
+    @classmethod
+    def open(
+        cls,
+        path: Union[str, os.PathLike],
+        operations: Operations,
+        operation_filter: Optional[Sequence[str]] = None,
+        use_snapshot: bool = True,
+        cache_size: Optional[int] = None,
+        timeout_ms: int = 600,
+        operation_budget: Optional[float] = None,
+    ) -> "Profile":
+        if isinstance(operations, (str, os.PathLike)):
+            operations = read_sandbox_operations(operations)
+        with ExitStack() as stack:
+            loaded = stack.enter_context(
+                open_profile(
+                    os.fspath(path), list(operations), operation_filter, use_snapshot
+                )
+            )
+            parsed: MutableMapping = {}
+            if cache_size is not None:
+                from sandblaster.memory import SpillingCache
+
+                parsed = SpillingCache(cache_size)
+                stack.callback(parsed.close)
+            return cls(loaded, stack.pop_all(), parsed, timeout_ms, operation_budget)
+
+    def __enter__(self) -> "Profile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stack.close()
+
+    @property
+    def operations(self) -> List[str]:
+        payload = self.loaded.payload
+        return [payload.sb_ops[idx] for idx in payload.ops_to_reverse]
+
+    def decompile(
+        self, operation: str, budget: Optional[Budget] = None
+    ) -> OperationRecord:
+        from sandblaster.parsers.analysis.bool_expressions import (
+            decompile_operations,
+        )
+
+        if operation not in self.operations:
+            raise KeyError(operation)
+        if budget is None:
+            budget = Budget(step_ms=self.timeout_ms)
+        loaded = self.loaded
+        with Z3_LOCK:
+            for name, rules in decompile_operations(
+                loaded.payload,
+                loaded.filter_resolver,
+                loaded.modifier_resolver,
+                loaded.terminal_resolver,
+                self._parsed,
+                budget=budget,
+                operation_budget=self.operation_budget,
+                operation_filter=(operation,),
+            ):
+                return operation_record(name, rules, self._parsed)
+        # The operation has no decision graph in this profile.
+        return OperationRecord(operation, [], {})
+
+    def policy(self, index: int) -> OperationRecord:
+        from sandblaster.parsers.analysis.bool_expressions import policy_table
+        from sandblaster.parsers.analysis.policies import policy_name
+
+        loaded = self.loaded
+        if not 0 <= index < len(loaded.payload.policies):
+            raise KeyError(index)
+        with Z3_LOCK:
+            if self._policies is None:
+                self._policies = policy_table(
+                    loaded.payload,
+                    loaded.filter_resolver,
+                    loaded.modifier_resolver,
+                    loaded.terminal_resolver,
+                    self._parsed,
+                    Budget(step_ms=self.timeout_ms),
+                    self.operation_budget,
+                )
+            rules = self._policies.rules(index)
+            return operation_record(policy_name(index), rules, self._parsed)
+
+    def iter_operations(
+        self, operations: Optional[Iterable[str]] = None
+    ) -> Iterator[OperationRecord]:
+        # Like an export, every referenced policy is yielded once as a
+        # policy-<n> record ahead of the first operation that uses it.
+        emitted: Set[int] = set()
+        for operation in self.operations if operations is None else operations:
+            record = self.decompile(operation)
+            yield from self._pending_policies(record, emitted)
+            yield record
+
+    def _pending_policies(
+        self, record: OperationRecord, emitted: Set[int]
+    ) -> Iterator[OperationRecord]:
+        for rule in record.rules:
+            index = (rule.decision["inline"] or {}).get("policy")
+            if index is None or index in emitted:
+                continue
+            if not 0 <= index < len(self.loaded.payload.policies):
+                continue
+            emitted.add(index)
+            policy = self.policy(index)
+            yield from self._pending_policies(policy, emitted)
+            yield policy
@@ -0,0 +1,77 @@
+import argparse
+import sys
+
+from sandblaster.benchmarks.cases import CASES
+from sandblaster.benchmarks.runner import (
+    append_history,
+    compare_records,
+    load_history,
+    make_record,
+    run_cases,
+)
+
+DEFAULT_HISTORY = "benchmarks.json"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sandblaster.benchmarks",
+        description="Time every decompilation stage on synthetic inputs",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run")
+    run.add_argument("--history", default=DEFAULT_HISTORY)
+    run.add_argument("--case", nargs="+", choices=sorted(CASES))
+    run.add_argument("--sizes", nargs="+", type=int)
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--label")
+
+    compare = sub.add_parser("compare")
+    compare.add_argument("--history", default=DEFAULT_HISTORY)
+    compare.add_argument("--baseline", type=int, default=-2)
+    compare.add_argument("--current", type=int, default=-1)
+    compare.add_argument("--threshold", type=float, default=0.10)
+    return parser.parse_args(argv)
+
+
+def run(args) -> int:
+    def progress(key, seconds):
+        print(f"{key:<32} {seconds * 1000:10.3f} ms")
+
+    results = run_cases(args.case, args.sizes, args.repeat, progress)
+    append_history(args.history, make_record(results, args.label))
+    return 0
+
+
+def compare(args) -> int:
+    history = load_history(args.history)
+    if len(history) < 2:
+        print(f"{args.history}: need at least two runs to compare")
+        return 1
+    rows = compare_records(
+        history[args.baseline], history[args.current], args.threshold
+    )
+    regressions = 0
+    for row in rows:
+        mark = "SLOWER" if row["regression"] else ""
+        regressions += row["regression"]
+        print(
+            f"{row['case']:<32} {row['baseline'] * 1000:10.3f} ms "
+            f"{row['current'] * 1000:10.3f} ms {row['ratio']:6.2f}x {mark}"
+        )
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    match args.command:
+        case "run":
+            return run(args)
+        case "compare":
+            return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
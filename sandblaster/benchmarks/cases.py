@@ -0,0 +1,171 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Sequence
+
+from sandblaster.parsers.analysis.expression import build_ite_expr, ite_expr_to_nnf
+from sandblaster.parsers.analysis.ir import And, Atom, Not, Or, atom_id
+from sandblaster.parsers.analysis.partition import backward_partition
+from sandblaster.parsers.analysis.spbl_printer import print_sbpl
+from sandblaster.parsers.fsa_parser.processor import parse_fsm_string
+from sandblaster.parsers.graph.graph import NodeGraph
+from sandblaster.parsers.graph.graph_parser import GraphParser
+from sandblaster.parsers.graph.node import NodeParser
+from sandblaster.parsers.graph.reduction import reduce_graph
+from sandblaster.parsers.regex_parser.processor import analyze
+from sandblaster.parsers.specialized.globals_parser import GlobalVarsParser
+from sandblaster.query import PolicyEvaluator
+from sandblaster.scan import scan_payload
+from sandblaster.synthetic.encoder import encode_fsa, encode_regex
+from sandblaster.synthetic.generator import generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+
+@dataclass
+class Case:
+    name: str
+    sizes: Sequence[int]
+    setup: Callable[[int], Callable[[], object]]
+
+
+def synthetic_graph(nodes: int, **kwargs) -> NodeGraph:
+    profile = generate_profile(nodes=nodes, operations=1, **kwargs)
+    return read_profile(profile.encoded, profile.operations).payload.operation_nodes
+
+
+def fsa_alternatives(count: int) -> bytes:
+    return encode_fsa([[f"/p{i:04d}"] for i in range(count)])
+
+
+def regex_literal(length: int) -> bytes:
+    return encode_regex(["^"] + [chr(ord("a") + i % 26) for i in range(length)])
+
+
+def _quiet(func: Callable[[], object]) -> Callable[[], object]:
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+
+    return run
+
+
+def _setup_node_decoding(size: int):
+    profile = generate_profile(nodes=size, operations=1)
+    start = profile.encoded.layout.operation_nodes_offset
+    count = profile.encoded.header["op_nodes_count"]
+    data = profile.data[start : start + count * NodeParser.NODE_SIZE]
+    return lambda: NodeParser().parse(io.BytesIO(data), count)
+
+
+def _setup_table_decoding(size: int):
+    offsets, records = [], bytearray()
+    for i in range(size):
+        name = f"/var/{i:05d}".encode() + b"\0"
+        offsets.append(len(records) // 8)
+        records += len(name).to_bytes(2, "little") + name
+        records += bytes(-len(records) % 8)
+    table = b"".join(offset.to_bytes(2, "little") for offset in offsets)
+    base_addr = len(table) + -len(table) % 8
+    infile = io.BytesIO(table.ljust(base_addr, b"\0") + records)
+    return lambda: GlobalVarsParser.parse(infile, base_addr, size, 0)
+
+
+def _setup_graph_building(size: int):
+    graph = synthetic_graph(size)
+    return lambda: GraphParser(graph.nodes[0]).parse()
+
+
+def _setup_graph_reduction(size: int):
+    graph = synthetic_graph(size)
+    return lambda: reduce_graph(graph.nodes[0])
+
+
+def _setup_backward_partition(size: int):
+    nodes = synthetic_graph(size, sinks=8)
+    graph = GraphParser(nodes.nodes[0]).parse()
+    payload = SimpleNamespace(operation_nodes=nodes)
+    return _quiet(lambda: backward_partition(graph, payload))
+
+
+def _setup_ite_expr(size: int):
+    nodes = synthetic_graph(size, shape="ladder", atoms=size)
+    graph = GraphParser(nodes.nodes[0]).parse()
+    return lambda: ite_expr_to_nnf(build_ite_expr(graph, 0))
+
+
+def _setup_policy_query(size: int):
+    synthetic = generate_profile(nodes=size, operations=1, seed=2)
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    evaluator = PolicyEvaluator(profile.payload, profile.filter_resolver)
+    requests = [{"path": f"/gen/0/{i}"} for i in range(100)]
+    evaluator.evaluate(synthetic.operations[0], {})
+
+    def run():
+        for attributes in requests:
+            evaluator.evaluate(synthetic.operations[0], attributes)
+
+    return run
+
+
+def _setup_profile_scan(size: int):
+    synthetic = generate_profile(nodes=size, operations=50, seed=3)
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    filters = profile.filter_resolver.filters
+    return lambda: scan_payload(profile.payload, filters)
+
+
+def _setup_fsm_string(size: int):
+    data = fsa_alternatives(size)
+    return lambda: parse_fsm_string(data, [])
+
+
+def _setup_regex(size: int):
+    data = regex_literal(size)
+    return lambda: analyze(data)
+
+
+def _setup_sbpl_printing(size: int):
+    atoms = [Atom(atom_id(1, i)) for i in range(size)]
+    expr = Or(*[And(atoms[i], Not(atoms[(i + 1) % size])) for i in range(size)])
+    mapping = {
+        atom.id: SimpleNamespace(filter="literal", argument=[f"/p{i}"])
+        for i, atom in enumerate(atoms)
+    }
+    lines: List[str] = []
+    return lambda: print_sbpl(expr, mapping, 1, lines.append)
+
+
+def _setup_cli_startup(size: int):
+    # Cold interpreter importing the CLI entry point, `size` times in a row.
+    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    env = {**os.environ, "PYTHONPATH": root}
+    command = [sys.executable, "-c", "import sandblaster.cli.main"]
+
+    def run():
+        for _ in range(size):
+            subprocess.run(command, env=env, check=True)
+
+    return run
+
+
+CASES: Dict[str, Case] = {
+    case.name: case
+    for case in [
+        Case("node_decoding", (1_000, 10_000, 50_000), _setup_node_decoding),
+        Case("table_decoding", (100, 1_000, 5_000), _setup_table_decoding),
+        Case("graph_building", (100, 1_000, 5_000), _setup_graph_building),
+        Case("graph_reduction", (100, 1_000, 5_000), _setup_graph_reduction),
+        Case("backward_partition", (50, 200, 500), _setup_backward_partition),
+        Case("ite_expr", (8, 32, 64), _setup_ite_expr),
+        Case("policy_query", (100, 1_000, 5_000), _setup_policy_query),
+        Case("profile_scan", (1_000, 10_000, 50_000), _setup_profile_scan),
+        Case("parse_fsm_string", (8, 64, 256), _setup_fsm_string),
+        Case("regex_analyze", (8, 32, 64), _setup_regex),
+        Case("sbpl_printing", (16, 128, 512), _setup_sbpl_printing),
+        Case("cli_startup", (1, 5), _setup_cli_startup),
+    ]
+}
@@ -0,0 +1,95 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sandblaster.benchmarks.cases import CASES
+from sandblaster.fileio import atomic_open
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def time_call(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_cases(
+    names: Optional[Iterable[str]] = None,
+    sizes: Optional[List[int]] = None,
+    repeat: int = 3,
+    progress=None,
+) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    for name in names or CASES:
+        case = CASES[name]
+        for size in sizes or case.sizes:
+            func = case.setup(size)
+            key = f"{name}[{size}]"
+            results[key] = time_call(func, repeat)
+            if progress:
+                progress(key, results[key])
+    return results
+
+
+def make_record(results: Dict[str, float], label: Optional[str] = None) -> dict:
+    return {
+        "label": label,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def load_history(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def append_history(path: str, record: dict) -> None:
+    history = load_history(path)
+    history.append(record)
+    with atomic_open(path) as f:
+        json.dump(history, f, indent=2)
+
+
+def compare_records(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    rows = []
+    for key, new in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        ratio = new / old if old else float("inf")
+        rows.append(
+            {
+                "case": key,
+                "baseline": old,
+                "current": new,
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return rows
@@ -0,0 +1,136 @@
+import json
+import logging
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sandblaster.fileio import write_atomic
+from sandblaster.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+DONE, FAILED, RUNNING = "done", "failed", "running"
+
+
+class Checkpoint:
+    def __init__(
+        self,
+        directory: str,
+        blob: str,
+        decoder_version: int,
+        settings: Dict[str, Any],
+        resume: bool = False,
+        retry_failed: bool = False,
+    ):
+        self.directory = Path(directory)
+        (self.directory / "operations").mkdir(parents=True, exist_ok=True)
+        self.settings = settings
+        self.retry_failed = retry_failed
+
+        operations: Dict[str, dict] = {}
+        previous = self._read_manifest()
+        if previous is not None and (resume or retry_failed):
+            if (previous["blob"], previous["decoder_version"]) != (
+                blob,
+                decoder_version,
+            ):
+                raise ValueError(
+                    f"{self.directory} holds a run of another profile blob or "
+                    "decoder version"
+                )
+            operations = previous["operations"]
+            for entry in operations.values():
+                # The process died while this operation was running.
+                if entry["status"] == RUNNING:
+                    entry.update(status=FAILED, error="interrupted")
+        self.manifest = {
+            "blob": blob,
+            "decoder_version": decoder_version,
+            "operations": operations,
+        }
+        self._save()
+
+    @property
+    def operations(self) -> Dict[str, dict]:
+        return self.manifest["operations"]
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self.directory / MANIFEST, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _save(self) -> None:
+        write_atomic(self.directory / MANIFEST, json.dumps(self.manifest, indent=2))
+
+    def status(self, operation: str) -> Optional[str]:
+        entry = self.operations.get(operation)
+        return entry["status"] if entry else None
+
+    def should_run(self, operation: str) -> bool:
+        status = self.status(operation)
+        return status is None or (status == FAILED and self.retry_failed)
+
+    def output(self, operation: str) -> Optional[str]:
+        entry = self.operations.get(operation)
+        if entry is None or entry["status"] != DONE:
+            return None
+        return (self.directory / entry["file"]).read_text(encoding="utf-8")
+
+    def _file_for(self, operation: str) -> str:
+        entry = self.operations.get(operation)
+        if entry is not None and "file" in entry:
+            return entry["file"]
+        name = re.sub(r"[^\w.-]", "_", operation)
+        return f"operations/{len(self.operations):04d}-{name}.sbpl"
+
+    @contextmanager
+    def operation(self, operation: str) -> Iterator[List[str]]:
+        file = self._file_for(operation)
+        previous = self.operations.get(operation)
+        attempts = (previous or {}).get("attempts", 0) + 1
+        entry = {
+            "status": RUNNING,
+            "file": file,
+            "attempts": attempts,
+            "settings": self.settings,
+        }
+        self.operations[operation] = entry
+        self._save()
+
+        lines: List[str] = []
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield lines
+        except Exception as e:
+            logger.exception(f"Operation {operation} failed")
+            entry.update(status=FAILED, error=f"{type(e).__name__}: {e}")
+        except BaseException:
+            # Interrupted by the user: leave the operation as it was, pending
+            # or failed from an earlier attempt.
+            if previous is None:
+                del self.operations[operation]
+            else:
+                self.operations[operation] = previous
+            self._save()
+            raise
+        else:
+            text = "".join(f"{line}\n" for line in lines)
+            write_atomic(self.directory / file, text)
+            entry["status"] = DONE
+            entry.pop("error", None)
+        entry["wall"] = time.perf_counter() - wall
+        entry["cpu"] = time.process_time() - cpu
+        if operation in metrics.operations:
+            entry["metrics"] = metrics.operations[operation]
+        self._save()
+
+    def summary(self) -> Dict[str, int]:
+        counts = {DONE: 0, FAILED: 0}
+        for entry in self.operations.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
@@ -0,0 +1,55 @@
+import argparse
+from typing import List, Optional
+
+from sandblaster.loader import open_profile, read_sandbox_operations
+from sandblaster.parsers.analysis.equivalence import diff_profiles, format_condition
+
+STATUS_MARKS = {
+    "equal": "=",
+    "different": "~",
+    "unknown": "?",
+    "only-a": "<",
+    "only-b": ">",
+}
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="sandblaster diff",
+        description="Semantic diff of the operations of two sandbox profiles",
+    )
+    parser.add_argument("profile_a")
+    parser.add_argument("profile_b")
+    parser.add_argument("--operations", required=True)
+    parser.add_argument("--operations-b")
+    parser.add_argument("--filter", nargs="+")
+    parser.add_argument("--timeout-ms", type=int, default=2000)
+    parser.add_argument("--budget", type=float, default=None)
+    parser.add_argument("--show-equal", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    ops_a = read_sandbox_operations(args.operations)
+    ops_b = read_sandbox_operations(args.operations_b or args.operations)
+
+    with open_profile(args.profile_a, ops_a, args.filter) as profile_a, open_profile(
+        args.profile_b, ops_b, args.filter
+    ) as profile_b:
+        results = diff_profiles(profile_a, profile_b, args.timeout_ms, args.budget)
+
+    counts = {status: 0 for status in STATUS_MARKS}
+    for result in results:
+        counts[result.status] += 1
+        if result.status == "equal" and not args.show_equal:
+            continue
+        method = f" [{result.method}]" if result.method else ""
+        print(f"{STATUS_MARKS[result.status]} {result.operation}{method}")
+        if result.status == "different":
+            print(f"  when {format_condition(result.condition)}")
+            print(f"  a: {result.decisions[0]}")
+            print(f"  b: {result.decisions[1]}")
+
+    print(", ".join(f"{status}: {count}" for status, count in counts.items()))
+    return 1 if counts["different"] or counts["only-a"] or counts["only-b"] else 0
@@ -0,0 +1,64 @@
+import argparse
+import hashlib
+import os
+from typing import List, Optional
+
+from sandblaster.index import ProfileIndex
+from sandblaster.loader import open_profile, read_sandbox_operations
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="sandblaster index",
+        description="Reverse index from filter arguments to operations and nodes",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="index one or more profiles")
+    add.add_argument("database")
+    add.add_argument("profiles", nargs="+")
+    add.add_argument("--operations", required=True)
+    add.add_argument("--build", help="kernel build the profiles come from")
+
+    find = commands.add_parser("find", help="look up a filter argument")
+    find.add_argument("database")
+    find.add_argument("value")
+    find.add_argument("--prefix", action="store_true")
+    find.add_argument("--filter", dest="filter_name")
+    return parser.parse_args(argv)
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def add(args) -> int:
+    sandbox_operations = read_sandbox_operations(args.operations)
+    with ProfileIndex(args.database) as index:
+        for path in args.profiles:
+            digest = _digest(path)
+            if index.contains(digest):
+                print(f"skipped {path} (already indexed)")
+                continue
+            with open_profile(path, sandbox_operations) as profile:
+                index.add(profile, os.path.basename(path), digest, args.build)
+            print(f"indexed {path}")
+    return 0
+
+
+def find(args) -> int:
+    found = False
+    with ProfileIndex(args.database) as index:
+        for hit in index.find(args.value, args.prefix, args.filter_name):
+            found = True
+            build = f" ({hit.build})" if hit.build else ""
+            print(f"{hit.profile}{build}: ({hit.filter} {hit.value!r})")
+            print(f"  operations: {' '.join(hit.operations) or '-'}")
+            print(f"  nodes: {' '.join(map(str, hit.nodes))}")
+    return 0 if found else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    return add(args) if args.command == "add" else find(args)
@@ -1,23 +1,11 @@
 import argparse
-import mmap
-from importlib.resources import files
+import sys
+from contextlib import ExitStack
 
-from sandblaster.configs.filters import Filters
-from sandblaster.filters.filter_resolver import FilterResolver
-from sandblaster.filters.modifier_resolver import ModifierResolver
-from sandblaster.filters.terminal_resolver import TerminalResolver
-from sandblaster.parsers.analysis.bool_expressions import process_profile
-from sandblaster.parsers.core.header import SandboxHeader
-from sandblaster.parsers.core.sandbox import SandboxParser
+from sandblaster.metrics import metrics
 
 
-def read_sandbox_operations(path: str) -> None:
-    with open(path, "r") as f:
-        ops = [line.strip() for line in f if line.strip()]
-    return ops
-
-
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Apple Sandbox Profiles Decompiler")
     parser.add_argument("filename")
     parser.add_argument(
@@ -26,43 +14,169 @@ def parse_args():
     )
     parser.add_argument("--filter", nargs="+")
     parser.add_argument("--output", required=True)
-    return parser.parse_args()
+    parser.add_argument("--metrics", metavar="FILE")
+    parser.add_argument("--profile-operation", metavar="OPERATION")
+    parser.add_argument("--profile", choices=["cprofile", "tracemalloc"])
+    parser.add_argument("--profile-output", metavar="FILE")
+    parser.add_argument("--dot", metavar="FILE")
+    parser.add_argument("--timeout-ms", type=int, default=600)
+    parser.add_argument("--operation-budget", type=float, metavar="SECONDS")
+    parser.add_argument("--run-budget", type=float, metavar="SECONDS")
+    parser.add_argument("--export", metavar="FILE")
+    parser.add_argument("--export-format", choices=["sbir", "jsonl"], default="sbir")
+    parser.add_argument("--no-snapshot", dest="snapshot", action="store_false")
+    parser.add_argument("--preview", action="store_true")
+    parser.add_argument("--max-memory", metavar="SIZE")
+    parser.add_argument("--checkpoint", metavar="DIR")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--retry-failed", action="store_true")
+    args = parser.parse_args(argv)
+    if (args.resume or args.retry_failed) and not args.checkpoint:
+        parser.error("--resume and --retry-failed require --checkpoint")
+    if args.max_memory is not None:
+        from sandblaster.memory import parse_size
 
+        try:
+            args.max_memory = parse_size(args.max_memory)
+        except ValueError as e:
+            parser.error(f"--max-memory: {e}")
+    return args
 
-def main() -> int:
-    args = parse_args()
 
-    filters = Filters(files("sandblaster.misc") / "filters.json")
-    modifiers = Filters(files("sandblaster.misc") / "modifiers.json")
-    sandbox_operations = read_sandbox_operations(args.operations)
-    with open(args.filename, "rb") as infile:
-        mm = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
-        sandbox_data = SandboxHeader(mm)
-        sandbox_parser = SandboxParser(infile=mm, base_addr=sandbox_data.base_addr)
-        sandbox_payload = sandbox_parser.parse(
-            sandbox_data, sandbox_operations, args.filter
-        )
-        sandbox_parser.create_operation_nodes(
-            sandbox_data.header.op_nodes_count,
-            sandbox_data.operation_nodes_offset,
-        )
-        filter_resolver = FilterResolver(
-            mm,
-            sandbox_data.base_addr,
-            sandbox_parser.payload.regex_list,
-            sandbox_parser.payload.global_vars,
-            filters,
+def open_checkpoint(args):
+    import hashlib
+
+    from sandblaster.checkpoint import Checkpoint
+    from sandblaster.snapshot import DECODER_VERSION
+
+    with open(args.filename, "rb") as f:
+        blob = hashlib.file_digest(f, "sha256").hexdigest()
+    settings = {
+        "timeout_ms": args.timeout_ms,
+        "operation_budget": args.operation_budget,
+        "run_budget": args.run_budget,
+    }
+    try:
+        return Checkpoint(
+            args.checkpoint,
+            blob,
+            DECODER_VERSION,
+            settings,
+            resume=args.resume,
+            retry_failed=args.retry_failed,
         )
-        modifier_resolver = ModifierResolver(
-            mm,
-            sandbox_data.base_addr,
-            sandbox_parser.payload.regex_list,
-            sandbox_parser.payload.global_vars,
-            modifiers,
+    except ValueError as e:
+        raise SystemExit(f"error: {e}")
+
+
+def decompile(argv=None) -> int:
+    args = parse_args(argv)
+    # Imported after argument parsing so --help and usage errors skip z3 and
+    # networkx.
+    from sandblaster.loader import open_profile, read_sandbox_operations
+    from sandblaster.parsers.analysis.bool_expressions import process_profile
+    from sandblaster.parsers.analysis.budget import Budget
+
+    if args.metrics or args.profile_operation:
+        metrics.enable()
+        metrics.profile_operation = args.profile_operation
+        metrics.profile_kind = args.profile or "cprofile"
+        metrics.profile_output = args.profile_output
+
+    checkpoint = open_checkpoint(args) if args.checkpoint else None
+    sandbox_operations = read_sandbox_operations(args.operations)
+    with ExitStack() as stack:
+        profile = stack.enter_context(
+            open_profile(args.filename, sandbox_operations, args.filter, args.snapshot)
         )
-        terminal_resolver = TerminalResolver(modifiers, sandbox_parser.flags)
+        exporter = None
+        if args.export:
+            from sandblaster.export import open_exporter
+
+            exporter = stack.enter_context(
+                open_exporter(args.export, args.export_format)
+            )
+        memory = None
+        if args.max_memory is not None:
+            from sandblaster.memory import MemoryWatchdog
+
+            memory = stack.enter_context(MemoryWatchdog(args.max_memory))
+        preview = None
+        if args.preview:
+            from sandblaster.parsers.analysis.preview import PreviewDocument
+
+            preview = stack.enter_context(PreviewDocument(args.output))
         process_profile(
-            sandbox_payload, filter_resolver, modifier_resolver, terminal_resolver
+            profile.payload,
+            profile.filter_resolver,
+            profile.modifier_resolver,
+            profile.terminal_resolver,
+            dot_path=args.dot,
+            budget=Budget(args.run_budget, step_ms=args.timeout_ms),
+            operation_budget=args.operation_budget,
+            exporter=exporter,
+            checkpoint=checkpoint,
+            memory=memory,
+            preview=preview,
         )
-        mm.close()
+
+    if checkpoint is not None:
+        summary = ", ".join(f"{n} {s}" for s, n in checkpoint.summary().items())
+        print(f"checkpoint {args.checkpoint}: {summary}", file=sys.stderr)
+
+    if args.metrics:
+        metrics.write(args.metrics)
     return 0
+
+
+def diff(argv=None) -> int:
+    from sandblaster.cli.diff import main as diff_main
+
+    return diff_main(argv)
+
+
+def query(argv=None) -> int:
+    from sandblaster.cli.query import main as query_main
+
+    return query_main(argv)
+
+
+def index(argv=None) -> int:
+    from sandblaster.cli.index import main as index_main
+
+    return index_main(argv)
+
+
+def render(argv=None) -> int:
+    from sandblaster.cli.render import main as render_main
+
+    return render_main(argv)
+
+
+def scan(argv=None) -> int:
+    from sandblaster.cli.scan import main as scan_main
+
+    return scan_main(argv)
+
+
+def serve(argv=None) -> int:
+    from sandblaster.cli.serve import main as serve_main
+
+    return serve_main(argv)
+
+
+COMMANDS = {
+    "diff": diff,
+    "index": index,
+    "query": query,
+    "render": render,
+    "scan": scan,
+    "serve": serve,
+}
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+    return decompile(argv)
@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+from sandblaster.loader import open_profile, read_sandbox_operations
+from sandblaster.query import PolicyEvaluator
+
+
+def _assignments(values: List[str]) -> Dict[str, str]:
+    result = {}
+    for value in values:
+        name, sep, text = value.partition("=")
+        if not sep:
+            raise SystemExit(f"sandblaster query: expected NAME=VALUE, got {value!r}")
+        result[name] = text
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="sandblaster query",
+        description="Evaluate access requests against a sandbox profile",
+    )
+    parser.add_argument("profile")
+    parser.add_argument("operation", nargs="?")
+    parser.add_argument("attributes", nargs="*", metavar="FILTER=VALUE")
+    parser.add_argument("--operations", required=True)
+    parser.add_argument("--var", nargs="+", default=[], metavar="NAME=VALUE")
+    parser.add_argument("--batch", metavar="FILE", help="JSON lines, '-' for stdin")
+    args = parser.parse_args(argv)
+    if not args.batch and not args.operation:
+        parser.error("an operation or --batch is required")
+    return args
+
+
+def _batch_requests(path: str):
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    with f:
+        for line in f:
+            if line.strip():
+                request = json.loads(line)
+                yield request["operation"], request.get("attributes", {})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sandbox_operations = read_sandbox_operations(args.operations)
+    with open_profile(args.profile, sandbox_operations) as profile:
+        evaluator = PolicyEvaluator(
+            profile.payload, profile.filter_resolver, _assignments(args.var)
+        )
+        if args.batch:
+            for operation, attributes in _batch_requests(args.batch):
+                try:
+                    record = asdict(evaluator.evaluate(operation, attributes))
+                except KeyError as e:
+                    record = {"operation": operation, "error": e.args[0]}
+                print(json.dumps(record))
+            return 0
+
+        decision = evaluator.evaluate(args.operation, _assignments(args.attributes))
+    path = " -> ".join(str(offset) for offset in decision.path)
+    print(f"{decision.action} {decision.operation} (terminal {decision.terminal})")
+    print(f"  path: {path}")
+    return 0 if decision.action == "allow" else 1
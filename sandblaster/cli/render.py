@@ -0,0 +1,33 @@
+import argparse
+from typing import List, Optional
+
+from sandblaster.loader import open_profile, read_sandbox_operations
+from sandblaster.render import read_records, render_records
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="sandblaster render",
+        description="Re-render an exported run with the current filter metadata",
+    )
+    parser.add_argument("export", help="sbir or jsonl file written by --export")
+    parser.add_argument("profile", help="the profile blob the export came from")
+    parser.add_argument("--operations", required=True)
+    parser.add_argument("--filters", metavar="JSON", help="filters.json to apply")
+    parser.add_argument("--modifiers", metavar="JSON", help="modifiers.json to apply")
+    parser.add_argument("--no-snapshot", dest="snapshot", action="store_false")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sandbox_operations = read_sandbox_operations(args.operations)
+    with open_profile(
+        args.profile,
+        sandbox_operations,
+        use_snapshot=args.snapshot,
+        filters_path=args.filters,
+        modifiers_path=args.modifiers,
+    ) as profile:
+        render_records(read_records(args.export), profile)
+    return 0
@@ -0,0 +1,63 @@
+import argparse
+import json
+import time
+from dataclasses import asdict
+from typing import List, Optional
+
+from sandblaster.loader import open_profile, read_sandbox_operations
+from sandblaster.scan import ProfileScan, scan_payload
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="sandblaster scan",
+        description="Quick statistics on sandbox profiles without decompiling",
+    )
+    parser.add_argument("profiles", nargs="+")
+    parser.add_argument("--operations", required=True)
+    parser.add_argument("--filter", nargs="+")
+    parser.add_argument("--json", action="store_true", help="one JSON line each")
+    return parser.parse_args(argv)
+
+
+def scan_record(path: str, scan: ProfileScan, seconds: float) -> dict:
+    record = {"profile": path, "seconds": round(seconds, 4), **asdict(scan)}
+    for op, row in zip(scan.operations, record["operations"]):
+        row["strategy"] = op.strategy
+    return record
+
+
+def print_scan(path: str, scan: ProfileScan, seconds: float) -> None:
+    print(
+        f"{path}: {scan.nodes} nodes, {scan.reachable} reachable, "
+        f"{scan.shared} shared, {scan.regexes} regexes, {scan.patterns} patterns, "
+        f"{scan.global_vars} global vars ({seconds * 1000:.0f} ms)"
+    )
+    width = max([len(op.operation) for op in scan.operations] + [9])
+    print(
+        f"  {'operation':<{width}} {'nodes':>7} {'sinks':>6} {'atoms':>6} {'paths':>12}"
+    )
+    for op in scan.operations:
+        print(
+            f"  {op.operation:<{width}} {op.nodes:>7} {op.sinks:>6} "
+            f"{op.atoms:>6} {op.paths:>12} {op.strategy}"
+        )
+    filters = ", ".join(f"{name} {count}" for name, count in scan.filters.items())
+    print(f"  filters: {filters or '-'}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sandbox_operations = read_sandbox_operations(args.operations)
+    for path in args.profiles:
+        start = time.perf_counter()
+        with open_profile(
+            path, sandbox_operations, args.filter, use_snapshot=False
+        ) as profile:
+            scan = scan_payload(profile.payload, profile.filter_resolver.filters)
+        seconds = time.perf_counter() - start
+        if args.json:
+            print(json.dumps(scan_record(path, scan, seconds)))
+        else:
+            print_scan(path, scan, seconds)
+    return 0
@@ -0,0 +1,28 @@
+import argparse
+import asyncio
+import logging
+from typing import List, Optional
+
+from sandblaster.server import DecompileServer
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="sandblaster serve",
+        description="Serve decompile, query and diff requests over a Unix socket",
+    )
+    parser.add_argument("socket")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cache-size", type=int, default=8, metavar="PROFILES")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    server = DecompileServer(args.socket, args.workers, args.cache_size)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
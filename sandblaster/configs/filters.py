@@ -1,15 +1,43 @@
+import hashlib
 import json
+import os
+import pickle
+from pathlib import Path
 from typing import Any, Dict, Optional
 
+from sandblaster.fileio import write_atomic
+
+TABLE_VERSION = 1
+
+
+def cache_dir() -> Path:
+    path = os.environ.get("SANDBLASTER_CACHE_DIR")
+    if path:
+        return Path(path)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "sandblaster"
+
 
 class Filters:
     def __init__(self, json_path: Optional[str] = None):
         self._filters: Dict[int, Any] = self._load_filters(json_path)
 
-    def _load_filters(self, path: str) -> Dict[int, Any]:
-        with open(path, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-        return {int(k): v for k, v in raw.items()}
+    def _load_filters(self, path) -> Dict[int, Any]:
+        data = (Path(path) if isinstance(path, str) else path).read_bytes()
+        digest = self.digest = hashlib.sha256(data).hexdigest()
+        cached = cache_dir() / f"table-v{TABLE_VERSION}-{digest}.pickle"
+        try:
+            return pickle.loads(cached.read_bytes())
+        except Exception:
+            # Missing, truncated or foreign pickles all fall back to the JSON.
+            pass
+
+        table = {int(k): v for k, v in json.loads(data).items()}
+        try:
+            write_atomic(cached, pickle.dumps(table, pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            pass
+        return table
 
     def exists(self, filter_id: int) -> bool:
         return filter_id in self._filters
@@ -0,0 +1,18 @@
+from sandblaster.export.binary import BinaryExporter, BinaryProfile
+from sandblaster.export.jsonl import JsonlExporter, iter_operations
+
+EXPORTERS = {"sbir": BinaryExporter, "jsonl": JsonlExporter}
+
+
+def open_exporter(path: str, export_format: str = "sbir"):
+    return EXPORTERS[export_format](path)
+
+
+__all__ = [
+    "BinaryExporter",
+    "BinaryProfile",
+    "EXPORTERS",
+    "JsonlExporter",
+    "iter_operations",
+    "open_exporter",
+]
@@ -0,0 +1,396 @@
+import mmap
+import struct
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence
+
+from sandblaster.export.records import (
+    EXPR_KINDS,
+    EXPR_TYPES,
+    OperationRecord,
+    RuleRecord,
+    atom_record,
+    expr_atoms,
+    terminal_record,
+)
+from sandblaster.fileio import atomic_open
+from sandblaster.nodes.terminal import NodeType
+from sandblaster.parsers.analysis.ir import Atom, Const, Expr, post_order
+
+MAGIC = b"SBIR"
+VERSION = 1
+NONE = 0xFFFFFFFF
+
+HEADER = struct.Struct("<4sHH")
+ENTRY = struct.Struct("<4sQQ")
+
+ARG_NONE, ARG_TEXT, ARG_LIST, ARG_INT = range(4)
+ACTIONS = [t.name.lower() for t in NodeType]
+
+SECTIONS = ("STRS", "TABL", "ATOM", "TERM", "EXPR", "OPER")
+
+
+def u32_column(values: Sequence[int]) -> bytes:
+    return struct.pack(f"<{len(values)}I", *values)
+
+
+def list_starts(lists: Sequence[Sequence[Any]]) -> List[int]:
+    starts = [0]
+    for values in lists:
+        starts.append(starts[-1] + len(values))
+    return starts
+
+
+def encode_section(columns: Sequence[bytes]) -> bytes:
+    parts = [struct.pack("<I", len(columns))]
+    for column in columns:
+        parts.append(struct.pack("<I", len(column)))
+        parts.append(column)
+        parts.append(b"\0" * (-len(column) % 4))
+    return b"".join(parts)
+
+
+class StringTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.strings: List[bytes] = []
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NONE
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.strings)
+            self.strings.append(value.encode("utf-8", errors="surrogateescape"))
+        return idx
+
+    def encode(self) -> bytes:
+        return encode_section(
+            [u32_column(list_starts(self.strings)), b"".join(self.strings)]
+        )
+
+
+class BinaryExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self.strings = StringTable()
+        self.tables: List[List[int]] = [[], []]
+        self.atoms: Dict[int, Dict[str, Any]] = {}
+        self.terminals: Dict[int, int] = {}
+        self.terminal_rows: List[Dict[str, Any]] = []
+        self.exprs: Dict[Expr, int] = {}
+        self.expr_rows: List[tuple] = []
+        self.operations: List[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+
+    def write_tables(self, regex_list, global_vars) -> None:
+        self.tables = [
+            [self.strings.add(r) for r in regex_list],
+            [self.strings.add(v) for v in global_vars],
+        ]
+
+    def add_terminal(self, decision) -> int:
+        offset = decision.node.offset
+        idx = self.terminals.get(offset)
+        if idx is None:
+            idx = self.terminals[offset] = len(self.terminal_rows)
+            self.terminal_rows.append(terminal_record(decision))
+        return idx
+
+    def add_expr(self, expr: Expr) -> int:
+        for node in post_order(expr):
+            if node in self.exprs:
+                continue
+            match node:
+                case Const():
+                    value = int(node.value)
+                case Atom():
+                    value = node.id
+                case _:
+                    value = 0
+            children = [self.exprs[child] for child in node.children]
+            self.exprs[node] = len(self.expr_rows)
+            self.expr_rows.append((EXPR_KINDS[type(node)], value, children))
+        return self.exprs[expr]
+
+    def add_operation(self, name: str, rules, parsed) -> None:
+        for atom in expr_atoms(rule.expr for rule in rules):
+            if atom not in self.atoms:
+                self.atoms[atom] = atom_record(atom, parsed[atom])
+        self.operations.append(
+            (
+                self.strings.add(name),
+                [(self.add_terminal(r.decision), self.add_expr(r.expr)) for r in rules],
+            )
+        )
+
+    def _atom_section(self) -> bytes:
+        ids = sorted(self.atoms)
+        kinds, args = [], []
+        for atom in ids:
+            argument = self.atoms[atom]["argument"]
+            match argument:
+                case None:
+                    kinds.append(ARG_NONE)
+                    args.append([])
+                case list():
+                    kinds.append(ARG_LIST)
+                    args.append([self.strings.add(str(a)) for a in argument])
+                case int():
+                    kinds.append(ARG_INT)
+                    args.append([argument])
+                case _:
+                    kinds.append(ARG_TEXT)
+                    args.append([self.strings.add(str(argument))])
+        filters = [self.strings.add(self.atoms[atom]["filter"]) for atom in ids]
+        return encode_section(
+            [
+                u32_column(ids),
+                u32_column(filters),
+                bytes(kinds),
+                u32_column(list_starts(args)),
+                u32_column([a for values in args for a in values]),
+            ]
+        )
+
+    def _terminal_section(self) -> bytes:
+        rows = self.terminal_rows
+        inline = [row["inline"] or {} for row in rows]
+        modifiers = [[self.strings.add(m) for m in row["modifiers"]] for row in rows]
+        return encode_section(
+            [
+                u32_column([row["offset"] for row in rows]),
+                bytes(ACTIONS.index(row["action"]) for row in rows),
+                u32_column([row["flags"] for row in rows]),
+                u32_column([self.strings.add(i.get("modifier")) for i in inline]),
+                u32_column([self.strings.add(i.get("data")) for i in inline]),
+                u32_column([i.get("policy", NONE) for i in inline]),
+                u32_column(list_starts(modifiers)),
+                u32_column([m for values in modifiers for m in values]),
+            ]
+        )
+
+    def _expr_section(self) -> bytes:
+        rows = self.expr_rows
+        children = [row[2] for row in rows]
+        return encode_section(
+            [
+                bytes(row[0] for row in rows),
+                u32_column([row[1] for row in rows]),
+                u32_column(list_starts(children)),
+                u32_column([c for values in children for c in values]),
+            ]
+        )
+
+    def _operation_section(self) -> bytes:
+        rules = [rules for _, rules in self.operations]
+        flat = [rule for values in rules for rule in values]
+        return encode_section(
+            [
+                u32_column([name for name, _ in self.operations]),
+                u32_column(list_starts(rules)),
+                u32_column([terminal for terminal, _ in flat]),
+                u32_column([expr for _, expr in flat]),
+            ]
+        )
+
+    def close(self) -> None:
+        sections = {
+            "TABL": encode_section([u32_column(table) for table in self.tables]),
+            "ATOM": self._atom_section(),
+            "TERM": self._terminal_section(),
+            "EXPR": self._expr_section(),
+            "OPER": self._operation_section(),
+        }
+        sections["STRS"] = self.strings.encode()
+
+        offset = HEADER.size + ENTRY.size * len(SECTIONS)
+        directory = []
+        for tag in SECTIONS:
+            directory.append(ENTRY.pack(tag.encode(), offset, len(sections[tag])))
+            offset += len(sections[tag])
+
+        with atomic_open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(SECTIONS)))
+            f.writelines(directory)
+            f.writelines(sections[tag] for tag in SECTIONS)
+
+
+class Column:
+    def __init__(self, view: memoryview, width: int):
+        self.view = view
+        self.width = width
+
+    def __len__(self) -> int:
+        return len(self.view) // self.width
+
+    def __getitem__(self, index: int) -> int:
+        if self.width == 1:
+            return self.view[index]
+        return struct.unpack_from("<I", self.view, index * 4)[0]
+
+    def slice(self, start: int, stop: int) -> List[int]:
+        if self.width == 1:
+            return list(self.view[start:stop])
+        return list(struct.unpack_from(f"<{stop - start}I", self.view, start * 4))
+
+
+def decode_section(view: memoryview, widths: Sequence[int]) -> List[Column]:
+    (count,) = struct.unpack_from("<I", view, 0)
+    offset = 4
+    columns = []
+    for width in widths[:count]:
+        (length,) = struct.unpack_from("<I", view, offset)
+        offset += 4
+        columns.append(Column(view[offset : offset + length], width))
+        offset += length + (-length % 4)
+    return columns
+
+
+class BinaryProfile:
+    WIDTHS = {
+        "STRS": (4, 1),
+        "TABL": (4, 4),
+        "ATOM": (4, 4, 1, 4, 4),
+        "TERM": (4, 1, 4, 4, 4, 4, 4, 4),
+        "EXPR": (1, 4, 4, 4),
+        "OPER": (4, 4, 4, 4),
+    }
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        magic, version, count = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a sandblaster export (version {VERSION})")
+        self._sections = {}
+        for i in range(count):
+            tag, offset, length = ENTRY.unpack_from(
+                self._view, HEADER.size + i * ENTRY.size
+            )
+            tag = tag.decode()
+            self._sections[tag] = decode_section(
+                self._view[offset : offset + length], self.WIDTHS[tag]
+            )
+        self._names: Optional[Dict[str, int]] = None
+        self._exprs: Dict[int, Expr] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._exprs.clear()
+        self._sections.clear()
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def string(self, index: int) -> Optional[str]:
+        if index == NONE:
+            return None
+        starts, blob = self._sections["STRS"]
+        return bytes(blob.view[starts[index] : starts[index + 1]]).decode(
+            "utf-8", errors="surrogateescape"
+        )
+
+    def tables(self) -> Dict[str, List[str]]:
+        regex, global_vars = self._sections["TABL"]
+        return {
+            "regex": [self.string(i) for i in regex.slice(0, len(regex))],
+            "global_vars": [
+                self.string(i) for i in global_vars.slice(0, len(global_vars))
+            ],
+        }
+
+    @property
+    def operations(self) -> List[str]:
+        return list(self._operation_index())
+
+    def _operation_index(self) -> Dict[str, int]:
+        if self._names is None:
+            names = self._sections["OPER"][0]
+            self._names = {self.string(names[i]): i for i in range(len(names))}
+        return self._names
+
+    def atom(self, atom: int) -> Dict[str, Any]:
+        ids, filters, kinds, starts, args = self._sections["ATOM"]
+        idx = bisect_left(ids, atom)
+        if idx == len(ids) or ids[idx] != atom:
+            raise KeyError(atom)
+        values = args.slice(starts[idx], starts[idx + 1])
+        match kinds[idx]:
+            case 0:
+                argument = None
+            case 1:
+                argument = self.string(values[0])
+            case 2:
+                argument = [self.string(v) for v in values]
+            case 3:
+                argument = values[0]
+        record = {"id": atom, "filter_id": atom >> 16, "argument_id": atom & 0xFFFF}
+        record.update(filter=self.string(filters[idx]), argument=argument)
+        return record
+
+    def terminal(self, index: int) -> Dict[str, Any]:
+        offsets, actions, flags, names, data, policies, starts, mods = self._sections[
+            "TERM"
+        ]
+        inline = None
+        if names[index] != NONE:
+            inline = {
+                "modifier": self.string(names[index]),
+                "data": self.string(data[index]),
+            }
+        elif policies[index] != NONE:
+            inline = {"policy": policies[index]}
+        return {
+            "offset": offsets[index],
+            "action": ACTIONS[actions[index]],
+            "flags": flags[index],
+            "modifiers": [
+                self.string(m) for m in mods.slice(starts[index], starts[index + 1])
+            ],
+            "inline": inline,
+        }
+
+    def expr(self, index: int) -> Expr:
+        kinds, values, starts, children = self._sections["EXPR"]
+        stack = [index]
+        while stack:
+            idx = stack[-1]
+            if idx in self._exprs:
+                stack.pop()
+                continue
+            args = children.slice(starts[idx], starts[idx + 1])
+            missing = [a for a in args if a not in self._exprs]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            cls = EXPR_TYPES[kinds[idx]]
+            if cls in (Const, Atom):
+                self._exprs[idx] = cls(values[idx])
+            else:
+                self._exprs[idx] = cls(*(self._exprs[a] for a in args))
+        return self._exprs[index]
+
+    def operation(self, name: str) -> OperationRecord:
+        idx = self._operation_index()[name]
+        _, starts, terminals, exprs = self._sections["OPER"]
+        rules = [
+            RuleRecord(self.terminal(terminals[r]), self.expr(exprs[r]))
+            for r in range(starts[idx], starts[idx + 1])
+        ]
+        atoms = {
+            atom: self.atom(atom) for atom in expr_atoms(rule.expr for rule in rules)
+        }
+        return OperationRecord(name, rules, atoms)
@@ -0,0 +1,68 @@
+import json
+from typing import Iterator, TextIO
+
+from sandblaster.export.records import (
+    OperationRecord,
+    RuleRecord,
+    atom_record,
+    expr_atoms,
+    expr_table,
+    exprs_from_table,
+    terminal_record,
+)
+
+
+class JsonlExporter:
+    def __init__(self, path: str):
+        self.f: TextIO = open(path, "w", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write(self, record: dict) -> None:
+        self.f.write(json.dumps(record, separators=(",", ":")))
+        self.f.write("\n")
+
+    def write_tables(self, regex_list, global_vars) -> None:
+        self._write(
+            {"type": "tables", "regex": list(regex_list), "global_vars": global_vars}
+        )
+
+    def add_operation(self, name: str, rules, parsed) -> None:
+        atoms = expr_atoms(rule.expr for rule in rules)
+        nodes, roots = expr_table(rule.expr for rule in rules)
+        self._write(
+            {
+                "type": "operation",
+                "operation": name,
+                "nodes": nodes,
+                "rules": [
+                    {"decision": terminal_record(rule.decision), "condition": root}
+                    for rule, root in zip(rules, roots)
+                ],
+                "atoms": [atom_record(atom, parsed[atom]) for atom in atoms],
+            }
+        )
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def iter_operations(path: str) -> Iterator[OperationRecord]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] != "operation":
+                continue
+            nodes = exprs_from_table(record["nodes"])
+            yield OperationRecord(
+                record["operation"],
+                [
+                    RuleRecord(rule["decision"], nodes[rule["condition"]])
+                    for rule in record["rules"]
+                ],
+                {atom["id"]: atom for atom in record["atoms"]},
+            )
@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sandblaster.nodes.terminal import NodeType
+from sandblaster.parsers.analysis.ir import (
+    And,
+    Atom,
+    Const,
+    Expr,
+    Ite,
+    Not,
+    Or,
+    atom_key,
+    post_order,
+)
+
+EXPR_KINDS = {Const: 0, Atom: 1, Not: 2, And: 3, Or: 4, Ite: 5}
+EXPR_TYPES = {kind: cls for cls, kind in EXPR_KINDS.items()}
+EXPR_NAMES = {Const: "const", Atom: "atom", Not: "not", And: "and", Or: "or", Ite: "if"}
+
+
+def expr_atoms(exprs: Iterable[Expr]) -> List[int]:
+    atoms = set()
+    for expr in exprs:
+        atoms.update(node.id for node in post_order(expr) if isinstance(node, Atom))
+    return sorted(atoms)
+
+
+def atom_record(atom: int, representation) -> Dict[str, Any]:
+    filter_id, argument_id = atom_key(atom)
+    return {
+        "id": atom,
+        "filter_id": filter_id,
+        "argument_id": argument_id,
+        "filter": representation.filter,
+        "argument": representation.argument,
+    }
+
+
+def terminal_record(decision) -> Dict[str, Any]:
+    node = decision.node
+    inline: Optional[Dict[str, Any]] = None
+    if node.action_inline:
+        modifier = getattr(decision, "inline_modifiers", None)
+        policy = getattr(decision, "inline_policy", None)
+        if modifier:
+            inline = {"modifier": modifier["name"], "data": decision.inline_data}
+        elif policy is not None:
+            inline = {"policy": policy}
+    return {
+        "offset": node.offset,
+        "action": NodeType(node.type).name.lower(),
+        "flags": node.modifier_flags,
+        "modifiers": [m["name"] for m in decision.flags_modifiers],
+        "inline": inline,
+    }
+
+
+def expr_table(exprs: Iterable[Expr]) -> Tuple[List[Any], List[int]]:
+    # Rows refer to their children by row index, so shared subterms are
+    # written once and the DAG is rebuilt as-is by exprs_from_table.
+    index: Dict[Expr, int] = {}
+    rows: List[Any] = []
+    roots = []
+    for expr in exprs:
+        for node in post_order(expr):
+            if node in index:
+                continue
+            match node:
+                case Const():
+                    row = node.value
+                case Atom():
+                    row = ["atom", node.id]
+                case _:
+                    row = [EXPR_NAMES[type(node)]]
+                    row.extend(index[child] for child in node.children)
+            index[node] = len(rows)
+            rows.append(row)
+        roots.append(index[expr])
+    return rows, roots
+
+
+def exprs_from_table(rows: List[Any]) -> List[Expr]:
+    nodes: List[Expr] = []
+    for row in rows:
+        match row:
+            case bool():
+                node = Const(row)
+            case ["atom", int(atom)]:
+                node = Atom(atom)
+            case ["not", int(arg)]:
+                node = Not(nodes[arg])
+            case ["and", *args]:
+                node = And(*(nodes[arg] for arg in args))
+            case ["or", *args]:
+                node = Or(*(nodes[arg] for arg in args))
+            case ["if", int(), int(), int()]:
+                node = Ite(*(nodes[arg] for arg in row[1:]))
+            case _:
+                raise ValueError(f"Unsupported expression row: {row!r}")
+        nodes.append(node)
+    return nodes
+
+
+@dataclass
+class RuleRecord:
+    decision: Dict[str, Any]
+    expr: Expr
+
+
+@dataclass
+class OperationRecord:
+    name: str
+    rules: List[RuleRecord]
+    atoms: Dict[int, Dict[str, Any]]
+
+
+def operation_record(name: str, rules, parsed) -> OperationRecord:
+    atoms = expr_atoms(rule.expr for rule in rules)
+    return OperationRecord(
+        name,
+        [RuleRecord(terminal_record(rule.decision), rule.expr) for rule in rules],
+        {atom: atom_record(atom, parsed[atom]) for atom in atoms},
+    )
@@ -1,9 +1,11 @@
 import logging
 import struct
-from typing import Any, BinaryIO, List, Optional, Tuple
+from typing import Any, BinaryIO, Dict, List, Mapping, Optional, Tuple
 
 from sandblaster.filters.base import FilterType
+from sandblaster.metrics import metrics
 from sandblaster.parsers.fsa_parser.processor import parse_fsm_string
+from sandblaster.parsers.fsa_parser.vm import FsaProgram
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +24,26 @@ class FilterResolver:
         self.regex_list = regex_list
         self.global_vars = global_vars
         self.filters = filters
+        self._programs: Dict[int, FsaProgram] = {}
+        # Atoms already resolved by an earlier run, e.g. a decoded snapshot.
+        self.resolved: Optional[Mapping[Tuple[int, int], Tuple]] = None
+        # Atoms this run had to resolve from the blob, for the next snapshot.
+        self.recorded: Dict[Tuple[int, int], Tuple] = {}
 
     def resolve(
         self, filter_id: int, filter_arg: int
+    ) -> Tuple[Optional[str], Optional[Any]]:
+        if self.resolved is not None:
+            hit = self.resolved.get((filter_id, filter_arg))
+            if hit is not None:
+                return hit
+
+        result = self._resolve(filter_id, filter_arg)
+        self.recorded[(filter_id, filter_arg)] = result
+        return result
+
+    def _resolve(
+        self, filter_id: int, filter_arg: int
     ) -> Tuple[Optional[str], Optional[Any]]:
         if not self.filters.exists(filter_id):
             logger.warning(f"Filter ID {filter_id} not found.")
@@ -59,13 +78,29 @@ class FilterResolver:
         strlen = struct.unpack("<H", self.f.read(2))[0] - 1
         return f'"{self.f.read(strlen).decode()}"'
 
-    def _arg_fsm_string(self, offset: int) -> str:
+    def _pattern_bytes(self, offset: int) -> bytes:
         addr = offset * 8 + self.base_addr
         self.f.seek(addr)
         length = struct.unpack("<H", self.f.read(2))[0]
-        self.f.seek(addr)
-        data = self.f.read(2 + length)
-        return parse_fsm_string(data[2:], self.global_vars)
+        return self.f.read(length)
+
+    def pattern_program(self, offset: int) -> FsaProgram:
+        program = self._programs.get(offset)
+        if program is None:
+            program = FsaProgram.from_bytecode(self._pattern_bytes(offset))
+            self._programs[offset] = program
+        return program
+
+    def clear_caches(self) -> None:
+        self._programs.clear()
+
+    def _arg_fsm_string(self, offset: int) -> str:
+        data = self._pattern_bytes(offset)
+        with metrics.stage("fsa"):
+            strings = parse_fsm_string(data, self.global_vars)
+        metrics.count("fsa.patterns")
+        metrics.count("fsa.strings", len(strings))
+        return strings
 
     def _arg_integer(self, filter_id: int, arg: int) -> str:
         mods = self.filters.get(filter_id).get("modifiers", {})
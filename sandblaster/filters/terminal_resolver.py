@@ -1,21 +1,50 @@
 from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sandblaster.nodes.terminal import NodeType
+from sandblaster.parsers.analysis.policies import policy_name, policy_root
+
+# A modifier's "action" is a mask of the terminal actions it applies to.
+ACTION_BITS = {NodeType.ALLOW: 2, NodeType.DENY: 1}
+
+Entry = Tuple[int, int, int, dict]
+
+
+@dataclass
+class TerminalInfo:
+    flags_modifiers: List[dict]
+    inline_modifiers: Optional[dict] = None
+    inline_data: Any = None
+    inline_operation_node: Any = None
+    inline_policy: Optional[int] = None
+    parts: List[str] = field(default_factory=list)
 
 
 class TerminalResolver:
-    def __init__(self, modifiers, used_flags: set[int]):
+    def __init__(self, modifiers, used_flags: Iterable[int] = ()):
         self._modifiers_by_id = modifiers._filters
         self._modifiers_by_name = {m["name"]: m for m in self._modifiers_by_id.values()}
-        self._modifiers_by_flags_context = defaultdict(list)
 
-        for m in self._modifiers_by_id.values():
-            mask = m["action_mask"]
+        # Modifiers implied by set bits are indexed under the lowest bit of
+        # their action_flag, so a flag word only visits its own set bits;
+        # the few that match cleared bits (action_flag 0) are always checked.
+        self._by_bit: Dict[int, List[Entry]] = defaultdict(list)
+        self._when_clear: List[Entry] = []
+        for order, m in enumerate(self._modifiers_by_id.values()):
+            mask, flag = m["action_mask"], m["action_flag"]
             if not mask:
                 continue
-            flag = m["action_flag"]
+            entry = (order, mask, flag, m)
+            if flag:
+                self._by_bit[(flag & -flag).bit_length() - 1].append(entry)
+            else:
+                self._when_clear.append(entry)
 
-            for f in used_flags:
-                if (f & mask) == flag:
-                    self._modifiers_by_flags_context[f].append(m)
+        self._modifiers_by_flags: Dict[int, List[dict]] = {}
+        self._terminals: Dict[int, TerminalInfo] = {}
+        for flags in used_flags:
+            self.get_modifiers_by_flag(flags)
 
     def get_modifier(self, id: int) -> dict:
         return self._modifiers_by_id[id]
@@ -23,5 +52,49 @@ class TerminalResolver:
     def get_modifier_by_name(self, name: str) -> dict:
         return self._modifiers_by_name.get(name)
 
-    def get_modifiers_by_flag(self, flags: int) -> list[dict]:
-        return self._modifiers_by_flags_context[flags]
+    def get_modifiers_by_flag(self, flags: int) -> List[dict]:
+        modifiers = self._modifiers_by_flags.get(flags)
+        if modifiers is None:
+            modifiers = self._modifiers_by_flags[flags] = self._resolve_flags(flags)
+        return modifiers
+
+    def _resolve_flags(self, flags: int) -> List[dict]:
+        action = ACTION_BITS[NodeType(flags & 1)]
+        found = [entry for entry in self._when_clear if not flags & entry[1]]
+        bits = flags
+        while bits:
+            low = bits & -bits
+            for entry in self._by_bit.get(low.bit_length() - 1, ()):
+                if flags & entry[1] == entry[2]:
+                    found.append(entry)
+            bits ^= low
+        found.sort(key=lambda entry: entry[0])
+        return [m for _, _, _, m in found if m["action"] & action]
+
+    def describe(self, node, modifier_resolver, sandbox_data) -> TerminalInfo:
+        info = self._terminals.get(node.offset)
+        if info is None:
+            info = self._terminals[node.offset] = self._describe(
+                node, modifier_resolver, sandbox_data
+            )
+        return info
+
+    def _describe(self, node, modifier_resolver, sandbox_data) -> TerminalInfo:
+        info = TerminalInfo(self.get_modifiers_by_flag(node.modifier_flags))
+        if node.action_inline:
+            if not node.arg_id:
+                info.inline_modifiers = self.get_modifier(node.arg_type)
+                info.inline_data = modifier_resolver.resolve(
+                    node.arg_type, node.arg_value
+                )
+                name = info.inline_modifiers["name"]
+                info.parts.append(f"(with {name} {info.inline_data})")
+            else:
+                # Only the reference is rendered here; the policy itself is
+                # decompiled once and printed as a block by PolicyTable.
+                # A dangling policy offset leaves the reference unresolved.
+                info.inline_policy = node.arg_value
+                info.inline_operation_node = policy_root(sandbox_data, node.arg_value)
+                info.parts.append(f"(policy {policy_name(node.arg_value)})")
+        info.parts.extend(f"(with {m['name']})" for m in info.flags_modifiers)
+        return info
@@ -0,0 +1,187 @@
+import sqlite3
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sandblaster.metrics import metrics
+from sandblaster.nodes.non_terminal import NonTerminalNode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    build TEXT
+);
+CREATE TABLE IF NOT EXISTS atoms (
+    id INTEGER PRIMARY KEY,
+    profile_id INTEGER NOT NULL REFERENCES profiles(id),
+    filter_id INTEGER NOT NULL,
+    argument_id INTEGER NOT NULL,
+    filter TEXT,
+    UNIQUE (profile_id, filter_id, argument_id)
+);
+CREATE TABLE IF NOT EXISTS atom_values (
+    atom_id INTEGER NOT NULL REFERENCES atoms(id),
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS atom_nodes (
+    atom_id INTEGER NOT NULL REFERENCES atoms(id),
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS atom_operations (
+    atom_id INTEGER NOT NULL REFERENCES atoms(id),
+    operation TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS atoms_filter ON atoms (filter);
+CREATE INDEX IF NOT EXISTS atom_values_value ON atom_values (value);
+CREATE INDEX IF NOT EXISTS atom_values_atom ON atom_values (atom_id);
+CREATE INDEX IF NOT EXISTS atom_nodes_atom ON atom_nodes (atom_id);
+CREATE INDEX IF NOT EXISTS atom_operations_atom ON atom_operations (atom_id);
+"""
+
+Key = Tuple[int, int]
+
+
+@dataclass
+class IndexHit:
+    profile: str
+    build: Optional[str]
+    filter: Optional[str]
+    value: str
+    operations: List[str]
+    nodes: List[int]
+
+
+def argument_values(argument) -> List[str]:
+    match argument:
+        case None:
+            return []
+        case list():
+            return [str(value) for value in argument]
+        case str() if argument.startswith('#"') and argument.endswith('"'):
+            return [argument[2:-1]]
+        case str() if len(argument) > 1 and argument[0] == argument[-1] == '"':
+            return [argument[1:-1]]
+    return [str(argument)]
+
+
+def collect_atoms(payload) -> Tuple[Dict[Key, Set[int]], Dict[Key, Set[str]]]:
+    nodes: Dict[Key, Set[int]] = defaultdict(set)
+    for node in payload.operation_nodes.nodes.values():
+        if isinstance(node, NonTerminalNode):
+            nodes[(node.filter_id, node.argument_id)].add(node.offset)
+
+    operations: Dict[Key, Set[str]] = defaultdict(set)
+    for name, root in zip(payload.sb_ops, payload.op_table):
+        stack = [payload.operation_nodes.find_operation_node_by_offset(root)]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, NonTerminalNode) or node.offset in seen:
+                continue
+            seen.add(node.offset)
+            operations[(node.filter_id, node.argument_id)].add(name)
+            stack += (node.match, node.unmatch)
+    return nodes, operations
+
+
+class ProfileIndex:
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> "ProfileIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def contains(self, digest: str) -> bool:
+        row = self.db.execute(
+            "SELECT 1 FROM profiles WHERE digest = ?", (digest,)
+        ).fetchone()
+        return row is not None
+
+    def add(self, profile, name: str, digest: str, build: str = None) -> bool:
+        if self.contains(digest):
+            return False
+
+        with metrics.stage("index"):
+            nodes, operations = collect_atoms(profile.payload)
+            with self.db:
+                profile_id = self.db.execute(
+                    "INSERT INTO profiles (digest, name, build) VALUES (?, ?, ?)",
+                    (digest, name, build),
+                ).lastrowid
+                for key in sorted(nodes):
+                    self._add_atom(
+                        profile_id, key, profile.filter_resolver, nodes, operations
+                    )
+        return True
+
+    def _add_atom(self, profile_id, key, filter_resolver, nodes, operations) -> None:
+        filter_name, argument = filter_resolver.resolve(*key)
+        atom = self.db.execute(
+            "INSERT INTO atoms (profile_id, filter_id, argument_id, filter)"
+            " VALUES (?, ?, ?, ?)",
+            (profile_id, *key, filter_name),
+        ).lastrowid
+        values = argument_values(argument)
+        self.db.executemany(
+            "INSERT INTO atom_values VALUES (?, ?)", [(atom, v) for v in values]
+        )
+        self.db.executemany(
+            "INSERT INTO atom_nodes VALUES (?, ?)",
+            [(atom, offset) for offset in sorted(nodes[key])],
+        )
+        self.db.executemany(
+            "INSERT INTO atom_operations VALUES (?, ?)",
+            [(atom, op) for op in sorted(operations.get(key, ()))],
+        )
+        metrics.count("index.atoms")
+        metrics.count("index.values", len(values))
+
+    def find(
+        self, value: str, prefix: bool = False, filter_name: str = None
+    ) -> Iterator[IndexHit]:
+        if prefix:
+            # code point order matches SQLite's binary UTF-8 comparison
+            where = "v.value >= ? AND v.value < ?"
+            params = [value, value + "\U0010ffff"]
+        else:
+            where, params = "v.value = ?", [value]
+        if filter_name is not None:
+            where += " AND a.filter = ?"
+            params.append(filter_name)
+
+        rows = self.db.execute(
+            "SELECT a.id, p.name, p.build, a.filter, v.value"
+            " FROM atom_values v"
+            " JOIN atoms a ON a.id = v.atom_id"
+            " JOIN profiles p ON p.id = a.profile_id"
+            f" WHERE {where} ORDER BY p.name, v.value, a.id",
+            params,
+        ).fetchall()
+        for atom, profile, build, filter_name, matched in rows:
+            yield IndexHit(
+                profile,
+                build,
+                filter_name,
+                matched,
+                self._column(
+                    "SELECT operation FROM atom_operations WHERE atom_id = ?"
+                    " ORDER BY operation",
+                    atom,
+                ),
+                self._column(
+                    "SELECT offset FROM atom_nodes WHERE atom_id = ? ORDER BY offset",
+                    atom,
+                ),
+            )
+
+    def _column(self, sql: str, atom: int) -> list:
+        return [row[0] for row in self.db.execute(sql, (atom,))]
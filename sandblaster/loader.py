@@ -0,0 +1,134 @@
+import logging
+import mmap
+from contextlib import contextmanager
+from dataclasses import dataclass
+from importlib.resources import files
+from typing import Any, Iterator, List, Optional
+
+from sandblaster.configs.filters import Filters
+from sandblaster.filters.filter_resolver import FilterResolver
+from sandblaster.filters.modifier_resolver import ModifierResolver
+from sandblaster.filters.terminal_resolver import TerminalResolver
+from sandblaster.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadedProfile:
+    payload: Any
+    filter_resolver: FilterResolver
+    modifier_resolver: ModifierResolver
+    terminal_resolver: TerminalResolver
+
+
+def read_sandbox_operations(path: str) -> List[str]:
+    with open(path, "r") as f:
+        ops = [line.strip() for line in f if line.strip()]
+    return ops
+
+
+def load_filters(
+    filters_path: Optional[str] = None, modifiers_path: Optional[str] = None
+):
+    filters = Filters(filters_path or files("sandblaster.misc") / "filters.json")
+    modifiers = Filters(modifiers_path or files("sandblaster.misc") / "modifiers.json")
+    return filters, modifiers
+
+
+@contextmanager
+def open_profile(
+    filename: str,
+    sandbox_operations: List[str],
+    operation_filter: Optional[List[str]] = None,
+    use_snapshot: bool = True,
+    filters_path: Optional[str] = None,
+    modifiers_path: Optional[str] = None,
+) -> Iterator[LoadedProfile]:
+    from sandblaster.snapshot import (
+        blob_digest,
+        load_snapshot,
+        open_snapshot,
+        snapshot_path,
+        write_snapshot,
+    )
+
+    filters, modifiers = load_filters(filters_path, modifiers_path)
+    with open(filename, "rb") as infile:
+        mm = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        snapshot = None
+        try:
+            path = (
+                snapshot_path(blob_digest(mm), filters.digest) if use_snapshot else None
+            )
+            snapshot = open_snapshot(path) if path is not None else None
+            if snapshot is not None:
+                with metrics.stage("load"):
+                    profile = load_snapshot(
+                        snapshot,
+                        mm,
+                        sandbox_operations,
+                        operation_filter,
+                        filters,
+                        modifiers,
+                    )
+                metrics.count("snapshot.hits")
+                yield profile
+                base_addr = snapshot.base_addr
+                # Atoms outside the snapshot were resolved from the blob;
+                # add them so the next run finds them too.
+                atoms = profile.filter_resolver.recorded
+                if not atoms:
+                    return
+                atoms = {**snapshot.atoms(), **atoms}
+            else:
+                profile, base_addr = _parse_profile(
+                    mm, sandbox_operations, operation_filter, filters, modifiers
+                )
+                yield profile
+                atoms = profile.filter_resolver.recorded
+            if path is not None:
+                with metrics.stage("snapshot"):
+                    try:
+                        write_snapshot(path, profile, base_addr, atoms)
+                    except Exception as e:
+                        logger.warning(f"Could not write snapshot {path}: {e}")
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+            mm.close()
+
+
+def _parse_profile(mm, sandbox_operations, operation_filter, filters, modifiers):
+    from sandblaster.parsers.core.header import SandboxHeader
+    from sandblaster.parsers.core.sandbox import SandboxParser
+
+    with metrics.stage("load"):
+        sandbox_data = SandboxHeader(mm)
+        sandbox_parser = SandboxParser(infile=mm, base_addr=sandbox_data.base_addr)
+        sandbox_payload = sandbox_parser.parse(
+            sandbox_data, sandbox_operations, operation_filter
+        )
+        sandbox_parser.create_operation_nodes(
+            sandbox_data.header.op_nodes_count,
+            sandbox_data.operation_nodes_offset,
+        )
+        filter_resolver = FilterResolver(
+            mm,
+            sandbox_data.base_addr,
+            sandbox_parser.payload.regex_list,
+            sandbox_parser.payload.global_vars,
+            filters,
+        )
+        modifier_resolver = ModifierResolver(
+            mm,
+            sandbox_data.base_addr,
+            sandbox_parser.payload.regex_list,
+            sandbox_parser.payload.global_vars,
+            modifiers,
+        )
+        terminal_resolver = TerminalResolver(modifiers, sandbox_parser.flags)
+    profile = LoadedProfile(
+        sandbox_payload, filter_resolver, modifier_resolver, terminal_resolver
+    )
+    return profile, sandbox_data.base_addr
@@ -0,0 +1,203 @@
+import ctypes
+import gc
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import tempfile
+from collections import OrderedDict
+from typing import Any, Callable, Iterator, List, MutableMapping, Optional
+
+from sandblaster.metrics import metrics, peak_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+ATOM_CACHE_SIZE = 4096
+# Spill once RSS crosses this fraction of the limit, leaving headroom for
+# the operation that is about to run.
+SPILL_THRESHOLD = 0.8
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*", text.upper())
+    if match is None:
+        raise ValueError(f"invalid size: {text!r}")
+    return int(float(match[1]) * SIZE_UNITS[match[2]])
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # No procfs (e.g. macOS): the peak is the best available bound.
+        return peak_rss_bytes()
+
+
+def trim_heap() -> None:
+    # glibc keeps freed z3 allocations mapped; hand them back to the OS.
+    try:
+        ctypes.CDLL(None).malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class SpillingCache(MutableMapping):
+    def __init__(self, capacity: int = ATOM_CACHE_SIZE, directory: str = None):
+        self.capacity = capacity
+        self.directory = directory
+        self.memory: "OrderedDict[Any, Any]" = OrderedDict()
+        self.db: Optional[sqlite3.Connection] = None
+        self._path: Optional[str] = None
+
+    def _disk(self) -> sqlite3.Connection:
+        if self.db is None:
+            fd, self._path = tempfile.mkstemp(".sqlite", "sandblaster-", self.directory)
+            os.close(fd)
+            self.db = sqlite3.connect(self._path, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode = OFF")
+            self.db.execute("PRAGMA synchronous = OFF")
+            self.db.execute("CREATE TABLE spilled (key BLOB PRIMARY KEY, value BLOB)")
+        return self.db
+
+    def _load(self, key) -> Any:
+        if self.db is None:
+            raise KeyError(key)
+        row = self.db.execute(
+            "SELECT value FROM spilled WHERE key = ?", (pickle.dumps(key),)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        metrics.count("memory.cache.reloads")
+        return pickle.loads(row[0])
+
+    def _write(self, items) -> None:
+        rows = [
+            (pickle.dumps(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            for key, value in items
+        ]
+        self._disk().executemany("INSERT OR REPLACE INTO spilled VALUES (?, ?)", rows)
+        metrics.count("memory.cache.spilled", len(rows))
+
+    def __getitem__(self, key) -> Any:
+        try:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        except KeyError:
+            value = self._load(key)
+        self.memory[key] = value
+        self._evict()
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        self._evict()
+
+    def __delitem__(self, key) -> None:
+        found = key in self.memory
+        self.memory.pop(key, None)
+        if self.db is not None:
+            found |= (
+                self.db.execute(
+                    "DELETE FROM spilled WHERE key = ?", (pickle.dumps(key),)
+                ).rowcount
+                > 0
+            )
+        if not found:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if key in self.memory:
+            return True
+        if self.db is None:
+            return False
+        row = self.db.execute(
+            "SELECT 1 FROM spilled WHERE key = ?", (pickle.dumps(key),)
+        ).fetchone()
+        return row is not None
+
+    def __iter__(self) -> Iterator:
+        yield from list(self.memory)
+        if self.db is not None:
+            for (key,) in self.db.execute("SELECT key FROM spilled").fetchall():
+                key = pickle.loads(key)
+                if key not in self.memory:
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def _evict(self) -> None:
+        if len(self.memory) > self.capacity:
+            count = len(self.memory) - self.capacity
+            self._write([self.memory.popitem(last=False) for _ in range(count)])
+
+    def spill(self) -> None:
+        if self.memory:
+            self._write(self.memory.items())
+            self.memory.clear()
+
+    def close(self) -> None:
+        self.memory.clear()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            os.unlink(self._path)
+
+
+class MemoryWatchdog:
+    def __init__(self, limit_bytes: int, threshold: float = SPILL_THRESHOLD):
+        self.limit_bytes = limit_bytes
+        self.threshold = threshold
+        self.caches: List[SpillingCache] = []
+        self.releases: List[Callable[[], None]] = []
+
+    def cache(self, capacity: int = ATOM_CACHE_SIZE) -> SpillingCache:
+        cache = SpillingCache(capacity)
+        self.caches.append(cache)
+        return cache
+
+    def on_release(self, release: Callable[[], None]) -> None:
+        self.releases.append(release)
+
+    def release(self) -> None:
+        from sandblaster.parsers.analysis.expression import reset_z3_context
+
+        reset_z3_context()
+        gc.collect()
+        trim_heap()
+        self.check()
+
+    def check(self) -> None:
+        rss = current_rss_bytes()
+        metrics.count("memory.checks")
+        if rss < self.limit_bytes * self.threshold:
+            return
+        metrics.count("memory.spills")
+        for cache in self.caches:
+            cache.spill()
+        for release in self.releases:
+            release()
+        gc.collect()
+        trim_heap()
+        rss = current_rss_bytes()
+        if rss >= self.limit_bytes:
+            logger.warning(
+                f"RSS {rss >> 20} MiB still above --max-memory "
+                f"{self.limit_bytes >> 20} MiB after spilling caches"
+            )
+
+    def close(self) -> None:
+        for cache in self.caches:
+            cache.close()
+        self.caches.clear()
+
+    def __enter__(self) -> "MemoryWatchdog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
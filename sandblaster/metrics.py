@@ -0,0 +1,148 @@
+import json
+import resource
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _Timings:
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"wall": 0.0, "cpu": 0.0, "calls": 0}
+        )
+        self.counters: Counter = Counter()
+
+    def add_stage(self, name: str, wall: float, cpu: float) -> None:
+        entry = self.stages[name]
+        entry["wall"] += wall
+        entry["cpu"] += cpu
+        entry["calls"] += 1
+
+    def to_dict(self) -> dict:
+        return {"stages": dict(self.stages), "counters": dict(self.counters)}
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self) -> None:
+        self.run = _Timings()
+        self.operations: Dict[str, dict] = {}
+        self._operation: Optional[_Timings] = None
+        self._started = (time.perf_counter(), time.process_time())
+        self.profile_operation: Optional[str] = None
+        self.profile_kind: Optional[str] = None
+        self.profile_output: Optional[str] = None
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.reset()
+
+    def count(self, name: str, value: int = 1) -> None:
+        if not self.enabled:
+            return
+        self.run.counters[name] += value
+        if self._operation is not None:
+            self._operation.counters[name] += value
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return nullcontext()
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self.run.add_stage(name, wall, cpu)
+            if self._operation is not None:
+                self._operation.add_stage(name, wall, cpu)
+
+    def operation(self, name: str):
+        if not self.enabled:
+            return nullcontext()
+        return self._timed_operation(name)
+
+    @contextmanager
+    def _timed_operation(self, name: str):
+        previous, self._operation = self._operation, _Timings()
+        profiler = self._start_profiler(name)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            entry = self._operation.to_dict()
+            entry["wall"] = time.perf_counter() - wall
+            entry["cpu"] = time.process_time() - cpu
+            if profiler is not None:
+                entry["profile"] = self._stop_profiler(profiler)
+            self.operations[name] = entry
+            self._operation = previous
+
+    def _start_profiler(self, name: str):
+        if name != self.profile_operation:
+            return None
+        match self.profile_kind:
+            case "cprofile":
+                import cProfile
+
+                profiler = cProfile.Profile()
+                profiler.enable()
+                return profiler
+            case "tracemalloc":
+                import tracemalloc
+
+                tracemalloc.start()
+                return tracemalloc
+        return None
+
+    def _stop_profiler(self, profiler) -> dict:
+        output = self.profile_output or f"{self.profile_operation}.{self.profile_kind}"
+        if self.profile_kind == "cprofile":
+            profiler.disable()
+            profiler.dump_stats(output)
+            return {"kind": "cprofile", "output": output}
+
+        snapshot = profiler.take_snapshot()
+        current, peak = profiler.get_traced_memory()
+        profiler.stop()
+        with open(output, "w", encoding="utf-8") as f:
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+        return {
+            "kind": "tracemalloc",
+            "output": output,
+            "current_bytes": current,
+            "peak_bytes": peak,
+        }
+
+    def to_dict(self) -> dict:
+        wall, cpu = self._started
+        result = self.run.to_dict()
+        result["run"] = {
+            "wall": time.perf_counter() - wall,
+            "cpu": time.process_time() - cpu,
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+        result["operations"] = self.operations
+        return result
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+metrics = Metrics()
@@ -1,33 +1,20 @@
 class TerminalNodeRepresentation:
     def __init__(self, node, terminal_resolver, modifier_resolver, sandbox_data, sb_op):
-        if node.action_inline:
-            if not node.arg_id:
-                self.inline_modifiers = terminal_resolver.get_modifier(node.arg_type)
-                self.inline_data = modifier_resolver.resolve(
-                    node.arg_type, node.arg_value
-                )
-            else:
-                op_idx = sandbox_data.policies[node.arg_value]
-                self.inline_operation_node = sandbox_data.operation_nodes[op_idx]
-
-        self.flags_modifiers = terminal_resolver.get_modifiers_by_flag(
-            node.modifier_flags
-        )
+        info = terminal_resolver.describe(node, modifier_resolver, sandbox_data)
+        self.inline_modifiers = info.inline_modifiers
+        self.inline_data = info.inline_data
+        self.inline_operation_node = info.inline_operation_node
+        self.inline_policy = info.inline_policy
+        self.flags_modifiers = info.flags_modifiers
+        self.info = info
         self.node = node
         self.sb_op = sb_op
 
-    def __str__(self) -> str:
-        parts = []
-
-        if self.node.action_inline:
-            if self.inline_modifiers:
-                name = self.inline_modifiers["name"]
-                parts.append(f"(with {name} {self.inline_data})")
-            elif self.inline_operation_node:
-                parts.append(str(self.inline_operation_node))
+    def header(self, operation=None) -> str:
+        out = " ".join(self.info.parts)
+        if operation is None:
+            return f"(allow {out}"
+        return f"(allow {operation} {out}"
 
-        # for mod in self.flags_modifiers:
-        #     name = mod["name"]
-        #     parts.append(f"(with {name})")
-        out = " ".join(parts)
-        return f"(allow {self.sb_op} {out}"
+    def __str__(self) -> str:
+        return self.header(self.sb_op)
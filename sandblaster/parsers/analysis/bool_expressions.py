@@ -1,16 +1,29 @@
 import random
+from typing import TYPE_CHECKING, Collection, Dict, Iterator, List, Optional, Tuple
 
 import networkx as nx
 import z3
-from networkx.drawing.nx_pydot import write_dot
 
+from sandblaster.metrics import metrics
 from sandblaster.nodes.representation.non_terminal import NonTerminalRepresentation
 from sandblaster.nodes.representation.terminal import TerminalNodeRepresentation
+from sandblaster.parsers.analysis.budget import UNLIMITED, Budget
 from sandblaster.parsers.analysis.expression import build_ite_expr, ite_expr_to_nnf
+from sandblaster.parsers.analysis.ir import atom_id, from_z3
 from sandblaster.parsers.analysis.partition import backward_partition
-from sandblaster.parsers.core.profile import SandboxPayload
+from sandblaster.parsers.analysis.policies import (
+    PolicyTable,
+    policy_name,
+    policy_root,
+)
+from sandblaster.parsers.analysis.preview import PREVIEW, preview_rules
+from sandblaster.parsers.analysis.truth_table import minimize_graph
 from sandblaster.parsers.graph.graph_parser import GraphParser
-from sandblaster.parsers.analysis.spbl_printer import z3_to_sbpl_print
+from sandblaster.parsers.graph.reduction import reduce_graph
+from sandblaster.parsers.analysis.spbl_printer import Rule, print_rule
+
+if TYPE_CHECKING:
+    from sandblaster.parsers.core.profile import SandboxPayload
 
 
 def random_hex_color(seed=None):
@@ -18,8 +31,16 @@ def random_hex_color(seed=None):
     return "#{:06x}".format(rng.randint(0, 0xFFFFFF))
 
 
-def get_nnf_forms(graph, payload, filters):
+def get_nnf_forms(graph, payload, filters, dot_path=None):
     partitions = backward_partition(graph, payload)
+    if dot_path:
+        write_partitions_dot(graph, partitions, dot_path)
+    return partitions
+
+
+def write_partitions_dot(graph, partitions, dot_path):
+    from networkx.drawing.nx_pydot import write_dot
+
     sinks = [n for n in nx.topological_sort(graph) if graph.out_degree(n) == 0]
     k = []
     for s in sinks:
@@ -36,84 +57,316 @@ def get_nnf_forms(graph, payload, filters):
             graph, {node: i for node in partitions[k].nodes()}, "group"
         )
     nx.set_node_attributes(graph, {node: "bold" for node in sinks}, "style")
-    write_dot(graph, "out.dot")
-    return partitions
+    write_dot(graph, dot_path)
 
 
 def get_parsed_nodes(graph, parsed: dict, filters) -> dict:
-    unparsed_nodes = {
-        n
-        for n in nx.topological_sort(graph)
-        if graph.out_degree(n) != 0 and str(n) not in parsed
-    }
+    atoms = {graph.nodes[n]["id"] for n in graph.nodes if graph.out_degree(n) != 0}
+    unparsed_atoms = {atom for atom in atoms if atom_id(*atom) not in parsed}
+    metrics.count("resolver.hits", len(atoms) - len(unparsed_atoms))
+    metrics.count("resolver.misses", len(unparsed_atoms))
 
     new_entries = {
-        str(graph.nodes[n]["id"]): NonTerminalRepresentation(
-            *graph.nodes[n]["id"], filters
-        )
-        for n in unparsed_nodes
+        atom_id(*atom): NonTerminalRepresentation(*atom, filters)
+        for atom in unparsed_atoms
     }
 
     parsed.update(new_entries)
     return parsed
 
 
+def decompile_operations(
+    payload: "SandboxPayload",
+    filters,
+    modifier_resolver,
+    terminal_resolver,
+    parsed: dict,
+    dot_path=None,
+    budget: Budget = UNLIMITED,
+    operation_budget: Optional[float] = None,
+    operation_filter: Optional[Collection[str]] = None,
+) -> Iterator[Tuple[str, List[Rule]]]:
+    for idx in payload.ops_to_reverse:
+        sb_op = payload.sb_ops[idx]
+        if operation_filter is not None and sb_op not in operation_filter:
+            continue
+        offset = payload.op_table[idx]
+        node = payload.operation_nodes.find_operation_node_by_offset(offset)
+        if not node:
+            continue
+
+        with metrics.operation(sb_op):
+            rules = _process_graph_from_node(
+                node,
+                payload,
+                filters,
+                parsed,
+                modifier_resolver,
+                terminal_resolver,
+                sb_op,
+                dot_path,
+                budget.child(operation_budget),
+            )
+            yield sb_op, rules
+
+
+def policy_table(
+    payload: "SandboxPayload",
+    filters,
+    modifier_resolver,
+    terminal_resolver,
+    parsed: dict,
+    budget: Budget = UNLIMITED,
+    operation_budget: Optional[float] = None,
+    rules: Optional[Dict[int, List[Rule]]] = None,
+) -> PolicyTable:
+    def decompile(index: int) -> List[Rule]:
+        node = policy_root(payload, index)
+        if not node:
+            metrics.count("policies.unresolved")
+            return []
+        metrics.count("policies.decompiled")
+        return _process_graph_from_node(
+            node,
+            payload,
+            filters,
+            parsed,
+            modifier_resolver,
+            terminal_resolver,
+            policy_name(index),
+            None,
+            budget.child(operation_budget),
+        )
+
+    return PolicyTable(decompile, rules)
+
+
 def process_profile(
-    payload: SandboxPayload, filters, modifier_resolver, terminal_resolver
+    payload: "SandboxPayload",
+    filters,
+    modifier_resolver,
+    terminal_resolver,
+    dot_path=None,
+    budget: Budget = UNLIMITED,
+    operation_budget: Optional[float] = None,
+    exporter=None,
+    checkpoint=None,
+    memory=None,
+    preview=None,
 ) -> None:
     parsed = {}
+    if memory is not None:
+        parsed = memory.cache()
+        memory.on_release(filters.clear_caches)
+    if preview is not None:
+        with metrics.stage("preview"):
+            _write_preview(
+                payload, filters, modifier_resolver, terminal_resolver, parsed, preview
+            )
+    if exporter is not None:
+        exporter.write_tables(payload.regex_list, payload.global_vars)
+    policies = policy_table(
+        payload,
+        filters,
+        modifier_resolver,
+        terminal_resolver,
+        parsed,
+        budget,
+        operation_budget,
+    )
+    if checkpoint is not None:
+        _process_checkpointed(
+            payload,
+            filters,
+            modifier_resolver,
+            terminal_resolver,
+            parsed,
+            dot_path,
+            budget,
+            operation_budget,
+            exporter,
+            checkpoint,
+            memory,
+            preview,
+            policies,
+        )
+        return
+
+    for sb_op, rules in decompile_operations(
+        payload,
+        filters,
+        modifier_resolver,
+        terminal_resolver,
+        parsed,
+        dot_path,
+        budget,
+        operation_budget,
+    ):
+        lines = []
+        emitted = policies.emit(rules, parsed, lines.append)
+        for rule in rules:
+            print_rule(rule, parsed, lines.append)
+        for line in lines:
+            print(line)
+        if exporter is not None:
+            with metrics.stage("export"):
+                policies.export(exporter, emitted, parsed)
+                exporter.add_operation(sb_op, rules, parsed)
+        print("*" * 10)
+        if preview is not None:
+            preview.refine(sb_op, lines)
+        if memory is not None:
+            memory.release()
+
+
+def _process_checkpointed(
+    payload,
+    filters,
+    modifier_resolver,
+    terminal_resolver,
+    parsed,
+    dot_path,
+    budget,
+    operation_budget,
+    exporter,
+    checkpoint,
+    memory,
+    preview,
+    policies,
+) -> None:
+    for idx in payload.ops_to_reverse:
+        sb_op = payload.sb_ops[idx]
+        if checkpoint.should_run(sb_op):
+            with checkpoint.operation(sb_op) as lines:
+                for _, rules in decompile_operations(
+                    payload,
+                    filters,
+                    modifier_resolver,
+                    terminal_resolver,
+                    parsed,
+                    dot_path,
+                    budget,
+                    operation_budget,
+                    operation_filter=(sb_op,),
+                ):
+                    emitted = policies.emit(rules, parsed, lines.append)
+                    try:
+                        for rule in rules:
+                            print_rule(rule, parsed, lines.append)
+                        if exporter is not None:
+                            with metrics.stage("export"):
+                                policies.export(exporter, emitted, parsed)
+                                exporter.add_operation(sb_op, rules, parsed)
+                    except BaseException:
+                        # A failed operation's output is discarded, blocks
+                        # included, so a later operation prints them again.
+                        policies.forget(emitted)
+                        raise
+            if memory is not None:
+                memory.release()
+        output = checkpoint.output(sb_op)
+        if output is not None:
+            # Blocks printed by operations finished in an earlier run are
+            # not printed again.
+            policies.mark_emitted(output.splitlines())
+            print(output, end="")
+            print("*" * 10)
+            if preview is not None:
+                preview.refine(sb_op, output.splitlines())
+
+
+def _write_preview(
+    payload, filters, modifier_resolver, terminal_resolver, parsed, preview
+) -> None:
     for idx in payload.ops_to_reverse:
         sb_op = payload.sb_ops[idx]
         offset = payload.op_table[idx]
         node = payload.operation_nodes.find_operation_node_by_offset(offset)
         if not node:
             continue
-
-        parsed = _process_graph_from_node(
-            node, payload, filters, parsed, modifier_resolver, terminal_resolver, sb_op
+        lines: List[str] = []
+        rules = preview_rules(
+            node,
+            payload,
+            filters,
+            parsed,
+            modifier_resolver,
+            terminal_resolver,
+            sb_op,
         )
-        print("*" * 10)
+        for rule in rules:
+            print_rule(rule, parsed, lines.append)
+        preview.set(sb_op, lines, PREVIEW)
+    preview.write()
 
 
 def _process_graph_from_node(
-    node, payload, filters, parsed, modifier_resolver, terminal_resolver, sb_op
-) -> dict:
-    graph_parser = GraphParser(node)
-    graph = graph_parser.parse()
-    parsed = get_parsed_nodes(graph, parsed, filters)
-    nnf_forms = get_nnf_forms(graph, payload, filters)
-
-    for key, subgraph in nnf_forms.items():
+    node,
+    payload,
+    filters,
+    parsed,
+    modifier_resolver,
+    terminal_resolver,
+    sb_op,
+    dot_path=None,
+    budget: Budget = UNLIMITED,
+) -> List[Rule]:
+    with metrics.stage("reduce"):
+        node = reduce_graph(node)
+    with metrics.stage("graph"):
+        graph_parser = GraphParser(node)
+        graph = graph_parser.parse()
+    metrics.count("graph.nodes", graph.number_of_nodes())
+    metrics.count("graph.edges", graph.number_of_edges())
+    with metrics.stage("resolve"):
+        parsed = get_parsed_nodes(graph, parsed, filters)
+    with metrics.stage("partition"):
+        nnf_forms = get_nnf_forms(graph, payload, filters, dot_path)
+    metrics.count("partitions", len(nnf_forms))
+
+    return [
         _process_subgraph(
             subgraph,
             key,
             payload,
-            filters,
-            parsed,
             modifier_resolver,
             terminal_resolver,
             sb_op,
+            budget,
         )
+        for key, subgraph in nnf_forms.items()
+    ]
 
-    return parsed
 
+def simplify_subgraph(subgraph, budget: Budget = UNLIMITED):
+    expr = minimize_graph(subgraph)
+    if expr is not None:
+        metrics.count("simplify.truth_table")
+        return expr
 
-def _process_subgraph(
-    subgraph, key, payload, filters, parsed, modifier_resolver, terminal_resolver, sb_op
-):
+    metrics.count("simplify.z3")
     exprs = [
-        ite_expr_to_nnf(build_ite_expr(subgraph, start_node))
+        ite_expr_to_nnf(build_ite_expr(subgraph, start_node, budget), budget=budget)
         for start_node, deg in subgraph.in_degree()
         if deg == 0
     ]
+    return from_z3(ite_expr_to_nnf(z3.Or(*exprs), budget=budget))
+
 
-    merged_expr = z3.Or(*exprs)
-    final_expr = ite_expr_to_nnf(merged_expr)
+def _process_subgraph(
+    subgraph,
+    key,
+    payload,
+    modifier_resolver,
+    terminal_resolver,
+    sb_op,
+    budget: Budget = UNLIMITED,
+) -> Rule:
+    with metrics.stage("simplify"):
+        final_expr = simplify_subgraph(subgraph, budget)
 
     terminal = payload.operation_nodes.find_operation_node_by_offset(key)
     terminal_repr = TerminalNodeRepresentation(
         terminal, terminal_resolver, modifier_resolver, payload, sb_op
     )
-    print(terminal_repr)
-    z3_to_sbpl_print(final_expr, payload, filters, parsed, level=1)
-    print(")")
+    return Rule(sb_op, terminal, terminal_repr, final_expr)
@@ -0,0 +1,59 @@
+import time
+from typing import Optional
+
+
+class Budget:
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        parent: "Budget" = None,
+        step_ms: Optional[int] = None,
+    ):
+        self.deadline = time.monotonic() + seconds if seconds is not None else None
+        self.parent = parent
+        self.step_ms = (
+            step_ms if step_ms is not None or parent is None else parent.step_ms
+        )
+        self.cancelled = False
+
+    def child(self, seconds: Optional[float] = None) -> "Budget":
+        return Budget(seconds, parent=self)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def remaining(self) -> Optional[float]:
+        if self.is_cancelled():
+            return 0.0
+        remaining = None
+        if self.deadline is not None:
+            remaining = max(0.0, self.deadline - time.monotonic())
+        if self.parent is not None:
+            inherited = self.parent.remaining()
+            if inherited is not None:
+                remaining = (
+                    inherited if remaining is None else min(remaining, inherited)
+                )
+        return remaining
+
+    def remaining_ms(self, cap_ms: int) -> int:
+        if self.step_ms is not None:
+            cap_ms = self.step_ms
+        remaining = self.remaining()
+        if remaining is None:
+            return cap_ms
+        # z3 reads a timeout of 0 as "no timeout".
+        return max(1, min(cap_ms, int(remaining * 1000)))
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled or (
+            self.parent is not None and self.parent.is_cancelled()
+        )
+
+    @property
+    def exhausted(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+UNLIMITED = Budget()
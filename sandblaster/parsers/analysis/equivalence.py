@@ -0,0 +1,344 @@
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, ContextManager, Dict, List, Optional, Tuple
+
+import z3
+
+from sandblaster.nodes.terminal import NodeType, TerminalNode
+from sandblaster.parsers.analysis.budget import UNLIMITED, Budget
+from sandblaster.parsers.analysis.truth_table import (
+    MAX_TRUTH_TABLE_VARS,
+    cube_mask,
+    variable_masks,
+)
+
+AtomKey = Tuple[str, Any]
+Literal = Tuple[AtomKey, bool]
+
+
+@dataclass
+class OperationDiff:
+    operation: str
+    status: str
+    method: Optional[str] = None
+    condition: List[Literal] = field(default_factory=list)
+    decisions: Tuple[Optional[str], Optional[str]] = (None, None)
+
+
+class AtomSpace:
+    """Shared variable space of resolved (filter, argument) atoms."""
+
+    def __init__(self):
+        self._index: Dict[AtomKey, int] = {}
+        self.atoms: List[AtomKey] = []
+
+    def index(self, key: AtomKey) -> int:
+        idx = self._index.get(key)
+        if idx is None:
+            idx = len(self.atoms)
+            self._index[key] = idx
+            self.atoms.append(key)
+        return idx
+
+
+class ProfileAtoms:
+    def __init__(self, profile, space: AtomSpace):
+        self.profile = profile
+        self.space = space
+        self._atoms: Dict[Tuple[int, int], int] = {}
+        self._labels: Dict[int, str] = {}
+
+    def atom(self, node) -> int:
+        key = (node.filter_id, node.argument_id)
+        idx = self._atoms.get(key)
+        if idx is None:
+            name, argument = self.profile.filter_resolver.resolve(*key)
+            if name is None:
+                name, argument = f"filter-{key[0]}", key[1]
+            elif isinstance(argument, list):
+                argument = tuple(argument)
+            idx = self.space.index((name, argument))
+            self._atoms[key] = idx
+        return idx
+
+    def label(self, node: TerminalNode) -> str:
+        label = self._labels.get(node.offset)
+        if label is None:
+            label = terminal_label(
+                node,
+                self.profile.terminal_resolver,
+                self.profile.modifier_resolver,
+            )
+            self._labels[node.offset] = label
+        return label
+
+
+def terminal_label(node: TerminalNode, terminal_resolver, modifier_resolver) -> str:
+    parts = ["deny" if node.type == NodeType.DENY else "allow"]
+    if node.action_inline:
+        if not node.arg_id:
+            name = terminal_resolver.get_modifier(node.arg_type)["name"]
+            value = modifier_resolver.resolve(node.arg_type, node.arg_value)
+            parts.append(f"(with {name} {value})")
+        else:
+            parts.append(f"(policy {node.arg_value})")
+    names = sorted(
+        m["name"] for m in terminal_resolver.get_modifiers_by_flag(node.modifier_flags)
+    )
+    parts.extend(f"(with {name})" for name in names)
+    return " ".join(parts)
+
+
+def _post_order(root) -> List[Any]:
+    order = []
+    seen = set()
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            order.append(node)
+            continue
+        if node.offset in seen:
+            continue
+        seen.add(node.offset)
+        stack.append((node, True))
+        if not isinstance(node, TerminalNode):
+            stack.append((node.unmatch, False))
+            stack.append((node.match, False))
+    return order
+
+
+class DecisionFunction:
+    """Operation decision graph mapped onto a shared atom space."""
+
+    def __init__(self, root, atoms: ProfileAtoms):
+        self.nodes = _post_order(root)
+        self.root = root
+        self.atom: Dict[int, int] = {}
+        self.label: Dict[int, str] = {}
+        for node in self.nodes:
+            if isinstance(node, TerminalNode):
+                self.label[node.offset] = atoms.label(node)
+            else:
+                self.atom[node.offset] = atoms.atom(node)
+        self.support = set(self.atom.values())
+        self.labels = set(self.label.values())
+
+    def signature(self, table: Dict[Any, int]) -> int:
+        sig: Dict[int, int] = {}
+        for node in self.nodes:
+            if isinstance(node, TerminalNode):
+                key = ("T", self.label[node.offset])
+            else:
+                match = sig[node.match.offset]
+                unmatch = sig[node.unmatch.offset]
+                if match == unmatch:
+                    sig[node.offset] = match
+                    continue
+                key = ("N", self.atom[node.offset], match, unmatch)
+            sig[node.offset] = table.setdefault(key, len(table))
+        return sig[self.root.offset]
+
+    def truth_table(self, var_masks: Dict[int, int], full: int) -> Dict[str, int]:
+        table: Dict[int, Dict[str, int]] = {}
+        for node in self.nodes:
+            if isinstance(node, TerminalNode):
+                table[node.offset] = {self.label[node.offset]: full}
+                continue
+            x = var_masks[self.atom[node.offset]]
+            nx_ = full & ~x
+            match = table[node.match.offset]
+            unmatch = table[node.unmatch.offset]
+            merged = {}
+            for lbl in match.keys() | unmatch.keys():
+                mask = (x & match.get(lbl, 0)) | (nx_ & unmatch.get(lbl, 0))
+                if mask:
+                    merged[lbl] = mask
+            table[node.offset] = merged
+        return table[self.root.offset]
+
+    def z3_exprs(self, variables: Dict[int, Any]) -> Dict[str, Any]:
+        false = z3.BoolVal(False)
+        exprs: Dict[int, Dict[str, Any]] = {}
+        for node in self.nodes:
+            if isinstance(node, TerminalNode):
+                exprs[node.offset] = {self.label[node.offset]: z3.BoolVal(True)}
+                continue
+            cond = variables[self.atom[node.offset]]
+            match = exprs[node.match.offset]
+            unmatch = exprs[node.unmatch.offset]
+            exprs[node.offset] = {
+                lbl: z3.If(cond, match.get(lbl, false), unmatch.get(lbl, false))
+                for lbl in match.keys() | unmatch.keys()
+            }
+        return exprs[self.root.offset]
+
+    def evaluate(self, assignment: Dict[int, bool]) -> str:
+        node = self.root
+        while not isinstance(node, TerminalNode):
+            if assignment.get(self.atom[node.offset], False):
+                node = node.match
+            else:
+                node = node.unmatch
+        return self.label[node.offset]
+
+
+def _compare_truth_tables(fa, fb, support):
+    variables = sorted(support)
+    masks, full = variable_masks(len(variables))
+    var_masks = dict(zip(variables, masks))
+    ta = fa.truth_table(var_masks, full)
+    tb = fb.truth_table(var_masks, full)
+    differs = 0
+    for lbl in ta.keys() | tb.keys():
+        differs |= ta.get(lbl, 0) ^ tb.get(lbl, 0)
+    if not differs:
+        return None
+
+    minterm = (differs & -differs).bit_length() - 1
+    cube = {i: bool(minterm >> i & 1) for i in range(len(variables))}
+    for i in range(len(variables)):
+        value = cube.pop(i)
+        if cube_mask(cube, masks, full) & ~differs:
+            cube[i] = value
+    return {variables[i]: value for i, value in cube.items()}
+
+
+def _compare_z3(fa, fb, support, timeout_ms):
+    variables = {i: z3.Bool(str(i)) for i in support}
+    ea = fa.z3_exprs(variables)
+    eb = fb.z3_exprs(variables)
+    false = z3.BoolVal(False)
+    differs = z3.Or(
+        *[
+            z3.Xor(ea.get(lbl, false), eb.get(lbl, false))
+            for lbl in ea.keys() | eb.keys()
+        ]
+    )
+
+    solver = z3.Solver()
+    solver.set("timeout", timeout_ms)
+    solver.add(differs)
+    result = solver.check()
+    if result == z3.unsat:
+        return None
+    if result != z3.sat:
+        raise TimeoutError
+
+    model = solver.model()
+    cube = {
+        i: z3.is_true(model.eval(variables[i], model_completion=True))
+        for i in sorted(support)
+    }
+    for i in list(cube):
+        value = cube.pop(i)
+        solver = z3.Solver()
+        solver.set("timeout", timeout_ms)
+        solver.add(z3.Not(differs))
+        solver.add(*[v if val else z3.Not(v) for v, val in _literals(cube, variables)])
+        if solver.check() != z3.unsat:
+            cube[i] = value
+    return cube
+
+
+def _literals(cube, variables):
+    return [(variables[i], value) for i, value in cube.items()]
+
+
+def compare_functions(
+    fa: DecisionFunction,
+    fb: DecisionFunction,
+    signatures: Dict[Any, int],
+    timeout_ms: int = 2000,
+) -> Tuple[str, str, Optional[Dict[int, bool]]]:
+    if fa.signature(signatures) == fb.signature(signatures):
+        return "equal", "canonical", None
+
+    support = fa.support | fb.support
+    if len(support) <= MAX_TRUTH_TABLE_VARS:
+        cube = _compare_truth_tables(fa, fb, support)
+        method = "truth-table"
+    else:
+        try:
+            cube = _compare_z3(fa, fb, support, timeout_ms)
+        except TimeoutError:
+            return "unknown", "z3", None
+        method = "z3"
+
+    if cube is None:
+        return "equal", method, None
+    return "different", method, cube
+
+
+def diff_profiles(
+    profile_a,
+    profile_b,
+    timeout_ms: int = 2000,
+    budget_s: Optional[float] = None,
+    budget: Budget = UNLIMITED,
+    lock: ContextManager = nullcontext(),
+) -> List[OperationDiff]:
+    space = AtomSpace()
+    atoms_a = ProfileAtoms(profile_a, space)
+    atoms_b = ProfileAtoms(profile_b, space)
+    roots_a = _operation_roots(profile_a.payload)
+    roots_b = _operation_roots(profile_b.payload)
+    signatures: Dict[Any, int] = {}
+    deadline = time.monotonic() + budget_s if budget_s is not None else None
+
+    results = []
+    for op in list(roots_a) + [op for op in roots_b if op not in roots_a]:
+        if op not in roots_b:
+            results.append(OperationDiff(op, "only-a"))
+            continue
+        if op not in roots_a:
+            results.append(OperationDiff(op, "only-b"))
+            continue
+        if budget.exhausted or (deadline is not None and time.monotonic() > deadline):
+            results.append(OperationDiff(op, "unknown", "budget"))
+            continue
+
+        fa = DecisionFunction(roots_a[op], atoms_a)
+        fb = DecisionFunction(roots_b[op], atoms_b)
+        with lock:
+            status, method, cube = compare_functions(fa, fb, signatures, timeout_ms)
+        diff = OperationDiff(op, status, method)
+        if cube is not None:
+            diff.condition = [(space.atoms[i], value) for i, value in cube.items()]
+            diff.decisions = (fa.evaluate(cube), fb.evaluate(cube))
+        results.append(diff)
+    return results
+
+
+def _operation_roots(payload) -> Dict[str, Any]:
+    roots = {}
+    for idx in payload.ops_to_reverse:
+        node = payload.operation_nodes.find_operation_node_by_offset(
+            payload.op_table[idx]
+        )
+        if node:
+            roots[payload.sb_ops[idx]] = node
+    return roots
+
+
+def format_atom(key: AtomKey) -> str:
+    name, argument = key
+    if isinstance(argument, tuple):
+        if len(argument) == 1:
+            return f'({name} "{argument[0]}")'
+        inner = " ".join(f'({name} "{a}")' for a in argument)
+        return f"(require-any {inner})"
+    return f"({name} {argument})"
+
+
+def format_condition(condition: List[Literal]) -> str:
+    terms = [
+        format_atom(key) if value else f"(require-not {format_atom(key)})"
+        for key, value in condition
+    ]
+    if not terms:
+        return "(require-all)"
+    if len(terms) == 1:
+        return terms[0]
+    return "(require-all " + " ".join(terms) + ")"
@@ -1,42 +1,134 @@
 import networkx as nx
 import z3
 
+from sandblaster.metrics import metrics
+from sandblaster.parsers.analysis.budget import UNLIMITED, Budget
+from sandblaster.parsers.analysis.ir import atom_id, z3_atom
+from sandblaster.parsers.analysis.z3_lock import Z3_LOCK
+
+TINY_EXPR_SIZE = 24
+HUGE_EXPR_SIZE = 4000
+HUGE_VAR_COUNT = 96
+
+PRINTABLE_KINDS = {
+    z3.Z3_OP_TRUE,
+    z3.Z3_OP_FALSE,
+    z3.Z3_OP_AND,
+    z3.Z3_OP_OR,
+    z3.Z3_OP_NOT,
+    z3.Z3_OP_ITE,
+    z3.Z3_OP_UNINTERPRETED,
+}
+
 
 def make_tactic_with_timeout(timeout_ms):
-    return z3.Then(
-        z3.With("cofactor-term-ite", timeout=timeout_ms),
-        z3.With("aig", timeout=timeout_ms),
-        z3.With("qe", timeout=timeout_ms),
-        z3.Tactic("nnf", timeout=timeout_ms),
-        z3.With("ctx-simplify", timeout=timeout_ms),
+    return z3.TryFor(
+        z3.Then(
+            z3.Tactic("cofactor-term-ite"),
+            z3.Tactic("aig"),
+            z3.Tactic("qe"),
+            z3.Tactic("nnf"),
+            z3.Tactic("ctx-simplify"),
+        ),
+        timeout_ms,
     )
 
 
-def make_fallback_tactic():
-    return z3.Then(
-        z3.Tactic("cofactor-term-ite"),
-        z3.Tactic("aig"),
-        z3.Tactic("qe"),
-        z3.Tactic("nnf"),
-        z3.Tactic("simplify"),
-    )
+def make_fallback_tactic(timeout_ms):
+    return z3.TryFor(z3.Then(z3.Tactic("simplify"), z3.Tactic("nnf")), timeout_ms)
+
+
+def reset_z3_context() -> None:
+    # Later expressions go to a fresh global context; the old one is freed
+    # once nothing built in it is referenced any more. z3 has no public API
+    # for this, so it relies on main_ctx() recreating its private _main_ctx
+    # global when that is None.
+    with Z3_LOCK:
+        z3.z3._main_ctx = None
+
+
+def expr_stats(expr):
+    seen = set()
+    variables = set()
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        eid = e.get_id()
+        if eid in seen:
+            continue
+        seen.add(eid)
+        if z3.is_const(e) and e.decl().kind() == z3.Z3_OP_UNINTERPRETED:
+            variables.add(eid)
+        stack.extend(e.children())
+    return len(seen), len(variables)
+
+
+def is_printable(expr) -> bool:
+    seen = set()
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        eid = e.get_id()
+        if eid in seen:
+            continue
+        seen.add(eid)
+        if e.decl().kind() not in PRINTABLE_KINDS:
+            return False
+        stack.extend(e.children())
+    return True
+
+
+def select_strategy(expr) -> str:
+    size, variables = expr_stats(expr)
+    if size <= TINY_EXPR_SIZE:
+        return "tiny"
+    if size >= HUGE_EXPR_SIZE or variables >= HUGE_VAR_COUNT:
+        return "huge"
+    return "medium"
 
 
-def ite_expr_to_nnf(expr, timeout_ms=600):
+def _apply(tactic, expr):
     goal = z3.Goal()
     goal.add(expr)
+    metrics.count("z3.tactic_calls")
+    result = tactic(goal)
+    return result[0].as_expr()
+
+
+def ite_expr_to_nnf(expr, timeout_ms=600, budget: Budget = UNLIMITED):
+    if budget.exhausted:
+        metrics.count("z3.degraded")
+        return expr
+
+    strategy = select_strategy(expr)
+    metrics.count(f"z3.strategy.{strategy}")
+    if strategy == "tiny":
+        simplified = z3.simplify(expr)
+        if is_printable(simplified):
+            return simplified
+        strategy = "medium"
+
+    if strategy == "medium":
+        try:
+            return _apply(
+                make_tactic_with_timeout(budget.remaining_ms(timeout_ms)), expr
+            )
+        except z3.Z3Exception:
+            metrics.count("z3.timeouts")
+        # The medium tactic may have used up the rest of the budget.
+        if budget.exhausted:
+            metrics.count("z3.degraded")
+            return expr
 
     try:
-        tactic = make_tactic_with_timeout(timeout_ms)
-        result = tactic(goal)
-        return result[0].as_expr()
+        return _apply(make_fallback_tactic(budget.remaining_ms(timeout_ms)), expr)
     except z3.Z3Exception:
-        fallback_tactic = make_fallback_tactic()
-        result = fallback_tactic(goal)
-        return result[0].as_expr()
+        metrics.count("z3.timeouts")
+        metrics.count("z3.degraded")
+        return expr
 
 
-def build_ite_expr(graph, start_node):
+def build_ite_expr(graph, start_node, budget: Budget = UNLIMITED):
     node_to_expr = {}
 
     for node in reversed(list(nx.topological_sort(graph))):
@@ -44,8 +136,7 @@ def build_ite_expr(graph, start_node):
             node_to_expr[node] = z3.BoolVal(True)
             continue
 
-        cond_id = graph.nodes[node].get("id")
-        condition = z3.Bool(str(cond_id))
+        condition = z3_atom(atom_id(*graph.nodes[node].get("id")))
 
         true_expr = None
         false_expr = None
@@ -63,6 +154,6 @@ def build_ite_expr(graph, start_node):
         false_expr = false_expr if false_expr is not None else z3.BoolVal(False)
 
         ite_expr = z3.If(condition, true_expr, false_expr)
-        node_to_expr[node] = ite_expr_to_nnf(ite_expr)
+        node_to_expr[node] = ite_expr_to_nnf(ite_expr, budget=budget)
 
     return node_to_expr[start_node]
@@ -0,0 +1,220 @@
+import weakref
+from typing import Dict, List, Tuple
+
+
+def atom_id(filter_id: int, argument_id: int) -> int:
+    return filter_id << 16 | argument_id
+
+
+def atom_key(atom: int) -> Tuple[int, int]:
+    return atom >> 16, atom & 0xFFFF
+
+
+class Expr:
+    __slots__ = ("__weakref__",)
+    _field_names: Tuple[str, ...] = ()
+    _interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def _intern(cls, *fields):
+        key = (cls, *fields)
+        node = Expr._interned.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            for name, value in zip(cls._field_names, fields):
+                object.__setattr__(node, name, value)
+            Expr._interned[key] = node
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        # Pickled as a flat post-order node table, so deep expressions cost
+        # no recursion on either side.
+        return from_table, (node_table(self),)
+
+    def _fields(self) -> tuple:
+        return tuple(getattr(self, name) for name in self._field_names)
+
+    @property
+    def children(self) -> tuple:
+        return ()
+
+    def __repr__(self):
+        args = ", ".join(map(repr, self.children or self._fields()))
+        return f"{type(self).__name__}({args})"
+
+
+class Const(Expr):
+    __slots__ = ("value",)
+    _field_names = __slots__
+
+    def __new__(cls, value: bool):
+        return cls._intern(bool(value))
+
+
+class Atom(Expr):
+    __slots__ = ("id",)
+    _field_names = __slots__
+
+    def __new__(cls, id: int):
+        return cls._intern(id)
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return atom_key(self.id)
+
+
+class Not(Expr):
+    __slots__ = ("arg",)
+    _field_names = __slots__
+
+    def __new__(cls, arg: Expr):
+        return cls._intern(arg)
+
+    @property
+    def children(self) -> tuple:
+        return (self.arg,)
+
+
+class _Nary(Expr):
+    __slots__ = ("args",)
+    _field_names = __slots__
+
+    def __new__(cls, *args: Expr):
+        return cls._intern(args)
+
+    @property
+    def children(self) -> tuple:
+        return self.args
+
+
+class And(_Nary):
+    __slots__ = ()
+
+
+class Or(_Nary):
+    __slots__ = ()
+
+
+class Ite(Expr):
+    __slots__ = ("cond", "then", "otherwise")
+    _field_names = __slots__
+
+    def __new__(cls, cond: Expr, then: Expr, otherwise: Expr):
+        return cls._intern(cond, then, otherwise)
+
+    @property
+    def children(self) -> tuple:
+        return (self.cond, self.then, self.otherwise)
+
+
+TRUE = Const(True)
+FALSE = Const(False)
+
+
+def post_order(expr: Expr):
+    seen = set()
+    stack = [(expr, False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            yield node
+            continue
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node.children))
+
+
+def node_table(expr: Expr) -> List[tuple]:
+    index: Dict[int, int] = {}
+    rows = []
+    for node in post_order(expr):
+        match node:
+            case Const() | Atom():
+                row = (type(node), *node._fields())
+            case _:
+                row = (type(node), *(index[id(child)] for child in node.children))
+        index[id(node)] = len(rows)
+        rows.append(row)
+    return rows
+
+
+def from_table(rows: List[tuple]) -> Expr:
+    nodes: List[Expr] = []
+    for cls, *fields in rows:
+        if cls in (Const, Atom):
+            nodes.append(cls(*fields))
+        else:
+            nodes.append(cls(*(nodes[i] for i in fields)))
+    return nodes[-1]
+
+
+def from_z3(expr) -> Expr:
+    import z3
+
+    converted: Dict[int, Expr] = {}
+    stack = [(expr, False)]
+    while stack:
+        e, done = stack.pop()
+        eid = e.get_id()
+        if eid in converted:
+            continue
+        children = e.children()
+        if not done:
+            stack.append((e, True))
+            stack.extend((child, False) for child in reversed(children))
+            continue
+        args = [converted[child.get_id()] for child in children]
+        kind = e.decl().kind()
+        match kind:
+            case z3.Z3_OP_TRUE:
+                node = TRUE
+            case z3.Z3_OP_FALSE:
+                node = FALSE
+            case z3.Z3_OP_AND:
+                node = And(*args)
+            case z3.Z3_OP_OR:
+                node = Or(*args)
+            case z3.Z3_OP_NOT:
+                node = Not(*args)
+            case z3.Z3_OP_ITE:
+                node = Ite(*args)
+            case z3.Z3_OP_UNINTERPRETED:
+                node = Atom(int(e.decl().name()))
+            case _:
+                raise ValueError(f"Unsupported Z3 expression: {e} (decl kind: {kind})")
+        converted[eid] = node
+    return converted[expr.get_id()]
+
+
+def z3_atom(atom: int):
+    import z3
+
+    return z3.Bool(str(atom))
+
+
+def to_z3(expr: Expr):
+    import z3
+
+    converted = {}
+    for node in post_order(expr):
+        args = [converted[id(child)] for child in node.children]
+        match node:
+            case Const():
+                result = z3.BoolVal(node.value)
+            case Atom():
+                result = z3_atom(node.id)
+            case Not():
+                result = z3.Not(*args)
+            case And():
+                result = z3.And(*args)
+            case Or():
+                result = z3.Or(*args)
+            case Ite():
+                result = z3.If(*args)
+        converted[id(node)] = result
+    return converted[id(expr)]
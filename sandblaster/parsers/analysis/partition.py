@@ -1,5 +1,11 @@
+import logging
+
 import networkx as nx
 
+from sandblaster.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
 
 def compute_graph(graph, sink, other_sink, visited):
     guards = {pred for pred in graph.predecessors(other_sink)}
@@ -48,7 +54,8 @@ def backward_partition(graph, payload):
     total = len(sinks)
     i = 0
     while sinks:
-        print(f"{i}/{total}")
+        logger.debug(f"{i}/{total}")
+        metrics.count("partition.iterations")
         i += 1
         candidates = []
         for idx, sink in enumerate(sinks):
@@ -0,0 +1,110 @@
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sandblaster.parsers.analysis.spbl_printer import CHILD_INDENT, Rule, print_rule
+
+DEFINE = "(define-policy "
+DEFINED = re.compile(r"\(define-policy policy-(\d+)$")
+NAME = re.compile(r"policy-(\d+)")
+
+
+def policy_name(index: int) -> str:
+    return f"policy-{index}"
+
+
+def policy_index(name: str) -> Optional[int]:
+    match = NAME.fullmatch(name)
+    return int(match.group(1)) if match else None
+
+
+def policy_root(payload, index: int):
+    if not 0 <= index < len(payload.policies):
+        return None
+    return payload.operation_nodes.find_operation_node_by_offset(
+        payload.policies[index]
+    )
+
+
+class PolicyTable:
+    """Inline policies decompiled once per index and printed as named blocks."""
+
+    def __init__(
+        self,
+        decompile: Callable[[int], Optional[List[Rule]]],
+        rules: Optional[Dict[int, List[Rule]]] = None,
+    ):
+        # decompile returns None for a policy it cannot provide, leaving the
+        # references to it unresolved. Documents rendered from one profile
+        # may share a rules cache while each tracks its own printed blocks.
+        self._decompile = decompile
+        self._rules: Dict[int, List[Rule]] = {} if rules is None else rules
+        self._emitted: Set[int] = set()
+        self._exported: Set[int] = set()
+
+    def rules(self, index: int) -> Optional[List[Rule]]:
+        rules = self._rules.get(index)
+        if rules is None:
+            rules = self._decompile(index)
+            if rules is not None:
+                self._rules[index] = rules
+        return rules
+
+    def pending(self, rules: Iterable[Rule]) -> List[int]:
+        # Depth-first over policy references, dependencies first, so every
+        # block is printed after the blocks it refers to, cycles aside.
+        order: List[int] = []
+        emitted = set(self._emitted)
+
+        def visit(rules):
+            for rule in rules:
+                index = rule.decision.inline_policy
+                if index is None or index in self._emitted:
+                    continue
+                policy = self.rules(index)
+                if policy is None:
+                    continue
+                self._emitted.add(index)
+                visit(policy)
+                order.append(index)
+
+        try:
+            visit(rules)
+        except BaseException:
+            self._emitted = emitted
+            raise
+        return order
+
+    def emit(
+        self, rules: Iterable[Rule], parsed: dict, output_func: Callable[[str], None]
+    ) -> List[int]:
+        # The returned blocks count as printed from now on; a caller that
+        # drops the output must hand them back to forget().
+        indices = self.pending(rules)
+        for index in indices:
+            output_func(f"{DEFINE}{policy_name(index)}")
+            for rule in self._rules[index]:
+                print_rule(
+                    rule,
+                    parsed,
+                    lambda line: output_func(CHILD_INDENT + line),
+                    rule.decision.header(),
+                )
+            output_func(")")
+        return indices
+
+    def forget(self, indices: Iterable[int]) -> None:
+        self._emitted.difference_update(indices)
+
+    def export(self, exporter, indices: Iterable[int], parsed: dict) -> None:
+        # Policies are exported as pseudo-operations named policy-<n>, ahead
+        # of the first operation that refers to them.
+        for index in indices:
+            if index not in self._exported:
+                exporter.add_operation(policy_name(index), self._rules[index], parsed)
+                self._exported.add(index)
+
+    def mark_emitted(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            match = DEFINED.match(line)
+            if match:
+                self._emitted.add(int(match.group(1)))
@@ -0,0 +1,159 @@
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from sandblaster.fileio import write_atomic
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.nodes.representation.non_terminal import NonTerminalRepresentation
+from sandblaster.nodes.representation.terminal import TerminalNodeRepresentation
+from sandblaster.nodes.terminal import NodeType
+from sandblaster.parsers.analysis.ir import (
+    FALSE,
+    TRUE,
+    And,
+    Atom,
+    Const,
+    Expr,
+    Ite,
+    Not,
+    Or,
+    atom_id,
+)
+from sandblaster.parsers.analysis.spbl_printer import Rule
+from sandblaster.parsers.graph.reduction import reduce_graph, topological_order
+
+PREVIEW, REFINED = "preview", "refined"
+# Refinements are batched: the file is rewritten once this many operations
+# were refined or this many seconds passed since the last write.
+REWRITE_OPERATIONS = 16
+REWRITE_SECONDS = 2.0
+
+
+def if_form(cond: Expr, then: Expr, otherwise: Expr) -> Expr:
+    if then is otherwise:
+        return then
+    match then, otherwise:
+        case Const(value=True), Const(value=False):
+            return cond
+        case Const(value=False), Const(value=True):
+            return Not(cond)
+        case Const(value=True), _:
+            return Or(cond, otherwise)
+        case Const(value=False), _:
+            return And(Not(cond), otherwise)
+        case _, Const(value=True):
+            return Or(Not(cond), then)
+        case _, Const(value=False):
+            return And(cond, then)
+    return Ite(cond, then, otherwise)
+
+
+def preview_conditions(root) -> Dict[int, Expr]:
+    # Walks the decision graph once per allow terminal, turning every test
+    # into an if-form over its two branches; no partitioning and no z3.
+    order = topological_order(root)
+    terminals = [
+        node
+        for node in order
+        if not isinstance(node, NonTerminalNode) and node.type == NodeType.ALLOW
+    ]
+    conditions = {}
+    for terminal in terminals:
+        exprs: Dict[int, Expr] = {}
+        for node in reversed(order):
+            if isinstance(node, NonTerminalNode):
+                exprs[node.offset] = if_form(
+                    Atom(atom_id(node.filter_id, node.argument_id)),
+                    exprs[node.match.offset],
+                    exprs[node.unmatch.offset],
+                )
+            else:
+                exprs[node.offset] = TRUE if node is terminal else FALSE
+        conditions[terminal.offset] = exprs[root.offset]
+    return conditions
+
+
+def preview_rules(
+    node,
+    payload,
+    filters,
+    parsed,
+    modifier_resolver,
+    terminal_resolver,
+    sb_op,
+) -> List[Rule]:
+    root = reduce_graph(node)
+    if not isinstance(root, NonTerminalNode):
+        return []
+    for test in topological_order(root):
+        if isinstance(test, NonTerminalNode):
+            atom = atom_id(test.filter_id, test.argument_id)
+            if atom not in parsed:
+                parsed[atom] = NonTerminalRepresentation(
+                    test.filter_id, test.argument_id, filters
+                )
+
+    rules = []
+    for offset, expr in preview_conditions(root).items():
+        terminal = payload.operation_nodes.find_operation_node_by_offset(offset)
+        decision = TerminalNodeRepresentation(
+            terminal, terminal_resolver, modifier_resolver, payload, sb_op
+        )
+        rules.append(Rule(sb_op, terminal, decision, expr))
+    return rules
+
+
+class PreviewDocument:
+    def __init__(
+        self,
+        path: str,
+        rewrite_operations: int = REWRITE_OPERATIONS,
+        rewrite_seconds: float = REWRITE_SECONDS,
+    ):
+        self.path = Path(path)
+        self.rewrite_operations = rewrite_operations
+        self.rewrite_seconds = rewrite_seconds
+        self.sections: Dict[str, Tuple[str, List[str]]] = {}
+        self.unwritten = 0
+        self.written_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def set(self, operation: str, lines: List[str], quality: str) -> None:
+        self.sections[operation] = (quality, lines)
+        self.unwritten += 1
+
+    def refine(self, operation: str, lines: List[str]) -> None:
+        self.set(operation, lines, REFINED)
+        if (
+            self.unwritten >= self.rewrite_operations
+            or time.monotonic() - self.written_at >= self.rewrite_seconds
+        ):
+            self.write()
+
+    def flush(self) -> None:
+        if self.unwritten:
+            self.write()
+
+    @property
+    def pending(self) -> List[str]:
+        return [op for op, (quality, _) in self.sections.items() if quality == PREVIEW]
+
+    def render(self) -> str:
+        out = [
+            f"; {len(self.pending)} of {len(self.sections)} operations "
+            "at preview quality"
+        ]
+        for operation, (quality, lines) in self.sections.items():
+            out.append(f"; {operation}: {quality}")
+            out.extend(lines)
+        return "".join(f"{line}\n" for line in out)
+
+    def write(self) -> None:
+        write_atomic(self.path, self.render())
+        self.unwritten = 0
+        self.written_at = time.monotonic()
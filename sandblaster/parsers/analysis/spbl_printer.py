@@ -1,66 +1,140 @@
-import z3
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
+from sandblaster.metrics import metrics
+from sandblaster.nodes.representation.terminal import TerminalNodeRepresentation
+from sandblaster.nodes.terminal import TerminalNode
+from sandblaster.parsers.analysis.ir import (
+    And,
+    Atom,
+    Const,
+    Expr,
+    Ite,
+    Not,
+    Or,
+    post_order,
+)
 
-def z3_to_sbpl_print(expr, payload, filters, mapping, level=0, output_func=print):
-    indent = " " * level
+CHILD_INDENT = " " * 2
+
+HEADS = {And: "(require-all", Or: "(require-any", Not: "(require-not", Ite: "(if"}
+
+
+@dataclass(slots=True)
+class Rule:
+    operation: str
+    terminal: TerminalNode
+    decision: TerminalNodeRepresentation
+    expr: Expr
 
-    def emit(line: str):
-        output_func(f"{indent}{line}")
 
-    decl_kind = expr.decl().kind()
-    args = expr.children()
-
-    match decl_kind:
-        case z3.Z3_OP_TRUE:
-            emit("allow")
-        case z3.Z3_OP_FALSE:
-            emit("deny")
-        case z3.Z3_OP_AND:
-            emit("(require-all")
-            for arg in args:
-                z3_to_sbpl_print(arg, payload, filters, mapping, level + 2, output_func)
-            emit(")")
-
-        case z3.Z3_OP_OR:
-            emit("(require-any")
-            for arg in args:
-                z3_to_sbpl_print(arg, payload, filters, mapping, level + 2, output_func)
-            emit(")")
-
-        case z3.Z3_OP_NOT:
-            emit("(require-not")
-            z3_to_sbpl_print(args[0], payload, filters, mapping, level + 2, output_func)
-            emit(")")
-
-        case z3.Z3_OP_ITE:
-            emit("(if")
-            z3_to_sbpl_print(
-                args[0], payload, filters, mapping, level + 2, output_func
-            )  # condition
-            z3_to_sbpl_print(
-                args[1], payload, filters, mapping, level + 2, output_func
-            )  # then
-            z3_to_sbpl_print(
-                args[2], payload, filters, mapping, level + 2, output_func
-            )  # else
-            emit(")")
-        case z3.Z3_OP_UNINTERPRETED:
-            name = expr.decl().name()
-            node = mapping[name]
-            if isinstance(node.argument, list) and len(node.argument) > 1:
-                out = (
-                    ["(require-any"]
-                    + [" " * 2 + f'({node.filter} "{k}")' for k in node.argument]
-                    + [")"]
-                )
-                for a in out:
-                    emit(a)
-            elif isinstance(node.argument, list) and len(node.argument) == 1:
-                emit(f'({node.filter} "{node.argument[0]}")')
-            else:
-                emit(f"({node.filter} {node.argument})")
-
-        case _:
-            raise ValueError(
-                f"Unsupported Z3 expression: {expr} (decl kind: {decl_kind})"
+class SbplRenderer:
+    def __init__(self, mapping, prefix: str = "node"):
+        self.mapping = mapping
+        self.prefix = prefix
+        self._names: Dict[int, str] = {}
+
+    def atom_lines(self, atom: Atom) -> List[str]:
+        node = self.mapping[atom.id]
+        if isinstance(node.argument, list) and len(node.argument) > 1:
+            return (
+                ["(require-any"]
+                + [CHILD_INDENT + f'({node.filter} "{k}")' for k in node.argument]
+                + [")"]
             )
+        if isinstance(node.argument, list) and len(node.argument) == 1:
+            return [f'({node.filter} "{node.argument[0]}")']
+        return [f"({node.filter} {node.argument})"]
+
+    def leaf_lines(self, expr: Expr) -> Optional[List[str]]:
+        match expr:
+            case Const(value=True):
+                return ["allow"]
+            case Const(value=False):
+                return ["deny"]
+            case Atom():
+                return self.atom_lines(expr)
+            case And() | Or() | Not() | Ite():
+                return None
+        raise ValueError(f"Unsupported expression: {expr}")
+
+    def iter_lines(self, expr: Expr, level: int = 0) -> Iterator[str]:
+        # Nodes are expanded on the fly and indented as they are written, so
+        # nothing but the output itself grows with the nesting depth.
+        stack = [(expr, level, True)]
+        while stack:
+            entry = stack.pop()
+            if isinstance(entry, str):
+                yield entry
+                continue
+            expr, level, top = entry
+            indent = CHILD_INDENT * level
+            if not top and id(expr) in self._names:
+                yield indent + self._names[id(expr)]
+                continue
+            leaf = self.leaf_lines(expr)
+            if leaf is not None:
+                yield from (indent + line for line in leaf)
+                continue
+            yield indent + HEADS[type(expr)]
+            stack.append(indent + ")")
+            stack.extend((child, level + 1, False) for child in reversed(expr.children))
+
+    def shared(self, order: List[Expr]) -> List[Expr]:
+        parents: Dict[int, int] = {}
+        for expr in order:
+            for cid in {id(child) for child in expr.children}:
+                parents[cid] = parents.get(cid, 0) + 1
+        return [
+            expr
+            for expr in order
+            if parents.get(id(expr), 0) > 1 and self.leaf_lines(expr) is None
+        ]
+
+    def render(self, expr: Expr) -> Tuple[List[str], List[str]]:
+        shared = self.shared(list(post_order(expr)))
+        if shared:
+            metrics.count("print.factored")
+
+        # Post-order: a definition only refers to names defined before it.
+        definitions = []
+        for node in shared:
+            name = f"{self.prefix}-{len(self._names)}"
+            definitions.append(f"(define {name}")
+            definitions.extend(self.iter_lines(node, 1))
+            definitions.append(")")
+            self._names[id(node)] = name
+        return definitions, list(self.iter_lines(expr))
+
+
+def render_sbpl(
+    expr: Expr, mapping, prefix: str = "node"
+) -> Tuple[List[str], List[str]]:
+    return SbplRenderer(mapping, prefix).render(expr)
+
+
+def print_sbpl(expr: Expr, mapping, level=0, output_func=print):
+    indent = " " * level
+    definitions, body = render_sbpl(expr, mapping)
+    for line in definitions:
+        output_func(line)
+    for line in body:
+        output_func(f"{indent}{line}")
+
+
+def print_rule(
+    rule: Rule,
+    parsed: dict,
+    output_func: Callable[[str], None] = print,
+    header: Optional[str] = None,
+) -> None:
+    with metrics.stage("print"):
+        definitions, body = render_sbpl(
+            rule.expr, parsed, f"{rule.operation}-{rule.terminal.offset}"
+        )
+        for line in definitions:
+            output_func(line)
+        output_func(str(rule.decision) if header is None else header)
+        for line in body:
+            output_func(f" {line}")
+        output_func(")")
@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import networkx as nx
+
+from sandblaster.parsers.analysis.ir import (
+    FALSE,
+    TRUE,
+    And,
+    Atom,
+    Expr,
+    Not,
+    Or,
+    atom_id,
+)
+
+MAX_TRUTH_TABLE_VARS = 16
+
+Cube = Dict[int, bool]
+
+
+def variable_masks(count: int) -> Tuple[List[int], int]:
+    size = 1 << count
+    full = (1 << size) - 1
+    masks = []
+    for i in range(count):
+        block = (1 << (1 << i)) - 1
+        period = block << (1 << i)
+        pattern = period
+        width = 2 << i
+        while width < size:
+            pattern |= pattern << width
+            width <<= 1
+        masks.append(pattern & full)
+    return masks, full
+
+
+def cube_mask(cube: Cube, masks: Sequence[int], full: int) -> int:
+    result = full
+    for var, value in cube.items():
+        result &= masks[var] if value else full & ~masks[var]
+    return result
+
+
+def graph_variables(graph) -> List[int]:
+    return sorted(
+        {atom_id(*graph.nodes[n].get("id")) for n in graph if graph.out_degree(n) != 0}
+    )
+
+
+def graph_truth_table(graph, variables: Sequence[int]) -> Tuple[int, int]:
+    masks, full = variable_masks(len(variables))
+    var_masks = dict(zip(variables, masks))
+    node_mask = {}
+    for node in reversed(list(nx.topological_sort(graph))):
+        if graph.out_degree(node) == 0:
+            node_mask[node] = full
+            continue
+        x = var_masks[atom_id(*graph.nodes[node].get("id"))]
+        match_mask = unmatch_mask = 0
+        for _, target, data in graph.out_edges(node, data=True):
+            match data.get("result"):
+                case 1:
+                    match_mask = node_mask[target]
+                case 0:
+                    unmatch_mask = node_mask[target]
+        node_mask[node] = (x & match_mask) | (full & ~x & unmatch_mask)
+
+    on = 0
+    for node, deg in graph.in_degree():
+        if deg == 0:
+            on |= node_mask[node]
+    return on, full
+
+
+def _expand(minterm: int, on: int, masks: Sequence[int], full: int) -> Cube:
+    cube = {i: bool(minterm >> i & 1) for i in range(len(masks))}
+    for i in range(len(masks)):
+        value = cube.pop(i)
+        if cube_mask(cube, masks, full) & ~on:
+            cube[i] = value
+    return cube
+
+
+def minimize(on: int, count: int) -> List[Cube]:
+    masks, full = variable_masks(count)
+    cubes = []
+    covers = []
+    uncovered = on
+    while uncovered:
+        minterm = (uncovered & -uncovered).bit_length() - 1
+        cube = _expand(minterm, on, masks, full)
+        cover = cube_mask(cube, masks, full)
+        cubes.append(cube)
+        covers.append(cover)
+        uncovered &= ~cover
+
+    keep = list(range(len(cubes)))
+    for i in sorted(keep, key=lambda k: -len(cubes[k])):
+        others = 0
+        for j in keep:
+            if j != i:
+                others |= covers[j]
+        if covers[i] & ~others == 0:
+            keep.remove(i)
+    return [cubes[i] for i in keep]
+
+
+def cubes_to_expr(cubes: List[Cube], variables: Sequence[int]) -> Expr:
+    terms = []
+    for cube in cubes:
+        literals = [
+            Atom(variables[i]) if value else Not(Atom(variables[i]))
+            for i, value in sorted(cube.items())
+        ]
+        match literals:
+            case []:
+                return TRUE
+            case [literal]:
+                terms.append(literal)
+            case _:
+                terms.append(And(*literals))
+    match terms:
+        case []:
+            return FALSE
+        case [term]:
+            return term
+        case _:
+            return Or(*terms)
+
+
+def minimize_graph(graph, max_vars: int = MAX_TRUTH_TABLE_VARS) -> Optional[Expr]:
+    variables = graph_variables(graph)
+    if len(variables) > max_vars:
+        return None
+    on, full = graph_truth_table(graph, variables)
+    if on == full:
+        return TRUE
+    return cubes_to_expr(minimize(on, len(variables)), variables)
@@ -0,0 +1,7 @@
+import threading
+
+# z3's default context is not thread-safe, so threads serialize their solver
+# work on this lock. It lives apart from expression.py so that holders such
+# as the server need not import z3, and is re-entrant so that code running
+# under it can still reset the context.
+Z3_LOCK = threading.RLock()
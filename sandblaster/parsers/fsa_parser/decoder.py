@@ -58,6 +58,9 @@ def parse_fsa_pattern_bytecode(fsa: bytes) -> Dict[int, Operation]:
             case Opcode.SUCCESS:
                 op, i = State.SUCCESS, i + 1
 
+            case Opcode.FAIL:
+                op, i = State.FAIL, i + 1
+
             case Opcode.RANGE:
                 offset = i + 1
                 flags = fsa[offset]
@@ -62,6 +62,9 @@ def generate_paths(operations: Dict[int, Operation]) -> List[Path]:
             case State.SUCCESS:
                 result.append(path)
 
+            case State.FAIL:
+                continue
+
             case (State.JNE, tgt):
                 queue.append((pc + 1, path + [pc]))
                 queue.append((tgt, path[:-1] + [pc]))
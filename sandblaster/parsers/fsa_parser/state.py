@@ -15,3 +15,4 @@ class State(IntEnum):
     JNE = auto()
     RANGE_INCLUSIVE = auto()
     RANGE_EXCLUSIVE = auto()
+    FAIL = auto()
@@ -0,0 +1,96 @@
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sandblaster.parsers.fsa_parser.decoder import parse_fsa_pattern_bytecode
+from sandblaster.parsers.fsa_parser.processor import Operation, convert_operations
+from sandblaster.parsers.fsa_parser.state import State
+
+LITERAL, PREFIX, SUBPATH = "literal", "prefix", "subpath"
+
+Thread = Tuple[int, int, Tuple[int, ...]]
+
+
+class FsaProgram:
+    def __init__(self, operations: Dict[int, Operation]):
+        self.ops: List[Operation] = [operations[pc] for pc in range(len(operations))]
+        self.guards: List[Optional[int]] = [None] * len(self.ops)
+        for pc, op in enumerate(self.ops):
+            match op:
+                case (State.JNE, target) if pc > 0:
+                    self.guards[pc - 1] = target
+
+    @classmethod
+    def from_bytecode(cls, data: bytes) -> "FsaProgram":
+        return cls(convert_operations(parse_fsa_pattern_bytecode(data)))
+
+    def match(
+        self, text: str, bindings: Mapping[int, str] = None, mode: str = LITERAL
+    ) -> bool:
+        bindings = bindings or {}
+        size = len(text)
+        ops = self.ops
+
+        def at_end(pos: int) -> bool:
+            match mode:
+                case "prefix":
+                    return True
+                case "subpath":
+                    return (
+                        pos == size
+                        or text[pos] == "/"
+                        or (pos > 0 and text[pos - 1] == "/")
+                    )
+            return pos == size
+
+        stack: List[Thread] = [(0, 0, ())]
+        seen = set()
+        while stack:
+            thread = stack.pop()
+            if thread in seen:
+                continue
+            seen.add(thread)
+            pc, pos, saved = thread
+            if pc >= len(ops):
+                continue
+
+            follow = pc + 1
+            if self.guards[pc] is not None:
+                stack.append((self.guards[pc], pos, saved))
+                follow = pc + 2
+
+            match ops[pc]:
+                case State.SUCCESS:
+                    if at_end(pos):
+                        return True
+                case State.ASSERT:
+                    if at_end(pos):
+                        stack.append((follow, pos, saved))
+                case State.FAIL:
+                    pass
+                case (State.JNE, target):
+                    stack.append((target, pos, saved))
+                    stack.append((follow, pos, saved))
+                case (State.LITERAL, literal):
+                    if text.startswith(literal, pos):
+                        stack.append((follow, pos + len(literal), saved))
+                case (State.CALLBACK, var):
+                    value = bindings.get(var)
+                    if value is not None and text.startswith(value, pos):
+                        stack.append((follow, pos + len(value), saved))
+                case (State.RANGE_INCLUSIVE | State.RANGE_EXCLUSIVE as kind, ranges):
+                    if pos < size:
+                        c = ord(text[pos])
+                        inside = any(lo <= c <= hi for lo, hi in ranges)
+                        if inside == (kind == State.RANGE_INCLUSIVE):
+                            stack.append((follow, pos + 1, saved))
+                case (State.MATCH_BYTE | State.MATCH_SEQ, byte):
+                    end = text.find(chr(byte), pos + 1)
+                    while end != -1:
+                        stack.append((follow, end + 1, saved))
+                        end = text.find(chr(byte), end + 1)
+                case State.PUSH_STATE:
+                    stack.append((follow, pos, saved + (pos,)))
+                case State.RESTORE_POS:
+                    stack.append((follow, saved[0] if saved else pos, ()))
+                case _:
+                    stack.append((follow, pos, saved))
+        return False
@@ -6,7 +6,7 @@ class NodeGraph:
         self.nodes = nodes
 
     def find_operation_node_by_offset(self, offset):
-        return self.nodes[offset]
+        return self.nodes.get(offset)
 
     def link(self):
         for op_node in self.nodes.values():
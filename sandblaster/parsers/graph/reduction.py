@@ -0,0 +1,138 @@
+from typing import Dict, List, Tuple
+
+from sandblaster.metrics import metrics
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.nodes.terminal import TerminalNode
+
+AtomKey = Tuple[int, int]
+Known = Dict[AtomKey, bool]
+
+
+def _children(node) -> List:
+    if isinstance(node, TerminalNode):
+        return []
+    return [child for child in (node.unmatch, node.match) if child is not None]
+
+
+def topological_order(root) -> List:
+    order = []
+    seen = set()
+    stack = [(root, False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            order.append(node)
+            continue
+        if node.offset in seen:
+            continue
+        seen.add(node.offset)
+        stack.append((node, True))
+        stack.extend((child, False) for child in _children(node))
+    order.reverse()
+    return order
+
+
+def _intersect(a: Known, b: Known) -> Known:
+    if len(b) < len(a):
+        a, b = b, a
+    return {atom: value for atom, value in a.items() if b.get(atom) == value}
+
+
+class GraphReducer:
+    def __init__(self):
+        self.terminals: Dict[bytes, TerminalNode] = {}
+        self.stats = {
+            "terminals_merged": 0,
+            "tests_bypassed": 0,
+            "redundant_tests": 0,
+            "tests_merged": 0,
+        }
+
+    def canonical_terminal(self, node: TerminalNode) -> TerminalNode:
+        terminal = self.terminals.setdefault(node.raw[1:], node)
+        if terminal is not node:
+            self.stats["terminals_merged"] += 1
+        return terminal
+
+    def follow(self, node, known: Known):
+        while isinstance(node, NonTerminalNode):
+            value = known.get((node.filter_id, node.argument_id))
+            if value is None:
+                break
+            self.stats["tests_bypassed"] += 1
+            node = node.match if value else node.unmatch
+        if isinstance(node, TerminalNode):
+            return self.canonical_terminal(node)
+        return node
+
+    def propagate(self, order) -> Dict[int, Tuple]:
+        root = order[0]
+        known: Dict[int, Known] = {root.offset: {}}
+        edges = {}
+        for node in order:
+            if isinstance(node, TerminalNode) or node.offset not in known:
+                continue
+            context = known.pop(node.offset)
+            atom = (node.filter_id, node.argument_id)
+            targets = []
+            for child, value in ((node.match, True), (node.unmatch, False)):
+                edge_known = {**context, atom: value}
+                child = self.follow(child, edge_known)
+                targets.append(child)
+                if isinstance(child, NonTerminalNode):
+                    previous = known.get(child.offset)
+                    known[child.offset] = (
+                        edge_known
+                        if previous is None
+                        else _intersect(previous, edge_known)
+                    )
+            edges[node.offset] = tuple(targets)
+        return edges
+
+    def rebuild(self, order, edges):
+        unique = {}
+        replaced = {}
+        for node in reversed(order):
+            if node.offset not in edges:
+                continue
+            match, unmatch = (
+                replaced.get(target.offset, target) for target in edges[node.offset]
+            )
+            if match is unmatch:
+                self.stats["redundant_tests"] += 1
+                replaced[node.offset] = match
+                continue
+
+            key = (node.filter_id, node.argument_id, match.offset, unmatch.offset)
+            if key in unique:
+                self.stats["tests_merged"] += 1
+                replaced[node.offset] = unique[key]
+                continue
+
+            raw = node.raw[:4] + bytes(
+                [match.offset & 0xFF, match.offset >> 8]
+                + [unmatch.offset & 0xFF, unmatch.offset >> 8]
+            )
+            unique[key] = replaced[node.offset] = NonTerminalNode(
+                node.offset, raw, match, unmatch
+            )
+        return replaced
+
+    def reduce(self, root):
+        if isinstance(root, TerminalNode):
+            return root
+        order = topological_order(root)
+        edges = self.propagate(order)
+        reduced = self.rebuild(order, edges)[root.offset]
+        if isinstance(reduced, TerminalNode):
+            return root
+
+        metrics.count("reduce.nodes_before", len(order))
+        metrics.count("reduce.nodes_after", len(topological_order(reduced)))
+        for name, value in self.stats.items():
+            metrics.count(f"reduce.{name}", value)
+        return reduced
+
+
+def reduce_graph(root):
+    return GraphReducer().reduce(root)
@@ -1,24 +1,19 @@
 from typing import BinaryIO, List
 
-from construct import Bytes, Int16ul, Struct, this
-
-VarOffset = Int16ul
-
-GlobalVarEntry = Struct("strlen" / Int16ul, "name" / Bytes(this.strlen - 1))
+from sandblaster.parsers.specialized.tables import (
+    buffer_view,
+    length_prefixed,
+    u16_table,
+)
 
 
 class GlobalVarsParser:
     @staticmethod
     def parse(infile: BinaryIO, base_addr: int, count: int, offset: int) -> List[str]:
-        global_vars: List[str] = []
-
-        for i in range(count):
-            infile.seek(offset + i * 2)
-            var_index = VarOffset.parse_stream(infile)
-
-            infile.seek(base_addr + var_index * 8)
-            entry = GlobalVarEntry.parse_stream(infile)
-
-            global_vars.append(entry.name.decode("utf-8", errors="replace"))
-
-        return global_vars
+        with buffer_view(infile) as view:
+            offsets = u16_table(view, offset, count)
+            # Names are stored NUL-terminated; the length includes the NUL.
+            return [
+                str(name, "utf-8", "replace")
+                for name in length_prefixed(view, base_addr, offsets, trailing=1)
+            ]
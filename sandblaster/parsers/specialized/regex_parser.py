@@ -1,27 +1,54 @@
-from typing import BinaryIO, List
+from typing import BinaryIO, Dict, List, Sequence
 
-from construct import Bytes, Int16ul, Struct, this
+from sandblaster.metrics import metrics
+from sandblaster.parsers.specialized.tables import (
+    buffer_view,
+    length_prefixed,
+    u16_table,
+)
 
-import sandblaster.parsers.regex_parser.processor as processor
 
-RegexOffset = Int16ul
+class RegexList(Sequence[str]):
+    """Regex table whose entries are converted to strings on first access."""
 
-RegexEntry = Struct("length" / Int16ul, "data" / Bytes(this.length))
+    def __init__(self, bytecodes: List[bytes]):
+        self.bytecodes = bytecodes
+        self._analyzed: Dict[int, str] = {}
 
+    def __len__(self) -> int:
+        return len(self.bytecodes)
 
-class RegexListParser:
-    @staticmethod
-    def parse(infile: BinaryIO, base_addr: int, count: int, offset: int) -> List[str]:
-        if count == 0:
-            return []
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        regex = self._analyzed.get(index)
+        if regex is None:
+            import sandblaster.parsers.regex_parser.processor as processor
+
+            with metrics.stage("regex"):
+                regex = processor.analyze(self.bytecodes[index])
+            metrics.count("regex.entries")
+            self._analyzed[index] = regex
+        return regex
 
-        infile.seek(offset)
-        offsets = [RegexOffset.parse_stream(infile) for _ in range(count)]
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Sequence) and list(self) == list(other)
 
-        regex_list: List[str] = []
-        for off in offsets:
-            infile.seek(base_addr + off * 8)
-            entry = RegexEntry.parse_stream(infile)
-            regex_list.append(processor.analyze(entry.data))
+    def __repr__(self) -> str:
+        return f"RegexList({len(self)} entries)"
 
-        return regex_list
+
+class RegexListParser:
+    @staticmethod
+    def parse(infile: BinaryIO, base_addr: int, count: int, offset: int) -> RegexList:
+        if count == 0:
+            return RegexList([])
+
+        with buffer_view(infile) as view:
+            offsets = u16_table(view, offset, count)
+            # Copied out of the map so entries can be analyzed after it closes.
+            return RegexList(
+                [bytes(data) for data in length_prefixed(view, base_addr, offsets)]
+            )
@@ -0,0 +1,27 @@
+import mmap
+import struct
+from typing import BinaryIO, Iterator, Sequence, Tuple
+
+RECORD_ALIGNMENT = 8
+
+
+def buffer_view(infile: BinaryIO) -> memoryview:
+    if isinstance(infile, mmap.mmap):
+        return memoryview(infile)
+    if hasattr(infile, "getbuffer"):
+        return infile.getbuffer()
+    infile.seek(0)
+    return memoryview(infile.read())
+
+
+def u16_table(view: memoryview, offset: int, count: int) -> Tuple[int, ...]:
+    return struct.unpack_from(f"<{count}H", view, offset)
+
+
+def length_prefixed(
+    view: memoryview, base_addr: int, offsets: Sequence[int], trailing: int = 0
+) -> Iterator[memoryview]:
+    for offset in offsets:
+        start = base_addr + offset * RECORD_ALIGNMENT
+        length = view[start] | view[start + 1] << 8
+        yield view[start + 2 : start + 2 + length - trailing]
@@ -0,0 +1,136 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from sandblaster.filters.base import FilterType
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.nodes.terminal import NodeType
+from sandblaster.parsers.fsa_parser.vm import LITERAL, PREFIX, SUBPATH, FsaProgram
+
+Attributes = Mapping[str, Any]
+Predicate = Callable[[Attributes], bool]
+
+PATTERN_MODES = {
+    FilterType.SB_VALUE_TYPE_PATTERN_LITERAL: LITERAL,
+    FilterType.SB_VALUE_TYPE_PATTERN_PREFIX: PREFIX,
+    FilterType.SB_VALUE_TYPE_PATTERN_SUBPATH: SUBPATH,
+}
+BOOLEANS = {
+    "#t": True,
+    "true": True,
+    "1": True,
+    "#f": False,
+    "false": False,
+    "0": False,
+}
+
+
+def _unquote(value: str) -> str:
+    if value.startswith('#"') and value.endswith('"'):
+        return value[2:-1]
+    if value.startswith('"') and value.endswith('"'):
+        return value[1:-1]
+    return value
+
+
+def _parse_bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    return BOOLEANS.get(str(value).strip().lower())
+
+
+def _parse_int(value) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(str(value).strip(), 0)
+    except ValueError:
+        return None
+
+
+def pattern_predicate(
+    name: str, program: FsaProgram, mode: str, bindings: Mapping[int, str]
+) -> Predicate:
+    def predicate(attributes: Attributes) -> bool:
+        value = attributes.get(name)
+        return value is not None and program.match(str(value), bindings, mode)
+
+    return predicate
+
+
+def build_predicate(name: Optional[str], argument, arg_type: FilterType) -> Predicate:
+    if name is None:
+        return lambda attributes: False
+
+    match arg_type:
+        case FilterType.SB_VALUE_TYPE_PATTERN_REGEX:
+            search = re.compile(_unquote(argument), re.S).search
+            return lambda a: a.get(name) is not None and bool(search(str(a[name])))
+        case FilterType.SB_VALUE_TYPE_BOOL:
+            expected = argument == "#t"
+            return lambda a: name in a and _parse_bool(a[name]) is expected
+        case FilterType.SB_VALUE_TYPE_BITFIELD:
+
+            def predicate(attributes: Attributes) -> bool:
+                value = _parse_int(attributes.get(name))
+                return value is not None and value & argument == argument
+
+            return predicate
+        case _:
+            expected = _unquote(str(argument))
+            return lambda a: name in a and str(a[name]) == expected
+
+
+@dataclass
+class Decision:
+    operation: str
+    action: str
+    terminal: int
+    path: List[int] = field(default_factory=list)
+
+
+class PolicyEvaluator:
+    def __init__(self, payload, filter_resolver, variables: Mapping[str, str] = None):
+        self.payload = payload
+        self.filter_resolver = filter_resolver
+        variables = {k.upper(): v for k, v in (variables or {}).items()}
+        self.bindings = {
+            i: variables[name.upper()]
+            for i, name in enumerate(filter_resolver.global_vars)
+            if name.upper() in variables
+        }
+        self.roots = dict(zip(payload.sb_ops, payload.op_table))
+        self._predicates: Dict[Tuple[int, int], Predicate] = {}
+
+    def predicate(self, filter_id: int, argument_id: int) -> Predicate:
+        key = (filter_id, argument_id)
+        predicate = self._predicates.get(key)
+        if predicate is None:
+            predicate = self._build_predicate(filter_id, argument_id)
+            self._predicates[key] = predicate
+        return predicate
+
+    def _build_predicate(self, filter_id: int, argument_id: int) -> Predicate:
+        info = self.filter_resolver.filters.get(filter_id)
+        if info is None:
+            return lambda attributes: False
+        arg_type = FilterType[info["argument_type"]]
+        if arg_type in PATTERN_MODES:
+            program = self.filter_resolver.pattern_program(argument_id)
+            mode = PATTERN_MODES[arg_type]
+            return pattern_predicate(info["name"], program, mode, self.bindings)
+        name, argument = self.filter_resolver.resolve(filter_id, argument_id)
+        return build_predicate(name, argument, arg_type)
+
+    def evaluate(self, operation: str, attributes: Attributes) -> Decision:
+        if operation not in self.roots:
+            raise KeyError(f"Unknown operation: {operation}")
+        node = self.payload.operation_nodes.find_operation_node_by_offset(
+            self.roots[operation]
+        )
+        path = []
+        while isinstance(node, NonTerminalNode):
+            path.append(node.offset)
+            matched = self.predicate(node.filter_id, node.argument_id)(attributes)
+            node = node.match if matched else node.unmatch
+        return Decision(operation, NodeType(node.type).name.lower(), node.offset, path)
@@ -0,0 +1,88 @@
+import logging
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from sandblaster.export.binary import MAGIC, BinaryProfile
+from sandblaster.export.jsonl import iter_operations
+from sandblaster.export.records import OperationRecord
+from sandblaster.loader import LoadedProfile
+from sandblaster.metrics import metrics
+from sandblaster.nodes.representation.non_terminal import NonTerminalRepresentation
+from sandblaster.nodes.representation.terminal import TerminalNodeRepresentation
+from sandblaster.parsers.analysis.ir import atom_key
+from sandblaster.parsers.analysis.policies import (
+    PolicyTable,
+    policy_index,
+    policy_name,
+)
+from sandblaster.parsers.analysis.spbl_printer import Rule, print_rule
+
+logger = logging.getLogger(__name__)
+
+
+def read_records(path: str) -> Iterator[OperationRecord]:
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        yield from iter_operations(path)
+        return
+    with BinaryProfile(path) as profile:
+        for name in profile.operations:
+            yield profile.operation(name)
+
+
+def render_records(
+    records: Iterable[OperationRecord],
+    profile: LoadedProfile,
+    output_func: Callable[[str], None] = print,
+) -> None:
+    # Conditions are stored over numeric (filter_id, argument_id) atoms, so
+    # only names, arguments and modifiers are resolved here, against the
+    # metadata the profile was opened with.
+    payload = profile.payload
+    parsed: Dict[int, NonTerminalRepresentation] = {}
+    exported: Dict[int, List[Rule]] = {}
+    missing = set()
+
+    def exported_policy(index: int) -> Optional[List[Rule]]:
+        rules = exported.get(index)
+        if rules is None and index not in missing:
+            missing.add(index)
+            metrics.count("render.missing_policies")
+            logger.warning(
+                f"No {policy_name(index)} record ahead of its first use; "
+                "references to it are left unresolved."
+            )
+        return rules
+
+    policies = PolicyTable(exported_policy)
+    for record in records:
+        for atom in record.atoms:
+            if atom not in parsed:
+                parsed[atom] = NonTerminalRepresentation(
+                    *atom_key(atom), profile.filter_resolver
+                )
+        rules = []
+        for rule in record.rules:
+            terminal = payload.operation_nodes.find_operation_node_by_offset(
+                rule.decision["offset"]
+            )
+            decision = TerminalNodeRepresentation(
+                terminal,
+                profile.terminal_resolver,
+                profile.modifier_resolver,
+                payload,
+                record.name,
+            )
+            rules.append(Rule(record.name, terminal, decision, rule.expr))
+
+        # Policies are exported ahead of their first use and printed as
+        # blocks by the operations that refer to them.
+        index = policy_index(record.name)
+        if index is not None:
+            exported[index] = rules
+            continue
+        policies.emit(rules, parsed, output_func)
+        for rule in rules:
+            print_rule(rule, parsed, output_func)
+        output_func("*" * 10)
+        metrics.count("render.operations")
@@ -0,0 +1,165 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sandblaster.nodes.non_terminal import NonTerminalNode
+
+# Mirrors truth_table.MAX_TRUTH_TABLE_VARS without importing networkx.
+TRUTH_TABLE_VARS = 16
+
+PATTERN_TYPES = {
+    "SB_VALUE_TYPE_PATTERN_LITERAL",
+    "SB_VALUE_TYPE_PATTERN_PREFIX",
+    "SB_VALUE_TYPE_PATTERN_SUBPATH",
+}
+
+
+@dataclass
+class OperationScan:
+    operation: str
+    nodes: int
+    sinks: int
+    atoms: int
+    paths: int
+
+    @property
+    def strategy(self) -> str:
+        if self.nodes == 0:
+            return "constant"
+        if self.atoms <= TRUTH_TABLE_VARS:
+            return "truth-table"
+        return "solver"
+
+
+@dataclass
+class ProfileScan:
+    nodes: int
+    reachable: int
+    shared: int
+    regexes: int
+    patterns: int
+    global_vars: int
+    operations: List[OperationScan] = field(default_factory=list)
+    filters: Dict[str, int] = field(default_factory=dict)
+
+
+def _topological_order(nodes) -> List[int]:
+    order, seen = [], set()
+    for root in nodes.values():
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                order.append(node.offset)
+                continue
+            if node.offset in seen:
+                continue
+            seen.add(node.offset)
+            stack.append((node, True))
+            if isinstance(node, NonTerminalNode):
+                stack += ((node.unmatch, False), (node.match, False))
+    order.reverse()
+    return order
+
+
+def _per_bit(counts: Counter, width: int) -> List[int]:
+    totals = [0] * width
+    for mask, count in counts.items():
+        while mask:
+            low = mask & -mask
+            totals[low.bit_length() - 1] += count
+            mask ^= low
+    return totals
+
+
+def _path_counts(nodes) -> Dict[int, int]:
+    counts: Dict[int, int] = {}
+    for root in nodes.values():
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            if node.offset in counts:
+                continue
+            if not isinstance(node, NonTerminalNode):
+                counts[node.offset] = 1
+            elif done:
+                counts[node.offset] = (
+                    counts[node.match.offset] + counts[node.unmatch.offset]
+                )
+            else:
+                stack += ((node, True), (node.match, False), (node.unmatch, False))
+    return counts
+
+
+def scan_payload(payload, filters) -> ProfileScan:
+    nodes = payload.operation_nodes.nodes
+    paths = _path_counts(nodes)
+
+    # One bit per distinct operation root, propagated down the graph in a
+    # single topological pass; nodes are then grouped by the set of roots
+    # reaching them instead of walking the graph once per operation.
+    bits: Dict[int, int] = {}
+    masks: Dict[int, int] = {}
+    for idx in payload.ops_to_reverse:
+        offset = payload.op_table[idx]
+        if offset in nodes and offset not in bits:
+            bits[offset] = len(bits)
+            masks[offset] = 1 << bits[offset]
+    for offset in _topological_order(nodes):
+        mask = masks.get(offset)
+        node = nodes[offset]
+        if mask and isinstance(node, NonTerminalNode):
+            for child in (node.match.offset, node.unmatch.offset):
+                masks[child] = masks.get(child, 0) | mask
+
+    tests: Counter = Counter()
+    sinks: Counter = Counter()
+    atom_masks: Dict[tuple, int] = {}
+    for offset, mask in masks.items():
+        node = nodes[offset]
+        if isinstance(node, NonTerminalNode):
+            tests[mask] += 1
+            key = (node.filter_id, node.argument_id)
+            atom_masks[key] = atom_masks.get(key, 0) | mask
+        else:
+            sinks[mask] += 1
+    test_counts = _per_bit(tests, len(bits))
+    sink_counts = _per_bit(sinks, len(bits))
+    atom_counts = _per_bit(Counter(atom_masks.values()), len(bits))
+
+    operations = []
+    for idx in payload.ops_to_reverse:
+        offset = payload.op_table[idx]
+        if offset not in bits:
+            continue
+        bit = bits[offset]
+        operations.append(
+            OperationScan(
+                payload.sb_ops[idx],
+                test_counts[bit],
+                sink_counts[bit],
+                atom_counts[bit],
+                paths[offset],
+            )
+        )
+
+    histogram: Counter = Counter()
+    patterns = set()
+    for node in nodes.values():
+        if not isinstance(node, NonTerminalNode):
+            continue
+        info = filters.get(node.filter_id)
+        histogram[info["name"] if info else f"filter-{node.filter_id}"] += 1
+        if info and info["argument_type"] in PATTERN_TYPES:
+            patterns.add(node.argument_id)
+
+    return ProfileScan(
+        nodes=len(nodes),
+        reachable=sum(tests.values()),
+        shared=sum(count for mask, count in tests.items() if mask & (mask - 1)),
+        regexes=len(payload.regex_list),
+        patterns=len(patterns),
+        global_vars=len(payload.global_vars),
+        operations=operations,
+        filters=dict(histogram.most_common()),
+    )
@@ -0,0 +1,371 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sandblaster.loader import LoadedProfile, open_profile, read_sandbox_operations
+from sandblaster.parsers.analysis.budget import Budget
+from sandblaster.parsers.analysis.z3_lock import Z3_LOCK
+
+logger = logging.getLogger(__name__)
+
+MAX_EVALUATORS = 16
+
+Request = Dict[str, Any]
+CacheKey = Tuple[str, int, int, str, int]
+
+
+@dataclass(eq=False)
+class CachedProfile:
+    key: CacheKey
+    profile: Optional[LoadedProfile] = None
+    stack: Optional[ExitStack] = None
+    error: Optional[BaseException] = None
+    ready: threading.Event = field(default_factory=threading.Event)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    parsed: dict = field(default_factory=dict)
+    policies: dict = field(default_factory=dict)
+    evaluators: Dict[Tuple, Any] = field(default_factory=dict)
+    users: int = 0
+    evicted: bool = False
+
+
+class ProfileCache:
+    def __init__(self, capacity: int = 8, loader: Callable = open_profile):
+        self.capacity = capacity
+        self.loader = loader
+        self.entries: "OrderedDict[CacheKey, CachedProfile]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(path: str, operations: str) -> CacheKey:
+        st, ops = os.stat(path), os.stat(operations)
+        return (
+            os.path.realpath(path),
+            st.st_mtime_ns,
+            st.st_size,
+            os.path.realpath(operations),
+            ops.st_mtime_ns,
+        )
+
+    def _acquire(self, path: str, operations: str) -> CachedProfile:
+        key = self.key(path, operations)
+        with self.lock:
+            entry = self.entries.get(key)
+            loading = entry is None
+            if loading:
+                self.misses += 1
+                # Other requests for the same profile wait on the placeholder
+                # while the rest of the cache stays available.
+                entry = CachedProfile(key)
+                self.entries[key] = entry
+                self._evict()
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            entry.users += 1
+
+        if loading:
+            try:
+                stack = ExitStack()
+                entry.profile = stack.enter_context(
+                    self.loader(path, read_sandbox_operations(operations))
+                )
+                entry.stack = stack
+            except BaseException as e:
+                entry.error = e
+                with self.lock:
+                    if self.entries.get(key) is entry:
+                        del self.entries[key]
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+        if entry.error is not None:
+            self._release(entry)
+            raise entry.error
+        return entry
+
+    @staticmethod
+    def _close(entry: CachedProfile) -> None:
+        if entry.stack is not None:
+            entry.stack.close()
+
+    def _evict(self) -> None:
+        while len(self.entries) > self.capacity:
+            _, entry = self.entries.popitem(last=False)
+            entry.evicted = True
+            if entry.users == 0:
+                self._close(entry)
+
+    def _release(self, entry: CachedProfile) -> None:
+        with self.lock:
+            entry.users -= 1
+            if entry.evicted and entry.users == 0:
+                self._close(entry)
+
+    @contextmanager
+    def use(self, *specs: Tuple[str, str]) -> Iterator[List[CachedProfile]]:
+        entries = []
+        try:
+            for path, operations in specs:
+                entries.append(self._acquire(path, operations))
+            unique = {id(entry): entry for entry in entries}.values()
+            with ExitStack() as locks:
+                for entry in sorted(unique, key=lambda e: e.key):
+                    locks.enter_context(entry.lock)
+                yield entries
+        finally:
+            for entry in entries:
+                self._release(entry)
+
+    def close(self) -> None:
+        with self.lock:
+            for entry in self.entries.values():
+                entry.evicted = True
+                if entry.users == 0:
+                    self._close(entry)
+            self.entries.clear()
+
+
+def _decompile(cache: ProfileCache, request: Request, budget: Budget) -> Request:
+    from sandblaster.parsers.analysis.bool_expressions import (
+        decompile_operations,
+        policy_table,
+        print_rule,
+    )
+
+    spec = (request["profile"], request["operations"])
+    with cache.use(spec) as (entry,):
+        profile = entry.profile
+        operations = []
+        # Policies are decompiled once per cached profile, but every
+        # response carries the blocks its own operations refer to.
+        policies = policy_table(
+            profile.payload,
+            profile.filter_resolver,
+            profile.modifier_resolver,
+            profile.terminal_resolver,
+            entry.parsed,
+            budget,
+            request.get("operation_budget"),
+            entry.policies,
+        )
+        decompiled = decompile_operations(
+            profile.payload,
+            profile.filter_resolver,
+            profile.modifier_resolver,
+            profile.terminal_resolver,
+            entry.parsed,
+            budget=budget,
+            operation_budget=request.get("operation_budget"),
+            operation_filter=request.get("filter"),
+        )
+        while True:
+            # Each step simplifies one operation; other jobs may use z3
+            # in between.
+            with Z3_LOCK:
+                item = next(decompiled, None)
+            if item is None:
+                break
+            sb_op, rules = item
+            lines: List[str] = []
+            with Z3_LOCK:
+                policies.emit(rules, entry.parsed, lines.append)
+            for rule in rules:
+                print_rule(rule, entry.parsed, lines.append)
+            operations.append({"operation": sb_op, "sbpl": lines})
+            if budget.is_cancelled():
+                break
+    return {"operations": operations, "cancelled": budget.is_cancelled()}
+
+
+def _query(cache: ProfileCache, request: Request, budget: Budget) -> Request:
+    from sandblaster.query import PolicyEvaluator
+
+    spec = (request["profile"], request["operations"])
+    variables = request.get("variables") or {}
+    with cache.use(spec) as (entry,):
+        key = tuple(sorted(variables.items()))
+        evaluator = entry.evaluators.get(key)
+        if evaluator is None:
+            if len(entry.evaluators) >= MAX_EVALUATORS:
+                entry.evaluators.clear()
+            profile = entry.profile
+            evaluator = PolicyEvaluator(
+                profile.payload, profile.filter_resolver, variables
+            )
+            entry.evaluators[key] = evaluator
+        requests = request.get("requests") or [request]
+        decisions = []
+        for item in requests:
+            if budget.is_cancelled():
+                break
+            decision = evaluator.evaluate(item["operation"], item.get("attributes", {}))
+            decisions.append(asdict(decision))
+    return {"decisions": decisions, "cancelled": budget.is_cancelled()}
+
+
+def _diff(cache: ProfileCache, request: Request, budget: Budget) -> Request:
+    from sandblaster.parsers.analysis.equivalence import (
+        diff_profiles,
+        format_condition,
+    )
+
+    operations_b = request.get("operations_b") or request["operations"]
+    specs = (
+        (request["profile_a"], request["operations"]),
+        (request["profile_b"], operations_b),
+    )
+    with cache.use(*specs) as (entry_a, entry_b):
+        results = diff_profiles(
+            entry_a.profile,
+            entry_b.profile,
+            request.get("timeout_ms", 2000),
+            budget=budget,
+            lock=Z3_LOCK,
+        )
+    return {
+        "results": [
+            {
+                "operation": r.operation,
+                "status": r.status,
+                "method": r.method,
+                "condition": format_condition(r.condition) if r.condition else None,
+                "decisions": list(r.decisions),
+            }
+            for r in results
+        ],
+        "cancelled": budget.is_cancelled(),
+    }
+
+
+HANDLERS = {"decompile": _decompile, "query": _query, "diff": _diff}
+
+
+def _warm_up() -> None:
+    import sandblaster.parsers.analysis.bool_expressions  # noqa: F401
+    import sandblaster.parsers.analysis.equivalence  # noqa: F401
+    import sandblaster.query  # noqa: F401
+
+
+class DecompileServer:
+    def __init__(
+        self,
+        socket_path: str,
+        workers: int = 4,
+        cache_size: int = 8,
+        loader: Callable = open_profile,
+    ):
+        self.socket_path = socket_path
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="sandblaster")
+        self.cache = ProfileCache(cache_size, loader)
+        self.jobs: Dict[Any, Budget] = {}
+        self.server = None
+
+    async def start(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self.pool, _warm_up)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = await asyncio.start_unix_server(
+            self._connection, path=self.socket_path, limit=1 << 24
+        )
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        for budget in self.jobs.values():
+            budget.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.pool.shutdown(wait=True)
+        self.cache.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _connection(self, reader, writer) -> None:
+        write_lock = asyncio.Lock()
+        tasks, budgets = set(), set()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(
+                    self._dispatch(line, writer, write_lock, budgets)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            # A client that hangs up no longer wants its results.
+            for budget in budgets:
+                budget.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _dispatch(self, line: bytes, writer, write_lock, budgets) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = {"id": request_id, "ok": True}
+            response["result"] = await self._handle(request, budgets)
+        except Exception as e:
+            logger.exception("Request %r failed", request_id)
+            response = {"id": request_id, "ok": False, "error": str(e)}
+        async with write_lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def _handle(self, request: Request, budgets: set) -> Request:
+        command = request.get("command")
+        match command:
+            case "cancel":
+                budget = self.jobs.get(request["target"])
+                if budget is not None:
+                    budget.cancel()
+                return {"cancelled": budget is not None}
+            case "stats":
+                return {
+                    "profiles": len(self.cache.entries),
+                    "hits": self.cache.hits,
+                    "misses": self.cache.misses,
+                    "jobs": len(self.jobs),
+                }
+        if command not in HANDLERS:
+            raise ValueError(f"Unknown command: {command!r}")
+
+        budget = Budget(request.get("budget"), step_ms=request.get("timeout_ms"))
+        job = request.get("id", id(budget))
+        self.jobs[job] = budget
+        budgets.add(budget)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.pool, HANDLERS[command], self.cache, request, budget
+            )
+        finally:
+            self.jobs.pop(job, None)
+            budgets.discard(budget)
+
+
+def send_request(socket_path: str, request: Request) -> Request:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(request).encode() + b"\n")
+            f.flush()
+            return json.loads(f.readline())
@@ -0,0 +1,267 @@
+import hashlib
+import io
+import mmap
+import struct
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sandblaster.configs.filters import cache_dir
+from sandblaster.export.binary import (
+    ENTRY,
+    HEADER,
+    NONE,
+    StringTable,
+    decode_section,
+    encode_section,
+    list_starts,
+    u32_column,
+)
+from sandblaster.fileio import atomic_open
+from sandblaster.filters.filter_resolver import FilterResolver
+from sandblaster.filters.modifier_resolver import ModifierResolver
+from sandblaster.filters.terminal_resolver import TerminalResolver
+from sandblaster.loader import LoadedProfile
+from sandblaster.parsers.graph.graph import NodeGraph
+from sandblaster.parsers.graph.node import NodeParser
+
+MAGIC = b"SBSN"
+# Bump whenever a decoder change would alter anything stored below.
+DECODER_VERSION = 1
+
+SECTIONS = ("STRS", "META", "NODE", "TABL", "ATOM")
+WIDTHS = {
+    "STRS": (4, 1),
+    "META": (4,),
+    "NODE": (1,),
+    "TABL": (4, 4, 4, 4),
+    "ATOM": (4, 4, 1, 4, 4),
+}
+
+ARG_NONE, ARG_TEXT, ARG_LIST, ARG_INT = range(4)
+
+Key = Tuple[int, int]
+
+
+@dataclass
+class SnapshotPayload:
+    sb_ops: List[str]
+    ops_to_reverse: List[int]
+    op_table: List[int]
+    operation_nodes: NodeGraph
+    policies: List[int]
+    regex_list: List[str]
+    global_vars: List[str]
+
+
+def blob_digest(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def snapshot_path(digest: str, filters_digest: str) -> Path:
+    # Resolved atoms depend on the filter metadata as well as the blob.
+    name = f"snapshot-v{DECODER_VERSION}-{digest}-{filters_digest[:16]}.sbsnap"
+    return cache_dir() / name
+
+
+def write_snapshot(
+    path: Path,
+    profile: LoadedProfile,
+    base_addr: int,
+    atoms: Mapping[Key, Tuple[Optional[str], Any]],
+) -> None:
+    payload = profile.payload
+    strings = StringTable()
+    nodes = payload.operation_nodes.nodes
+
+    # Only atoms some run actually resolved: expanding every pattern in the
+    # graph up front would cost more than the run that wrote the snapshot.
+    keys = sorted(atoms)
+    filters, kinds, args = [], [], []
+    for key in keys:
+        name, argument = atoms[key]
+        filters.append(strings.add(name))
+        match argument:
+            case None:
+                kinds.append(ARG_NONE)
+                args.append([])
+            case list():
+                kinds.append(ARG_LIST)
+                args.append([strings.add(str(a)) for a in argument])
+            case int():
+                kinds.append(ARG_INT)
+                args.append([argument])
+            case _:
+                kinds.append(ARG_TEXT)
+                args.append([strings.add(str(argument))])
+
+    sections = {
+        "META": encode_section([u32_column([base_addr, len(nodes)])]),
+        "NODE": encode_section([b"".join(nodes[i].raw for i in range(len(nodes)))]),
+        "TABL": encode_section(
+            [
+                u32_column(payload.op_table),
+                u32_column(payload.policies),
+                u32_column([strings.add(r) for r in payload.regex_list]),
+                u32_column([strings.add(v) for v in payload.global_vars]),
+            ]
+        ),
+        "ATOM": encode_section(
+            [
+                u32_column([f << 16 | a for f, a in keys]),
+                u32_column(filters),
+                bytes(kinds),
+                u32_column(list_starts(args)),
+                u32_column([a for values in args for a in values]),
+            ]
+        ),
+    }
+    sections["STRS"] = strings.encode()
+
+    offset = HEADER.size + ENTRY.size * len(SECTIONS)
+    directory = []
+    for tag in SECTIONS:
+        directory.append(ENTRY.pack(tag.encode(), offset, len(sections[tag])))
+        offset += len(sections[tag])
+
+    with atomic_open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, DECODER_VERSION, len(SECTIONS)))
+        f.writelines(directory)
+        f.writelines(sections[tag] for tag in SECTIONS)
+
+
+class Snapshot:
+    def __init__(self, path: Path):
+        self._sections = {}
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        try:
+            self._read_directory(path)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_directory(self, path: Path) -> None:
+        magic, version, count = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != DECODER_VERSION:
+            raise ValueError(f"{path}: not a v{DECODER_VERSION} snapshot")
+        for i in range(count):
+            tag, offset, length = ENTRY.unpack_from(
+                self._view, HEADER.size + i * ENTRY.size
+            )
+            tag = tag.decode()
+            self._sections[tag] = decode_section(
+                self._view[offset : offset + length], WIDTHS[tag]
+            )
+        (meta,) = self._sections["META"]
+        self.base_addr, self.node_count = meta[0], meta[1]
+
+    def close(self) -> None:
+        self._sections.clear()
+        self._view.release()
+        self._mm.close()
+
+    def string(self, index: int) -> Optional[str]:
+        if index == NONE:
+            return None
+        starts, blob = self._sections["STRS"]
+        return str(
+            blob.view[starts[index] : starts[index + 1]], "utf-8", "surrogateescape"
+        )
+
+    def _strings(self, column) -> List[str]:
+        return [self.string(i) for i in column.slice(0, len(column))]
+
+    def payload(
+        self,
+        sandbox_operations: Sequence[str],
+        operation_filter: Optional[Sequence[str]] = None,
+    ) -> Tuple[SnapshotPayload, set]:
+        (raw,) = self._sections["NODE"]
+        nodes, flags = NodeParser().parse(io.BytesIO(raw.view), self.node_count)
+        operation_nodes = NodeGraph(nodes)
+        operation_nodes.link()
+
+        op_table, policies, regex, global_vars = self._sections["TABL"]
+        op_table = op_table.slice(0, len(op_table))
+        sb_ops = list(sandbox_operations)
+        ops_to_reverse = [
+            idx
+            for idx, name in enumerate(sb_ops[: len(op_table)])
+            if not operation_filter or name in operation_filter
+        ]
+        payload = SnapshotPayload(
+            sb_ops,
+            ops_to_reverse,
+            op_table,
+            operation_nodes,
+            policies.slice(0, len(policies)),
+            self._strings(regex),
+            self._strings(global_vars),
+        )
+        return payload, flags
+
+    def get(self, key: Key, default=None) -> Optional[Tuple[Optional[str], Any]]:
+        ids = self._sections["ATOM"][0]
+        atom = key[0] << 16 | key[1]
+        idx = bisect_left(ids, atom)
+        if idx == len(ids) or ids[idx] != atom:
+            return default
+        return self._atom(idx)
+
+    def atoms(self) -> Dict[Key, Tuple[Optional[str], Any]]:
+        ids = self._sections["ATOM"][0]
+        return {
+            (atom >> 16, atom & 0xFFFF): self._atom(idx)
+            for idx, atom in enumerate(ids.slice(0, len(ids)))
+        }
+
+    def _atom(self, idx: int) -> Tuple[Optional[str], Any]:
+        _, filters, kinds, starts, args = self._sections["ATOM"]
+        values = args.slice(starts[idx], starts[idx + 1])
+        match kinds[idx]:
+            case 0:
+                argument = None
+            case 1:
+                argument = self.string(values[0])
+            case 2:
+                argument = [self.string(v) for v in values]
+            case 3:
+                argument = values[0]
+        return self.string(filters[idx]), argument
+
+
+def load_snapshot(
+    snapshot: Snapshot,
+    infile: BinaryIO,
+    sandbox_operations: Sequence[str],
+    operation_filter: Optional[Sequence[str]],
+    filters,
+    modifiers,
+) -> LoadedProfile:
+    payload, flags = snapshot.payload(sandbox_operations, operation_filter)
+    filter_resolver = FilterResolver(
+        infile, snapshot.base_addr, payload.regex_list, payload.global_vars, filters
+    )
+    filter_resolver.resolved = snapshot
+    return LoadedProfile(
+        payload,
+        filter_resolver,
+        ModifierResolver(
+            infile,
+            snapshot.base_addr,
+            payload.regex_list,
+            payload.global_vars,
+            modifiers,
+        ),
+        TerminalResolver(modifiers, flags),
+    )
+
+
+def open_snapshot(path: Path) -> Optional[Snapshot]:
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError, struct.error):
+        return None
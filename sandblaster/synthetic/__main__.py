@@ -0,0 +1,46 @@
+import argparse
+import sys
+
+from sandblaster.synthetic.generator import SHAPES, generate_profile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sandblaster.synthetic",
+        description="Generate a synthetic profile_data blob",
+    )
+    parser.add_argument("output")
+    parser.add_argument("--operations-output", required=True)
+    parser.add_argument("--nodes", type=int, default=200)
+    parser.add_argument("--operations", type=int, default=4)
+    parser.add_argument("--atoms", type=int, default=16)
+    parser.add_argument("--sharing", type=float, default=0.3)
+    parser.add_argument("--sinks", type=int, default=4)
+    parser.add_argument("--pattern-complexity", type=int, default=2)
+    parser.add_argument("--shape", choices=SHAPES, default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    profile = generate_profile(
+        nodes=args.nodes,
+        operations=args.operations,
+        atoms=args.atoms,
+        sharing=args.sharing,
+        sinks=args.sinks,
+        pattern_complexity=args.pattern_complexity,
+        shape=args.shape,
+        seed=args.seed,
+    )
+    with open(args.output, "wb") as f:
+        f.write(profile.data)
+    with open(args.operations_output, "w") as f:
+        f.write("\n".join(profile.operations) + "\n")
+    print(f"Saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple, Union
+
+from construct import Int8ul, Int16ul, Struct
+
+from sandblaster.nodes.terminal import NodeType
+from sandblaster.parsers.fsa_parser.opcode import Opcode as FsaOpcode
+from sandblaster.parsers.regex_parser.opcode import OpCode as RegexOpcode
+from sandblaster.parsers.regex_parser.parser import MAGIC_NUMBER
+
+HeaderStruct = Struct(
+    "type" / Int16ul,
+    "op_nodes_count" / Int16ul,
+    "sb_ops_count" / Int8ul,
+    "vars_count" / Int8ul,
+    "states_count" / Int8ul,
+    "reserved" / Int8ul,
+    "profiles_count" / Int16ul,
+    "regex_count" / Int16ul,
+    "policies_count" / Int16ul,
+)
+
+NODE_SIZE = 8
+ACTION_INLINE = 0x800000
+
+Range = Tuple[int, int]
+FsaToken = Union[str, Tuple[str, object]]
+RegexToken = Union[str, Tuple[str, object]]
+
+
+def nonterminal_raw(
+    filter_id: int, argument_id: int, match: int, unmatch: int
+) -> bytes:
+    return bytes(
+        [0x00, filter_id]
+        + list(argument_id.to_bytes(2, "little"))
+        + list(match.to_bytes(2, "little"))
+        + list(unmatch.to_bytes(2, "little"))
+    )
+
+
+def terminal_raw(
+    action: NodeType = NodeType.ALLOW,
+    flags: int = 0,
+    arg_type: int = 0,
+    arg_id: int = 0,
+    arg_value: int = 0,
+) -> bytes:
+    modifier_flags = (flags & ~1) | (action & 1)
+    return bytes(
+        [0x01]
+        + list(modifier_flags.to_bytes(3, "little"))
+        + [arg_type, arg_id]
+        + list(arg_value.to_bytes(2, "little"))
+    )
+
+
+def _fsa_literal(text: str) -> bytes:
+    data = text.encode()
+    out = bytearray()
+    while data:
+        chunk, data = data[:0x140], data[0x140:]
+        if len(chunk) <= 0x40:
+            out += bytes([FsaOpcode.LITERAL_SHORT.start | (len(chunk) - 1)]) + chunk
+        else:
+            out += bytes([FsaOpcode.LITERAL_EXT, len(chunk) - 0x41]) + chunk
+    return bytes(out)
+
+
+def _fsa_token(token: FsaToken) -> bytes:
+    match token:
+        case str(text):
+            return _fsa_literal(text)
+        case ("var", int(index)) if index <= 0xF:
+            return bytes([FsaOpcode.CALLBACK_SHORT.start | index])
+        case ("var", int(index)):
+            return bytes([FsaOpcode.CALLBACK_EXT]) + index.to_bytes(2, "little")
+        case ("range", ranges):
+            return _fsa_range(ranges, exclusive=False)
+        case ("not-range", ranges):
+            return _fsa_range(ranges, exclusive=True)
+    raise ValueError(f"Unsupported pattern token: {token!r}")
+
+
+def _fsa_range(ranges: Sequence[Range], exclusive: bool) -> bytes:
+    flags = (len(ranges) - 1) | (0x80 if exclusive else 0)
+    body = bytes(b for lo_hi in ranges for b in lo_hi)
+    return bytes([FsaOpcode.RANGE, flags]) + body + bytes([FsaOpcode.MATCH])
+
+
+def _fsa_jne(position: int, target: int) -> bytes:
+    distance = target - position
+    if 2 <= distance <= 0x81:
+        return bytes([FsaOpcode.JNE_SHORT.start | (distance - 2)])
+    if distance >= 0x84:
+        return bytes([FsaOpcode.JNE_EXT]) + (distance - 0x84).to_bytes(2, "little")
+    raise ValueError(f"Jump distance {distance} cannot be encoded")
+
+
+def encode_fsa(alternatives: Sequence[Sequence[FsaToken]]) -> bytes:
+    tail = bytes([FsaOpcode.ASSERT_EOS, FsaOpcode.MATCH, FsaOpcode.SUCCESS])
+    out = bytearray()
+    for i, alternative in enumerate(alternatives):
+        first = _fsa_token(alternative[0])
+        rest = b"".join(_fsa_token(t) for t in alternative[1:]) + tail
+        out += first
+        if i + 1 < len(alternatives):
+            position = len(out)
+            distance = 1 + len(rest)
+            if distance > 0x81:
+                distance = 3 + len(rest)
+            out += _fsa_jne(position, position + distance)
+        out += rest
+    return bytes(out)
+
+
+def _regex_token(token: RegexToken) -> bytes:
+    match token:
+        case "^":
+            return bytes([RegexOpcode.SPECIAL | 0x10])
+        case "$":
+            return bytes([RegexOpcode.SPECIAL | 0x20])
+        case ".":
+            return bytes([RegexOpcode.SPECIAL])
+        case str(text):
+            return b"".join(bytes([RegexOpcode.CHAR, ord(c)]) for c in text)
+        case ("class", ranges):
+            return _regex_class(RegexOpcode.CLASS, ranges)
+        case ("class*", ranges):
+            return _regex_class(RegexOpcode.CLASS_ANY, ranges)
+    raise ValueError(f"Unsupported regex token: {token!r}")
+
+
+def _regex_class(opcode: int, ranges: Sequence[Range]) -> bytes:
+    ranges = sorted(ranges)
+    return bytes([opcode | (len(ranges) << 4)]) + bytes(
+        b for lo_hi in ranges for b in lo_hi
+    )
+
+
+def encode_regex(tokens: Sequence[RegexToken]) -> bytes:
+    body = b"".join(_regex_token(t) for t in tokens) + bytes([RegexOpcode.MATCH | 0x10])
+    return MAGIC_NUMBER.to_bytes(4, "little") + len(body).to_bytes(2, "little") + body
+
+
+@dataclass
+class Layout:
+    regex_table_offset: int
+    vars_table_offset: int
+    policies_offset: int
+    op_table_offset: int
+    operation_nodes_offset: int
+    base_addr: int
+
+
+@dataclass
+class EncodedProfile:
+    data: bytes
+    layout: Layout
+    header: dict
+
+
+def _align(value: int, alignment: int = NODE_SIZE) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+class ProfileEncoder:
+    def __init__(self):
+        self.op_table: List[int] = []
+        self.nodes: List[bytes] = []
+        self.policies: List[int] = []
+        self._regexes: List[int] = []
+        self._vars: List[int] = []
+        self._records = bytearray()
+
+    def add_record(self, payload: bytes) -> int:
+        offset = len(self._records) // NODE_SIZE
+        self._records += payload
+        self._records += bytes(_align(len(self._records)) - len(self._records))
+        return offset
+
+    def add_string(self, text: str) -> int:
+        data = text.encode() + b"\x00"
+        return self.add_record(len(data).to_bytes(2, "little") + data)
+
+    def add_pattern(self, fsa: bytes) -> int:
+        return self.add_record(len(fsa).to_bytes(2, "little") + fsa)
+
+    def add_regex(self, bytecode: bytes) -> int:
+        self._regexes.append(
+            self.add_record(len(bytecode).to_bytes(2, "little") + bytecode)
+        )
+        return len(self._regexes) - 1
+
+    def add_global_var(self, name: str) -> int:
+        self._vars.append(self.add_string(name))
+        return len(self._vars) - 1
+
+    def add_policy(self, node_index: int) -> int:
+        self.policies.append(node_index)
+        return len(self.policies) - 1
+
+    def add_node(self, raw: bytes) -> int:
+        if len(raw) != NODE_SIZE:
+            raise ValueError(f"Operation nodes are {NODE_SIZE} bytes, got {len(raw)}")
+        self.nodes.append(raw)
+        return len(self.nodes) - 1
+
+    def encode(self) -> EncodedProfile:
+        header = dict(
+            type=0,
+            op_nodes_count=len(self.nodes),
+            sb_ops_count=len(self.op_table),
+            vars_count=len(self._vars),
+            states_count=0,
+            reserved=0,
+            profiles_count=0,
+            regex_count=len(self._regexes),
+            policies_count=len(self.policies),
+        )
+        out = bytearray(HeaderStruct.build(header))
+
+        def u16_table(values: Sequence[int]) -> int:
+            start = len(out)
+            for value in values:
+                out.extend(value.to_bytes(2, "little"))
+            return start
+
+        regex_table_offset = u16_table(self._regexes)
+        vars_table_offset = u16_table(self._vars)
+        policies_offset = u16_table(self.policies)
+        op_table_offset = u16_table(self.op_table)
+        out.extend(bytes(_align(len(out)) - len(out)))
+
+        operation_nodes_offset = len(out)
+        for raw in self.nodes:
+            out.extend(raw)
+        base_addr = len(out)
+        out.extend(self._records)
+
+        layout = Layout(
+            regex_table_offset,
+            vars_table_offset,
+            policies_offset,
+            op_table_offset,
+            operation_nodes_offset,
+            base_addr,
+        )
+        return EncodedProfile(bytes(out), layout, header)
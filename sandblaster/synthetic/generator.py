@@ -0,0 +1,219 @@
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sandblaster.filters.base import FilterType
+from sandblaster.loader import load_filters
+from sandblaster.nodes.terminal import NodeType
+from sandblaster.parsers.fsa_parser.processor import ranges_to_regex
+from sandblaster.parsers.fsa_parser.state import State
+from sandblaster.synthetic.encoder import (
+    EncodedProfile,
+    ProfileEncoder,
+    encode_fsa,
+    encode_regex,
+    nonterminal_raw,
+    terminal_raw,
+)
+
+SHAPES = ("random", "ladder", "parity")
+
+ATOM_KINDS = {
+    "pattern": (
+        FilterType.SB_VALUE_TYPE_PATTERN_LITERAL,
+        FilterType.SB_VALUE_TYPE_PATTERN_PREFIX,
+        FilterType.SB_VALUE_TYPE_PATTERN_SUBPATH,
+    ),
+    "string": (FilterType.SB_VALUE_TYPE_STRING,),
+    "regex": (FilterType.SB_VALUE_TYPE_PATTERN_REGEX,),
+    "bool": (FilterType.SB_VALUE_TYPE_BOOL,),
+}
+
+TERMINAL_FLAGS = (0x00, 0x04, 0x08, 0x02, 0x06, 0x20)
+INLINE = 0x800000
+GLOBAL_VARS = ("home", "front_user_home", "process_temp_dir", "bundle_path")
+
+
+@dataclass
+class SyntheticProfile:
+    encoded: EncodedProfile
+    operations: List[str]
+    atoms: List[Tuple[int, int]]
+    expected_arguments: Dict[Tuple[int, int], object] = field(default_factory=dict)
+
+    @property
+    def data(self) -> bytes:
+        return self.encoded.data
+
+
+def _filter_ids(filters) -> Dict[str, List[int]]:
+    by_kind: Dict[str, List[int]] = {kind: [] for kind in ATOM_KINDS}
+    for filter_id, info in sorted(filters._filters.items()):
+        if filter_id > 0xFF:
+            continue
+        arg_type = FilterType[info["argument_type"]]
+        for kind, types in ATOM_KINDS.items():
+            if arg_type in types:
+                by_kind[kind].append(filter_id)
+    return by_kind
+
+
+def _pattern_alternative(rng: random.Random, k: int, i: int, complexity: int):
+    tokens = [f"/gen/{k}/{i}"]
+    expected = [f"/gen/{k}/{i}"]
+    if complexity >= 3 and rng.random() < 0.5:
+        var = rng.randrange(len(GLOBAL_VARS))
+        tokens.insert(0, ("var", var))
+        expected.insert(0, f"${{{GLOBAL_VARS[var].upper()}}}")
+    if complexity >= 4 and rng.random() < 0.5:
+        ranges = [(0x30, 0x39)]
+        tokens.append(("range", ranges))
+        expected.append(ranges_to_regex(ranges, State.RANGE_INCLUSIVE))
+    return tokens, "".join(expected)
+
+
+def _make_atom(encoder, rng, kind, k, complexity):
+    match kind:
+        case "pattern":
+            alternatives = [
+                _pattern_alternative(rng, k, i, complexity)
+                for i in range(max(1, complexity))
+            ]
+            fsa = encode_fsa([tokens for tokens, _ in alternatives])
+            expected = sorted({text for _, text in alternatives})
+            return encoder.add_pattern(fsa), expected
+        case "string":
+            text = f"com.example.gen.{k}"
+            return encoder.add_string(text), f'"{text}"'
+        case "regex":
+            tokens = ["^", f"/gen/{k}/"] + [("class*", [(0x61, 0x7A)])] * (
+                complexity > 1
+            )
+            suffix = "[a-z]*" if complexity > 1 else ""
+            return encoder.add_regex(encode_regex(tokens)), f'#"^/gen/{k}/{suffix}"'
+        case "bool":
+            value = rng.randrange(2)
+            return value, "#t" if value == 1 else "#f"
+
+
+def _random_edges(rng, count, first_terminal, terminal_count, sharing):
+    edges = {}
+    parentless = list(range(first_terminal, first_terminal + terminal_count))
+    for i in reversed(range(count)):
+        candidates = count + terminal_count - (i + 1)
+        chosen = []
+        for _ in range(2):
+            if parentless and rng.random() >= sharing:
+                child = parentless.pop(rng.randrange(len(parentless)))
+            else:
+                child = rng.randrange(i + 1, i + 1 + candidates)
+            if chosen and child == chosen[0] and candidates > 1:
+                child = rng.choice(
+                    [c for c in range(i + 1, i + 1 + candidates) if c != chosen[0]]
+                )
+            chosen.append(child)
+        edges[i] = tuple(chosen)
+        parentless.append(i)
+    return edges
+
+
+def _ladder_edges(count, first_terminal, terminal_count):
+    edges = {}
+    deny = first_terminal + terminal_count - 1
+    for i in range(count):
+        match = i + 1 if i + 1 < count else first_terminal
+        unmatch = i + 2 if i + 2 < count else deny
+        edges[i] = (match, unmatch)
+    return edges
+
+
+def _parity_edges(count, first_terminal):
+    edges = {}
+    levels = count // 2
+    for level in range(levels):
+        even, odd = 2 * level, 2 * level + 1
+        if level + 1 < levels:
+            next_even, next_odd = even + 2, odd + 2
+        else:
+            next_even, next_odd = first_terminal, first_terminal + 1
+        edges[even] = (next_odd, next_even)
+        edges[odd] = (next_even, next_odd)
+    return edges
+
+
+def generate_profile(
+    nodes: int = 200,
+    operations: int = 4,
+    atoms: int = 16,
+    sharing: float = 0.3,
+    sinks: int = 4,
+    pattern_complexity: int = 2,
+    shape: str = "random",
+    policies: int = 0,
+    seed: Optional[int] = 0,
+    filters=None,
+) -> SyntheticProfile:
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape {shape!r}, expected one of {SHAPES}")
+    rng = random.Random(seed)
+    if filters is None:
+        filters, _ = load_filters()
+    filter_ids = _filter_ids(filters)
+    encoder = ProfileEncoder()
+
+    for name in GLOBAL_VARS:
+        encoder.add_global_var(name)
+
+    atom_list: List[Tuple[int, int]] = []
+    expected: Dict[Tuple[int, int], object] = {}
+    kinds = [kind for kind in ATOM_KINDS if filter_ids[kind]]
+    for k in range(atoms):
+        kind = kinds[k % len(kinds)]
+        filter_id = rng.choice(filter_ids[kind])
+        argument, value = _make_atom(encoder, rng, kind, k, pattern_complexity)
+        atom_list.append((filter_id, argument))
+        expected[(filter_id, argument)] = value
+
+    if shape == "parity":
+        nodes -= nodes % 2
+        sinks = 2
+    sinks = max(2, sinks)
+    match shape:
+        case "random":
+            edges = _random_edges(rng, nodes, nodes, sinks, sharing)
+        case "ladder":
+            edges = _ladder_edges(nodes, nodes, sinks)
+        case "parity":
+            edges = _parity_edges(nodes, nodes)
+
+    for i in range(nodes):
+        if shape == "random":
+            filter_id, argument = rng.choice(atom_list)
+        else:
+            filter_id, argument = atom_list[
+                (i // 2 if shape == "parity" else i) % atoms
+            ]
+        encoder.add_node(nonterminal_raw(filter_id, argument, *edges[i]))
+
+    for k in range(sinks):
+        action = NodeType.DENY if k == sinks - 1 or k % 2 else NodeType.ALLOW
+        flags = TERMINAL_FLAGS[k % len(TERMINAL_FLAGS)] if shape == "random" else 0
+        if policies and action == NodeType.ALLOW:
+            # Allow sinks refer to the policies in turn.
+            raw = terminal_raw(
+                action, flags | INLINE, arg_id=1, arg_value=k // 2 % policies
+            )
+        else:
+            raw = terminal_raw(action, flags)
+        encoder.add_node(raw)
+
+    for p in range(policies):
+        encoder.add_policy(rng.randrange(max(1, nodes)))
+
+    names = ["default"] + [f"synthetic-op-{k}" for k in range(1, operations)]
+    roots = list(range(min(operations, nodes))) if shape == "random" else [0]
+    roots = roots or [nodes]
+    for k in range(operations):
+        encoder.op_table.append(roots[k % len(roots)])
+
+    return SyntheticProfile(encoder.encode(), names, atom_list, expected)
@@ -0,0 +1,73 @@
+import io
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from sandblaster.filters.filter_resolver import FilterResolver
+from sandblaster.filters.modifier_resolver import ModifierResolver
+from sandblaster.filters.terminal_resolver import TerminalResolver
+from sandblaster.loader import LoadedProfile, load_filters
+from sandblaster.parsers.graph.graph import NodeGraph
+from sandblaster.parsers.graph.node import NodeParser
+from sandblaster.parsers.specialized.globals_parser import GlobalVarsParser
+from sandblaster.parsers.specialized.regex_parser import RegexListParser
+from sandblaster.parsers.specialized.tables import u16_table
+from sandblaster.synthetic.encoder import EncodedProfile, HeaderStruct
+
+
+@dataclass
+class SyntheticPayload:
+    sb_ops: List[str]
+    ops_to_reverse: List[int]
+    op_table: List[int]
+    operation_nodes: NodeGraph
+    policies: List[int]
+    regex_list: List[str]
+    global_vars: List[str]
+
+
+def read_profile(
+    encoded: EncodedProfile,
+    sandbox_operations: Sequence[str],
+    operation_filter: Optional[Sequence[str]] = None,
+    metadata=None,
+) -> LoadedProfile:
+    data = encoded.data
+    layout = encoded.layout
+    header = HeaderStruct.parse(data)
+    infile = io.BytesIO(data)
+
+    infile.seek(layout.operation_nodes_offset)
+    nodes, flags = NodeParser().parse(infile, header.op_nodes_count)
+    operation_nodes = NodeGraph(nodes)
+    operation_nodes.link()
+
+    regex_list = RegexListParser.parse(
+        infile, layout.base_addr, header.regex_count, layout.regex_table_offset
+    )
+    global_vars = GlobalVarsParser.parse(
+        infile, layout.base_addr, header.vars_count, layout.vars_table_offset
+    )
+    op_table = list(u16_table(data, layout.op_table_offset, header.sb_ops_count))
+    sb_ops = list(sandbox_operations)
+    ops_to_reverse = [
+        idx
+        for idx, name in enumerate(sb_ops[: len(op_table)])
+        if not operation_filter or name in operation_filter
+    ]
+    payload = SyntheticPayload(
+        sb_ops,
+        ops_to_reverse,
+        op_table,
+        operation_nodes,
+        list(u16_table(data, layout.policies_offset, header.policies_count)),
+        regex_list,
+        global_vars,
+    )
+
+    filters, modifiers = metadata or load_filters()
+    return LoadedProfile(
+        payload,
+        FilterResolver(infile, layout.base_addr, regex_list, global_vars, filters),
+        ModifierResolver(infile, layout.base_addr, regex_list, global_vars, modifiers),
+        TerminalResolver(modifiers, flags),
+    )
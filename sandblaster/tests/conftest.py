@@ -0,0 +1,43 @@
+import pytest
+
+from sandblaster.synthetic.generator import generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+DEFAULT_PROFILE = {"nodes": 60, "atoms": 8, "operations": 3, "seed": 5}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    # Keep compiled filter tables and snapshots out of the user's cache.
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("SANDBLASTER_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+        yield
+
+
+@pytest.fixture(scope="module")
+def synthetic(request):
+    # Modules pick their shape with a SYNTHETIC dict of generate_profile
+    # options; indirect parametrization overrides it per test.
+    options = {
+        **DEFAULT_PROFILE,
+        **getattr(request.module, "SYNTHETIC", {}),
+        **getattr(request, "param", {}),
+    }
+    return generate_profile(**options)
+
+
+@pytest.fixture(scope="module")
+def profile(synthetic):
+    return read_profile(synthetic.encoded, synthetic.operations)
+
+
+def run_profile(profile, **kwargs):
+    from sandblaster.parsers.analysis import bool_expressions
+
+    bool_expressions.process_profile(
+        profile.payload,
+        profile.filter_resolver,
+        profile.modifier_resolver,
+        profile.terminal_resolver,
+        **kwargs,
+    )
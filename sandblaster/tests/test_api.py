@@ -0,0 +1,58 @@
+import pytest
+
+from sandblaster.api import Profile
+from sandblaster.export import iter_operations, open_exporter
+from sandblaster.loader import load_filters
+from sandblaster.memory import SpillingCache
+from sandblaster.parsers.analysis.bool_expressions import decompile_operations
+from sandblaster.snapshot import blob_digest, snapshot_path, write_snapshot
+from sandblaster.synthetic.reader import read_profile
+
+SYNTHETIC = {"nodes": 80, "atoms": 12, "operations": 4, "seed": 8}
+
+
+@pytest.fixture(scope="module")
+def exported(synthetic, tmp_path_factory):
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    path = str(tmp_path_factory.mktemp("api") / "profile.jsonl")
+    parsed = {}
+    with open_exporter(path, "jsonl") as exporter:
+        for name, rules in decompile_operations(
+            profile.payload,
+            profile.filter_resolver,
+            profile.modifier_resolver,
+            profile.terminal_resolver,
+            parsed,
+        ):
+            exporter.add_operation(name, rules, parsed)
+    return list(iter_operations(path))
+
+
+@pytest.mark.parametrize("cache_size", [None, 2])
+def test_records_match_export(synthetic, exported, cache_size):
+    parsed = SpillingCache(cache_size) if cache_size else None
+    loaded = read_profile(synthetic.encoded, synthetic.operations)
+    with Profile(loaded, parsed=parsed) as profile:
+        records = list(profile.iter_operations())
+        assert records == exported
+        assert profile.decompile(exported[-1].name) == exported[-1]
+        with pytest.raises(KeyError):
+            profile.decompile("no-such-operation")
+    if parsed is not None:
+        parsed.close()
+
+
+def test_open_from_snapshot(synthetic, exported, tmp_path, monkeypatch):
+    monkeypatch.setenv("SANDBLASTER_CACHE_DIR", str(tmp_path))
+    blob = tmp_path / "profile.bin"
+    blob.write_bytes(synthetic.data)
+    write_snapshot(
+        snapshot_path(blob_digest(synthetic.data), load_filters()[0].digest),
+        read_profile(synthetic.encoded, synthetic.operations),
+        synthetic.encoded.layout.base_addr,
+        {},
+    )
+
+    with Profile.open(blob, synthetic.operations, cache_size=4) as profile:
+        assert profile.operations == [record.name for record in exported]
+        assert next(profile.iter_operations()) == exported[0]
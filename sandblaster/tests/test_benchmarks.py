@@ -0,0 +1,21 @@
+import pytest
+
+from sandblaster.benchmarks.cases import CASES
+from sandblaster.benchmarks.runner import compare_records, run_cases
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_case_runs(name):
+    results = run_cases([name], sizes=[4], repeat=1)
+    assert list(results) == [f"{name}[4]"]
+    assert results[f"{name}[4]"] >= 0
+
+
+def test_compare_flags_slowdowns():
+    baseline = {"results": {"a[1]": 1.0, "b[1]": 1.0, "c[1]": 1.0}}
+    current = {"results": {"a[1]": 1.05, "b[1]": 1.5, "d[1]": 9.0}}
+    rows = compare_records(baseline, current, threshold=0.1)
+    assert {row["case"]: row["regression"] for row in rows} == {
+        "a[1]": False,
+        "b[1]": True,
+    }
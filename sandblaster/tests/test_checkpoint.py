@@ -0,0 +1,74 @@
+import pytest
+
+from sandblaster.checkpoint import DONE, FAILED, Checkpoint
+from sandblaster.parsers.analysis import bool_expressions
+from sandblaster.tests.conftest import run_profile
+
+
+def operations(profile):
+    payload = profile.payload
+    return [payload.sb_ops[idx] for idx in payload.ops_to_reverse]
+
+
+def test_resume_replays_completed_operations(profile, tmp_path, capsys):
+    run_profile(profile, checkpoint=Checkpoint(tmp_path, "blob", 1, {}))
+    first = capsys.readouterr().out
+    assert first.count("*" * 10) == len(operations(profile))
+
+    checkpoint = Checkpoint(tmp_path, "blob", 1, {}, resume=True)
+    assert all(checkpoint.status(op) == DONE for op in operations(profile))
+    run_profile(profile, checkpoint=checkpoint)
+    assert capsys.readouterr().out == first
+    assert all(e["attempts"] == 1 for e in checkpoint.operations.values())
+
+
+@pytest.mark.parametrize("retry_failed", [False, True])
+def test_failed_operations(profile, tmp_path, monkeypatch, capsys, retry_failed):
+    failing = operations(profile)[0]
+    original = bool_expressions._process_graph_from_node
+
+    def process(node, payload, filters, parsed, mod, term, sb_op, *args):
+        if sb_op == failing:
+            raise RuntimeError("boom")
+        return original(node, payload, filters, parsed, mod, term, sb_op, *args)
+
+    monkeypatch.setattr(bool_expressions, "_process_graph_from_node", process)
+    run_profile(profile, checkpoint=Checkpoint(tmp_path, "blob", 1, {}))
+    checkpoint = Checkpoint(tmp_path, "blob", 1, {}, resume=True)
+    assert checkpoint.operations[failing]["status"] == FAILED
+    assert checkpoint.operations[failing]["error"] == "RuntimeError: boom"
+
+    monkeypatch.setattr(bool_expressions, "_process_graph_from_node", original)
+    checkpoint = Checkpoint(
+        tmp_path, "blob", 1, {}, resume=True, retry_failed=retry_failed
+    )
+    run_profile(profile, checkpoint=checkpoint)
+    expected = DONE if retry_failed else FAILED
+    assert checkpoint.status(failing) == expected
+    assert checkpoint.operations[failing]["attempts"] == 1 + retry_failed
+
+
+@pytest.mark.parametrize("blob, version", [("other", 1), ("blob", 2)])
+def test_resume_rejects_other_runs(tmp_path, blob, version):
+    Checkpoint(tmp_path, "blob", 1, {})
+    with pytest.raises(ValueError):
+        Checkpoint(tmp_path, blob, version, {}, resume=True)
+
+
+@pytest.mark.parametrize("earlier", [None, "boom"])
+def test_interrupt_keeps_earlier_attempt(tmp_path, earlier):
+    if earlier is not None:
+        with Checkpoint(tmp_path, "blob", 1, {}).operation("op"):
+            raise RuntimeError(earlier)
+    checkpoint = Checkpoint(tmp_path, "blob", 1, {}, resume=True, retry_failed=True)
+    with pytest.raises(KeyboardInterrupt):
+        with checkpoint.operation("op"):
+            raise KeyboardInterrupt
+
+    checkpoint = Checkpoint(tmp_path, "blob", 1, {}, resume=True)
+    if earlier is None:
+        assert checkpoint.status("op") is None
+    else:
+        entry = checkpoint.operations["op"]
+        assert (entry["status"], entry["attempts"]) == (FAILED, 1)
+        assert entry["error"] == "RuntimeError: boom"
@@ -0,0 +1,87 @@
+from importlib.resources import files
+from types import SimpleNamespace
+
+import pytest
+
+from sandblaster.configs.filters import Filters
+from sandblaster.filters.terminal_resolver import TerminalResolver
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.nodes.terminal import TerminalNode
+from sandblaster.parsers.analysis import equivalence
+from sandblaster.parsers.analysis.equivalence import (
+    AtomSpace,
+    DecisionFunction,
+    ProfileAtoms,
+    compare_functions,
+)
+from sandblaster.parsers.graph.graph import NodeGraph
+
+ALLOW, DENY = "allow", "deny"
+
+
+class PathResolver:
+    def resolve(self, filter_id, argument_id):
+        return "literal", [f"/p{argument_id}"]
+
+
+def build_graph(spec):
+    nodes = {}
+    for offset, entry in spec.items():
+        if entry in (ALLOW, DENY):
+            raw = bytes([1, int(entry == DENY), 0, 0, 0, 0, 0, 0])
+            nodes[offset] = TerminalNode(offset, raw)
+        else:
+            arg, match, unmatch = entry
+            raw = bytes([0, 1, arg, 0, match, 0, unmatch, 0])
+            nodes[offset] = NonTerminalNode(offset, raw)
+    graph = NodeGraph(nodes)
+    graph.link()
+    return graph.nodes[0]
+
+
+def make_profile():
+    modifiers = Filters(files("sandblaster.misc") / "modifiers.json")
+    return SimpleNamespace(
+        filter_resolver=PathResolver(),
+        modifier_resolver=None,
+        terminal_resolver=TerminalResolver(modifiers, {0, 1}),
+    )
+
+
+# p1 and p2 both required, tested in either order
+AND_12 = {0: (1, 1, 3), 1: (2, 2, 3), 2: ALLOW, 3: DENY}
+AND_21 = {0: (2, 1, 3), 1: (1, 2, 3), 2: ALLOW, 3: DENY}
+OR_12 = {0: (1, 2, 1), 1: (2, 2, 3), 2: ALLOW, 3: DENY}
+# redundant test of p3 whose branches agree
+AND_12_NOISY = {0: (3, 1, 1), 1: (1, 2, 4), 2: (2, 3, 4), 3: ALLOW, 4: DENY}
+
+TEST_CASES = [
+    (AND_12, AND_12, "equal", "canonical", None),
+    (AND_12, AND_12_NOISY, "equal", "canonical", None),
+    (AND_12, AND_21, "equal", "truth-table", None),
+    (AND_12, OR_12, "different", "truth-table", {"/p1": False, "/p2": True}),
+]
+
+
+@pytest.mark.parametrize("spec_a,spec_b,status,method,condition", TEST_CASES)
+def test_compare_functions(spec_a, spec_b, status, method, condition):
+    space = AtomSpace()
+    fa = DecisionFunction(build_graph(spec_a), ProfileAtoms(make_profile(), space))
+    fb = DecisionFunction(build_graph(spec_b), ProfileAtoms(make_profile(), space))
+    result = compare_functions(fa, fb, {})
+    assert result[:2] == (status, method)
+    if condition is not None:
+        cube = {space.atoms[i][1][0]: value for i, value in result[2].items()}
+        assert cube == condition
+
+
+def test_compare_functions_z3(monkeypatch):
+    monkeypatch.setattr(equivalence, "MAX_TRUTH_TABLE_VARS", 0)
+    space = AtomSpace()
+    fa = DecisionFunction(build_graph(AND_12), ProfileAtoms(make_profile(), space))
+    fb = DecisionFunction(build_graph(AND_21), ProfileAtoms(make_profile(), space))
+    fc = DecisionFunction(build_graph(OR_12), ProfileAtoms(make_profile(), space))
+    assert compare_functions(fa, fb, {})[:2] == ("equal", "z3")
+    status, method, cube = compare_functions(fa, fc, {})
+    assert (status, method) == ("different", "z3")
+    assert fa.evaluate(cube) != fc.evaluate(cube)
@@ -0,0 +1,68 @@
+import pytest
+
+from sandblaster.export import BinaryProfile, iter_operations, open_exporter
+from sandblaster.export.records import (
+    atom_record,
+    expr_table,
+    exprs_from_table,
+    terminal_record,
+)
+from sandblaster.parsers.analysis.ir import Atom, Ite
+from sandblaster.parsers.analysis.bool_expressions import decompile_operations
+from sandblaster.synthetic.generator import generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+
+@pytest.fixture(scope="module")
+def decompiled():
+    synthetic = generate_profile(nodes=80, operations=3, policies=1, seed=4)
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    parsed = {}
+    operations = list(
+        decompile_operations(
+            profile.payload,
+            profile.filter_resolver,
+            profile.modifier_resolver,
+            profile.terminal_resolver,
+            parsed,
+        )
+    )
+    return profile.payload, operations, parsed
+
+
+@pytest.mark.parametrize("export_format", ["sbir", "jsonl"])
+def test_export_round_trip(tmp_path, decompiled, export_format):
+    payload, operations, parsed = decompiled
+    path = str(tmp_path / f"profile.{export_format}")
+    with open_exporter(path, export_format) as exporter:
+        exporter.write_tables(payload.regex_list, payload.global_vars)
+        for name, rules in operations:
+            exporter.add_operation(name, rules, parsed)
+
+    if export_format == "sbir":
+        with BinaryProfile(path) as profile:
+            assert profile.tables()["global_vars"] == payload.global_vars
+            assert profile.operations == [name for name, _ in operations]
+            records = [profile.operation(name) for name, _ in reversed(operations)]
+        records.reverse()
+    else:
+        records = list(iter_operations(path))
+
+    for (name, rules), record in zip(operations, records):
+        assert record.name == name
+        assert [r.expr for r in record.rules] == [r.expr for r in rules]
+        assert [r.decision for r in record.rules] == [
+            terminal_record(r.decision) for r in rules
+        ]
+        for atom, entry in record.atoms.items():
+            assert entry == atom_record(atom, parsed[atom])
+
+
+def test_expression_table_keeps_sharing():
+    expr = Atom(0)
+    for atom in range(1, 200):
+        expr = Ite(Atom(atom), expr, Ite(Atom(atom + 1), expr, Atom(atom + 2)))
+    rows, roots = expr_table([expr, expr])
+    assert roots == [len(rows) - 1] * 2
+    assert len(rows) < 1000
+    assert exprs_from_table(rows)[roots[0]] is expr
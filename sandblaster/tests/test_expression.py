@@ -0,0 +1,47 @@
+import pytest
+import z3
+
+from sandblaster.parsers.analysis import expression
+from sandblaster.parsers.analysis.budget import Budget
+from sandblaster.parsers.analysis.expression import ite_expr_to_nnf, select_strategy
+
+a, b, c = z3.Bools("a b c")
+
+
+@pytest.mark.parametrize(
+    "expr, strategy",
+    [
+        (z3.If(a, b, False), "tiny"),
+        (z3.Or(*[z3.If(z3.Bool(f"x{i}"), a, b) for i in range(20)]), "medium"),
+        (z3.Or(*[z3.Bool(f"x{i}") for i in range(100)]), "huge"),
+    ],
+)
+def test_select_strategy(expr, strategy):
+    assert select_strategy(expr) == strategy
+
+
+def test_tiny_expressions_are_rewritten():
+    assert z3.eq(ite_expr_to_nnf(z3.If(a, b, False)), z3.And(a, b))
+
+
+def test_exhausted_budget_keeps_if_form():
+    expr = z3.If(a, b, c)
+    budget = Budget(0).child(10)
+    assert budget.exhausted
+    assert z3.eq(ite_expr_to_nnf(expr, budget=budget), expr)
+
+
+def test_budget_spent_by_medium_tactic_skips_fallback(monkeypatch):
+    expr = z3.Or(*[z3.If(z3.Bool(f"x{i}"), a, b) for i in range(20)])
+    budget = Budget(60)
+    calls = []
+
+    def apply(tactic, expr):
+        calls.append(tactic)
+        budget.cancel()
+        raise z3.Z3Exception("timeout")
+
+    monkeypatch.setattr(expression, "_apply", apply)
+    assert z3.eq(ite_expr_to_nnf(expr, budget=budget), expr)
+    assert len(calls) == 1
+    assert budget.remaining_ms(600) == 1
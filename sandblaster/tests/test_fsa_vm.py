@@ -0,0 +1,40 @@
+import pytest
+
+from sandblaster.parsers.fsa_parser.processor import parse_fsm_string
+from sandblaster.parsers.fsa_parser.vm import LITERAL, PREFIX, SUBPATH, FsaProgram
+from sandblaster.synthetic.encoder import encode_fsa
+
+LOWER = ("range", [(0x61, 0x7A)])
+DIGIT = ("not-range", [(0x61, 0x7A)])
+
+CASES = [
+    ([["/aaa"]], "/aaa", LITERAL, True),
+    ([["/aaa"]], "/aaa/b", LITERAL, False),
+    ([["/aaa"]], "/aaa/b", PREFIX, True),
+    ([["/aaa"]], "/aaab", PREFIX, True),
+    ([["/aaa"]], "/aaa/b", SUBPATH, True),
+    ([["/aaa"]], "/aaab", SUBPATH, False),
+    ([["/aaa"], ["/bbb"]], "/bbb", LITERAL, True),
+    ([["/aaa"], ["/bbb"]], "/ccc", LITERAL, False),
+    ([[("var", 0), "/Library"]], "/Users/me/Library", LITERAL, True),
+    ([[("var", 1), "/Library"]], "/Users/me/Library", LITERAL, False),
+    ([["/tmp/", LOWER]], "/tmp/q", LITERAL, True),
+    ([["/tmp/", LOWER]], "/tmp/Q", LITERAL, False),
+    ([["/tmp/", DIGIT]], "/tmp/7", LITERAL, True),
+    ([["/x" * 100, "/y" * 100], ["/z"]], "/x" * 100 + "/y" * 100, LITERAL, True),
+]
+
+
+@pytest.mark.parametrize("alternatives,text,mode,expected", CASES)
+def test_match(alternatives, text, mode, expected):
+    program = FsaProgram.from_bytecode(encode_fsa(alternatives))
+    assert program.match(text, {0: "/Users/me"}, mode) is expected
+
+
+def test_matches_every_expansion():
+    alternatives = [[f"/p{i:02d}", "/q"] for i in range(40)]
+    data = encode_fsa(alternatives)
+    program = FsaProgram.from_bytecode(data)
+    for text in parse_fsm_string(data, []):
+        assert program.match(text)
+    assert not program.match("/p40/q")
@@ -0,0 +1,49 @@
+import pytest
+
+from sandblaster.index import ProfileIndex, argument_values, collect_atoms
+from sandblaster.synthetic.generator import generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+
+@pytest.fixture(scope="module")
+def profile():
+    return generate_profile(nodes=60, atoms=12, pattern_complexity=2, seed=3)
+
+
+@pytest.mark.parametrize(
+    "argument, expected",
+    [
+        (None, []),
+        (["/a", "${HOME}/b"], ["/a", "${HOME}/b"]),
+        ('"com.apple.x"', ["com.apple.x"]),
+        ('#"^/a/[0-9]"', ["^/a/[0-9]"]),
+        ("#t", ["#t"]),
+        (7, ["7"]),
+    ],
+)
+def test_argument_values(argument, expected):
+    assert argument_values(argument) == expected
+
+
+def test_index_round_trip(profile, tmp_path):
+    loaded = read_profile(profile.encoded, profile.operations)
+    nodes, operations = collect_atoms(loaded.payload)
+    path = str(tmp_path / "index.db")
+
+    with ProfileIndex(path) as index:
+        assert index.add(loaded, "synthetic", "digest", "build-1")
+        assert not index.add(loaded, "synthetic", "digest", "build-1")
+
+    with ProfileIndex(path) as index:
+        for atom in profile.atoms:
+            name, argument = loaded.filter_resolver.resolve(*atom)
+            value = argument_values(argument)[0]
+            hits = [hit for hit in index.find(value, filter_name=name)]
+            assert any(
+                hit.nodes == sorted(nodes[atom])
+                and hit.operations == sorted(operations.get(atom, ()))
+                for hit in hits
+            )
+            prefix = [hit.value for hit in index.find(value[:2], prefix=True)]
+            assert value in prefix
+        assert list(index.find("/does/not/exist")) == []
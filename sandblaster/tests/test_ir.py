@@ -0,0 +1,50 @@
+import pickle
+
+import pytest
+import z3
+
+from sandblaster.parsers.analysis.ir import (
+    FALSE,
+    TRUE,
+    And,
+    Atom,
+    Ite,
+    Not,
+    Or,
+    atom_id,
+    atom_key,
+    from_z3,
+    to_z3,
+)
+
+A, B, C = (Atom(atom_id(1, i)) for i in range(3))
+
+
+def test_nodes_are_interned_and_immutable():
+    assert And(A, Not(B)) is And(Atom(atom_id(1, 0)), Not(Atom(atom_id(1, 1))))
+    assert And(A, B) is not Or(A, B)
+    assert atom_key(A.id) == (1, 0)
+    with pytest.raises(AttributeError):
+        A.id = 3
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [TRUE, FALSE, A, Not(A), And(A, Or(B, Not(C))), Ite(A, B, And(B, C))],
+)
+def test_round_trips(expr):
+    assert pickle.loads(pickle.dumps(expr)) is expr
+    assert from_z3(to_z3(expr)) is expr
+
+
+def test_from_z3_keeps_sharing():
+    shared = z3.Or(to_z3(A), to_z3(B))
+    expr = from_z3(z3.And(shared, z3.Not(shared)))
+    assert expr.args[0] is expr.args[1].arg
+
+
+def test_deep_expressions_pickle():
+    expr = A
+    for i in range(5000):
+        expr = Ite(Atom(atom_id(2, i)), expr, Not(expr))
+    assert pickle.loads(pickle.dumps(expr)) is expr
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+import z3
+
+from sandblaster.memory import MemoryWatchdog, SpillingCache, parse_size
+from sandblaster.parsers.analysis.expression import reset_z3_context
+from sandblaster.parsers.analysis.z3_lock import Z3_LOCK
+from sandblaster.synthetic.reader import read_profile
+from sandblaster.tests.conftest import run_profile
+
+SYNTHETIC = {"nodes": 60, "atoms": 24, "operations": 4, "seed": 9}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("1024", 1024), ("512M", 512 << 20), ("2GiB", 2 << 30), ("1.5k", 1536)],
+)
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+def test_spilling_cache(tmp_path):
+    cache = SpillingCache(capacity=4, directory=str(tmp_path))
+    try:
+        cache.update({i: [str(i)] * i for i in range(10)})
+        assert len(cache.memory) == 4
+        assert 0 in cache and 10 not in cache
+        assert cache[0] == []
+        assert list(cache.memory)[-1] == 0
+        cache.spill()
+        assert not cache.memory
+        assert dict(cache) == {i: [str(i)] * i for i in range(10)}
+        del cache[3]
+        assert 3 not in cache and len(cache) == 9
+    finally:
+        cache.close()
+
+
+def test_bounded_run_matches_unbounded(synthetic, capsys):
+    def run(memory=None):
+        profile = read_profile(synthetic.encoded, synthetic.operations)
+        run_profile(profile, memory=memory)
+        return capsys.readouterr().out
+
+    expected = run()
+    # A 1-byte limit spills every cache after each operation.
+    with MemoryWatchdog(1) as memory:
+        assert run(memory) == expected
+        assert all(not cache.memory for cache in memory.caches)
+
+
+def test_reset_waits_for_z3_lock():
+    released = threading.Event()
+
+    def reset():
+        reset_z3_context()
+        released.set()
+
+    with Z3_LOCK:
+        ctx = z3.main_ctx()
+        thread = threading.Thread(target=reset)
+        thread.start()
+        assert not released.wait(0.1)
+        assert z3.main_ctx() is ctx
+        # Re-entrant: a holder may reset the context itself.
+        reset_z3_context()
+    thread.join()
+    assert released.is_set() and z3.main_ctx() is not ctx
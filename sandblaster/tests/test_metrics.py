@@ -0,0 +1,44 @@
+from sandblaster.metrics import Metrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    with metrics.operation("file-read-data"), metrics.stage("simplify"):
+        metrics.count("z3.tactic_calls")
+    assert metrics.to_dict()["counters"] == {}
+    assert metrics.operations == {}
+
+
+def test_stages_and_counters_per_operation():
+    metrics = Metrics()
+    metrics.enable()
+    with metrics.stage("load"):
+        metrics.count("regex.entries", 3)
+    with metrics.operation("file-read-data"):
+        with metrics.stage("simplify"):
+            metrics.count("z3.tactic_calls")
+        metrics.count("z3.tactic_calls")
+
+    result = metrics.to_dict()
+    assert result["counters"] == {"regex.entries": 3, "z3.tactic_calls": 2}
+    assert set(result["stages"]) == {"load", "simplify"}
+    operation = result["operations"]["file-read-data"]
+    assert operation["counters"] == {"z3.tactic_calls": 2}
+    assert operation["stages"]["simplify"]["calls"] == 1
+    assert result["run"]["peak_rss_bytes"] > 0
+
+
+def test_profile_scoped_to_operation(tmp_path):
+    metrics = Metrics()
+    metrics.enable()
+    metrics.profile_operation = "mach-lookup"
+    metrics.profile_kind = "tracemalloc"
+    metrics.profile_output = str(tmp_path / "mach-lookup.txt")
+    with metrics.operation("file-read-data"):
+        pass
+    with metrics.operation("mach-lookup"):
+        [bytes(1024) for _ in range(10)]
+
+    assert "profile" not in metrics.operations["file-read-data"]
+    assert metrics.operations["mach-lookup"]["profile"]["kind"] == "tracemalloc"
+    assert (tmp_path / "mach-lookup.txt").exists()
@@ -0,0 +1,213 @@
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+import pytest
+
+from sandblaster.api import Profile
+from sandblaster.checkpoint import Checkpoint
+from sandblaster.export import open_exporter
+from sandblaster.parsers.analysis import bool_expressions
+from sandblaster.parsers.analysis.budget import Budget
+from sandblaster.render import read_records, render_records
+from sandblaster.server import ProfileCache, _decompile
+from sandblaster.synthetic.reader import read_profile
+from sandblaster.tests.conftest import run_profile
+
+SYNTHETIC = {"nodes": 50, "atoms": 8, "operations": 5, "policies": 2, "seed": 5}
+
+
+def run(profile, checkpoint=None, exporter=None):
+    run_profile(profile, exporter=exporter, checkpoint=checkpoint)
+
+
+def blocks(out):
+    # Body lines of every define-policy block, keyed by policy name.
+    found, name = {}, None
+    for line in out.splitlines():
+        if line.startswith("(define-policy "):
+            name = line.split()[1]
+            found[name] = []
+        elif line == ")" and name is not None:
+            name = None
+        elif name is not None:
+            found[name].append(line)
+    return found
+
+
+class FailingExporter:
+    def __init__(self, failing):
+        self.failing = failing
+        self.names = []
+
+    def write_tables(self, regex_list, global_vars):
+        pass
+
+    def add_operation(self, name, rules, parsed):
+        if name == self.failing:
+            raise RuntimeError("export failed")
+        self.names.append(name)
+
+
+def test_policies_decompiled_and_printed_once(profile, monkeypatch, capsys):
+    calls = Counter()
+    original = bool_expressions._process_graph_from_node
+
+    def process(node, payload, filters, parsed, mod, term, sb_op, *args):
+        calls[sb_op] += 1
+        return original(node, payload, filters, parsed, mod, term, sb_op, *args)
+
+    monkeypatch.setattr(bool_expressions, "_process_graph_from_node", process)
+    run(profile)
+    out = capsys.readouterr().out
+
+    assert {name: calls[name] for name in calls if name.startswith("policy-")} == {
+        "policy-0": 1,
+        "policy-1": 1,
+    }
+    lines = out.splitlines()
+    for name in ("policy-0", "policy-1"):
+        defined = lines.index(f"(define-policy {name}")
+        assert lines.count(f"(define-policy {name}") == 1
+        # Policies may refer to each other, but operations only refer to
+        # blocks already printed.
+        used = next(
+            i
+            for i, line in enumerate(lines)
+            if line.startswith("(allow ") and f"(policy {name})" in line
+        )
+        assert defined < used
+
+
+def test_policy_blocks_have_no_operation(profile, capsys):
+    run(profile)
+    found = blocks(capsys.readouterr().out)
+    assert set(found) == {"policy-0", "policy-1"}
+    for body in found.values():
+        headers = [line for line in body if re.match(r"  \(allow\b", line)]
+        assert headers
+        assert all(re.match(r"  \(allow( \(|$)", line) for line in headers)
+
+
+def test_resume_does_not_repeat_policies(profile, tmp_path, monkeypatch, capsys):
+    run(profile)
+    expected = capsys.readouterr().out
+    payload = profile.payload
+    failing = payload.sb_ops[payload.ops_to_reverse[-1]]
+    original = bool_expressions._process_graph_from_node
+
+    def process(node, payload, filters, parsed, mod, term, sb_op, *args):
+        if sb_op == failing:
+            raise RuntimeError("boom")
+        return original(node, payload, filters, parsed, mod, term, sb_op, *args)
+
+    monkeypatch.setattr(bool_expressions, "_process_graph_from_node", process)
+    run(profile, Checkpoint(tmp_path, "blob", 1, {}))
+    monkeypatch.setattr(bool_expressions, "_process_graph_from_node", original)
+    capsys.readouterr()
+
+    run(profile, Checkpoint(tmp_path, "blob", 1, {}, resume=True, retry_failed=True))
+    assert capsys.readouterr().out == expected
+
+
+def test_api_policy_records(profile):
+    with Profile(profile) as api:
+        record = api.policy(1)
+        assert record.name == "policy-1"
+        assert record.rules
+        assert api.policy(1) == record
+        referenced = {
+            rule.decision["inline"]["policy"]
+            for name in api.operations
+            for rule in api.decompile(name).rules
+            if rule.decision["inline"]
+        }
+        assert referenced == {0, 1}
+        with pytest.raises(KeyError):
+            api.policy(2)
+
+
+def test_failed_operation_does_not_keep_blocks(profile, tmp_path, capsys):
+    payload = profile.payload
+    first = payload.sb_ops[payload.ops_to_reverse[0]]
+    exporter = FailingExporter(first)
+    run(profile, Checkpoint(tmp_path, "blob", 1, {}), exporter)
+    out = capsys.readouterr().out
+
+    # The first operation printed the blocks and then failed, so the next
+    # one prints them again; the export holds each policy once.
+    assert first not in out
+    assert set(blocks(out)) == {"policy-0", "policy-1"}
+    assert sorted(n for n in exporter.names if n.startswith("policy-")) == [
+        "policy-0",
+        "policy-1",
+    ]
+
+
+def test_dangling_policy_offset(synthetic, capsys):
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    profile.payload.policies[1] = 0xFFFF
+    with Profile(profile) as api:
+        assert api.policy(1).rules == []
+
+    run(profile)
+    found = blocks(capsys.readouterr().out)
+    assert found["policy-1"] == []
+    assert found["policy-0"]
+
+
+def test_api_yields_policies_before_use(profile):
+    with Profile(profile) as api:
+        records = list(api.iter_operations())
+    names = [record.name for record in records]
+    assert sorted(n for n in names if n.startswith("policy-")) == [
+        "policy-0",
+        "policy-1",
+    ]
+    for position, record in enumerate(records):
+        if record.name.startswith("policy-"):
+            # Policies may refer to each other.
+            continue
+        for rule in record.rules:
+            inline = rule.decision["inline"] or {}
+            if "policy" in inline:
+                assert f"policy-{inline['policy']}" in names[:position]
+
+
+def test_server_responses_carry_policy_blocks(synthetic, tmp_path, capsys):
+    run(read_profile(synthetic.encoded, synthetic.operations))
+    expected = blocks(capsys.readouterr().out)
+
+    @contextmanager
+    def loader(path, operations):
+        yield read_profile(synthetic.encoded, operations)
+
+    (tmp_path / "profile").write_bytes(synthetic.data)
+    (tmp_path / "ops").write_text("\n".join(synthetic.operations))
+    request = {
+        "profile": str(tmp_path / "profile"),
+        "operations": str(tmp_path / "ops"),
+    }
+    cache = ProfileCache(1, loader)
+    for _ in range(2):
+        response = _decompile(cache, request, Budget())
+        lines = [line for op in response["operations"] for line in op["sbpl"]]
+        assert blocks("\n".join(lines)) == expected
+    (entry,) = cache.entries.values()
+    assert sorted(entry.policies) == [0, 1]
+
+
+def test_render_leaves_missing_policies_unresolved(profile, tmp_path, caplog):
+    path = str(tmp_path / "profile.jsonl")
+    with open_exporter(path, "jsonl") as exporter:
+        run(profile, exporter=exporter)
+    records = [r for r in read_records(path) if r.name != "policy-1"]
+
+    lines = []
+    with caplog.at_level(logging.WARNING):
+        render_records(records, profile, lines.append)
+    out = "\n".join(lines)
+    assert "(policy policy-1)" in out
+    assert set(blocks(out)) == {"policy-0"}
+    assert caplog.text.count("policy-1 record") == 1
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.parsers.analysis import bool_expressions
+from sandblaster.parsers.analysis.ir import And, Atom, Const, Ite, Not, Or, atom_id
+from sandblaster.parsers.analysis import preview as previews
+from sandblaster.parsers.analysis.preview import PreviewDocument, preview_conditions
+from sandblaster.parsers.graph.reduction import reduce_graph
+from sandblaster.tests.conftest import run_profile
+
+SYNTHETIC = {"nodes": 80, "atoms": 12, "operations": 4, "seed": 21}
+
+
+def evaluate(expr, values):
+    match expr:
+        case Const():
+            return expr.value
+        case Atom():
+            # Atoms off the walked path do not change the outcome.
+            return values.get(expr.id, False)
+        case Not():
+            return not evaluate(expr.arg, values)
+        case And():
+            return all(evaluate(arg, values) for arg in expr.args)
+        case Or():
+            return any(evaluate(arg, values) for arg in expr.args)
+        case Ite():
+            branch = expr.then if evaluate(expr.cond, values) else expr.otherwise
+            return evaluate(branch, values)
+
+
+def test_preview_conditions_follow_graph(profile):
+    payload = profile.payload
+    rng = random.Random(0)
+    for idx in payload.ops_to_reverse:
+        root = payload.operation_nodes.find_operation_node_by_offset(
+            payload.op_table[idx]
+        )
+        root = reduce_graph(root)
+        if not isinstance(root, NonTerminalNode):
+            continue
+        conditions = preview_conditions(root)
+        for _ in range(50):
+            values = {}
+            node = root
+            while isinstance(node, NonTerminalNode):
+                atom = atom_id(node.filter_id, node.argument_id)
+                value = values.setdefault(atom, rng.random() < 0.5)
+                node = node.match if value else node.unmatch
+            for offset, expr in conditions.items():
+                assert evaluate(expr, values) == (offset == node.offset)
+
+
+def test_refinement_replaces_preview(profile, tmp_path, capsys):
+    path = tmp_path / "profile.sb"
+    with PreviewDocument(path) as preview:
+        run_profile(profile, preview=preview)
+    out = capsys.readouterr().out
+
+    text = path.read_text()
+    assert text.startswith("; 0 of ")
+    body = [line for line in text.splitlines() if not line.startswith(";")]
+    assert body == [line for line in out.splitlines() if line != "*" * 10]
+
+
+def test_interrupted_refinement_keeps_preview(profile, tmp_path, monkeypatch):
+    original = bool_expressions._process_graph_from_node
+    calls = []
+
+    def process(*args, **kwargs):
+        if calls:
+            raise KeyboardInterrupt
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(bool_expressions, "_process_graph_from_node", process)
+    with pytest.raises(KeyboardInterrupt):
+        with PreviewDocument(tmp_path / "profile.sb") as preview:
+            run_profile(profile, preview=preview)
+
+    text = (tmp_path / "profile.sb").read_text()
+    assert preview.pending == list(preview.sections)[1:]
+    assert text.count(": refined\n") == 1
+    assert text.count(": preview\n") == len(preview.pending)
+
+
+@pytest.mark.parametrize("every, writes", [(1, 5), (3, 3), (16, 2)])
+def test_refinements_are_batched(profile, tmp_path, monkeypatch, every, writes):
+    calls = []
+    monkeypatch.setattr(previews, "write_atomic", lambda *args: calls.append(args))
+    with PreviewDocument(tmp_path / "profile.sb", every, float("inf")) as preview:
+        run_profile(profile, preview=preview)
+    # The preview pass, one write per batch and the final flush.
+    assert len(calls) == writes
+    assert not preview.pending
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+from sandblaster.parsers.analysis.ir import TRUE, And, Atom, Not, Or, atom_id
+from sandblaster.parsers.analysis.spbl_printer import CHILD_INDENT, render_sbpl
+
+X = [Atom(atom_id(1, i)) for i in range(32)]
+MAPPING = {
+    x.id: SimpleNamespace(filter="literal", argument=[f"/p{i}"])
+    for i, x in enumerate(X)
+}
+
+
+@pytest.mark.parametrize(
+    "expr, expected",
+    [
+        (TRUE, ["allow"]),
+        (
+            And(X[0], Not(X[1])),
+            [
+                "(require-all",
+                '  (literal "/p0")',
+                "  (require-not",
+                '    (literal "/p1")',
+                "  )",
+                ")",
+            ],
+        ),
+    ],
+)
+def test_render_tree(expr, expected):
+    assert render_sbpl(expr, MAPPING) == ([], expected)
+
+
+def test_shared_subterms_are_defined_once():
+    expr = X[0]
+    for i in range(1, 24):
+        expr = Or(And(X[i], expr), And(Not(X[i]), expr))
+
+    definitions, body = render_sbpl(expr, MAPPING, "file-read-data-3")
+    assert definitions[0] == "(define file-read-data-3-0"
+    assert len(definitions) == 22 * 14
+    assert body[3] == body[9] == "    file-read-data-3-21"
+
+
+def test_small_shared_subterms_are_defined():
+    shared = And(X[0], X[1])
+    definitions, body = render_sbpl(Or(Not(shared), shared), MAPPING, "op-1")
+    assert definitions == [
+        "(define op-1-0",
+        "  (require-all",
+        '    (literal "/p0")',
+        '    (literal "/p1")',
+        "  )",
+        ")",
+    ]
+    assert body == [
+        "(require-any",
+        "  (require-not",
+        "    op-1-0",
+        "  )",
+        "  op-1-0",
+        ")",
+    ]
+
+
+def test_deep_nesting_is_indented_per_level():
+    depth = 2000
+    atoms = [Atom(atom_id(1, i)) for i in range(depth + 1)]
+    mapping = {
+        x.id: SimpleNamespace(filter="literal", argument=[f"/p{i}"])
+        for i, x in enumerate(atoms)
+    }
+    expr = atoms[0]
+    for i in range(1, depth + 1):
+        expr = (And if i % 2 else Or)(atoms[i], expr)
+
+    definitions, body = render_sbpl(expr, mapping)
+    assert definitions == []
+    assert len(body) == 3 * depth + 1
+    assert body[2 * depth] == CHILD_INDENT * depth + '(literal "/p0")'
+    assert body[2 * depth + 1] == CHILD_INDENT * (depth - 1) + ")"
@@ -0,0 +1,124 @@
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from sandblaster.cli import query
+from sandblaster.filters.base import FilterType
+from sandblaster.loader import load_filters
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.nodes.terminal import TerminalNode
+from sandblaster.parsers.graph.graph import NodeGraph
+from sandblaster.parsers.fsa_parser.vm import FsaProgram
+from sandblaster.query import PolicyEvaluator, build_predicate
+from sandblaster.synthetic.encoder import encode_fsa
+from sandblaster.synthetic.generator import generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+PATH, ENTITLEMENT_BOOL = 1, 31
+
+
+class StubResolver:
+    global_vars = ["home", "bundle_path"]
+    arguments = {(ENTITLEMENT_BOOL, 1): ("%entitlement-boolean", "#t")}
+    patterns = {
+        0: [[("var", 0), "/Library"], ["/tmp/", ("range", [(0x61, 0x7A)]), "x"]],
+        2: [[("var", 1), "/x"]],
+    }
+
+    def __init__(self):
+        self.filters, _ = load_filters()
+
+    def resolve(self, filter_id, argument_id):
+        return self.arguments[(filter_id, argument_id)]
+
+    def pattern_program(self, argument_id):
+        return FsaProgram.from_bytecode(encode_fsa(self.patterns[argument_id]))
+
+
+def nonterminal(offset, filter_id, argument_id, match, unmatch):
+    raw = bytes([0, filter_id, argument_id, 0, match, 0, unmatch, 0])
+    return NonTerminalNode(offset, raw)
+
+
+@pytest.fixture(scope="module")
+def evaluator():
+    nodes = {
+        0: nonterminal(0, PATH, 0, 1, 4),
+        1: nonterminal(1, ENTITLEMENT_BOOL, 1, 2, 3),
+        2: TerminalNode(2, bytes(8)),
+        3: TerminalNode(3, bytes([1, 1, 0, 0, 0, 0, 0, 0])),
+        4: nonterminal(4, PATH, 2, 2, 3),
+    }
+    graph = NodeGraph(nodes)
+    graph.link()
+    payload = SimpleNamespace(
+        sb_ops=["default", "file-read-data"], op_table=[3, 0], operation_nodes=graph
+    )
+    return PolicyEvaluator(payload, StubResolver(), {"home": "/Users/me"})
+
+
+@pytest.mark.parametrize(
+    "attributes, action, path",
+    [
+        (
+            {"path": "/Users/me/Library/Prefs", "%entitlement-boolean": True},
+            "allow",
+            [0, 1],
+        ),
+        ({"path": "/tmp/bx/y", "%entitlement-boolean": True}, "allow", [0, 1]),
+        ({"path": "/tmp/bcx", "%entitlement-boolean": True}, "deny", [0, 4]),
+        ({"path": "/Users/me/Library"}, "deny", [0, 1]),
+        ({"path": "/Users/me/Libraryx", "%entitlement-boolean": True}, "deny", [0, 4]),
+        ({}, "deny", [0, 4]),
+    ],
+)
+def test_evaluate(evaluator, attributes, action, path):
+    decision = evaluator.evaluate("file-read-data", attributes)
+    assert (decision.action, decision.path) == (action, path)
+
+
+def test_default_operation_and_unknown_variables(evaluator):
+    assert evaluator.evaluate("default", {}).terminal == 3
+    assert evaluator.evaluate("file-read-data", {"path": "/x"}).action == "deny"
+
+
+@pytest.mark.parametrize(
+    "arg_type, argument, value, matched",
+    [
+        (FilterType.SB_VALUE_TYPE_BOOL, "#t", "#t", True),
+        (FilterType.SB_VALUE_TYPE_BOOL, "#t", "false", False),
+        (FilterType.SB_VALUE_TYPE_BOOL, "#f", "#f", True),
+        (FilterType.SB_VALUE_TYPE_BOOL, "#f", "0", True),
+        (FilterType.SB_VALUE_TYPE_BOOL, "#f", "maybe", False),
+        (FilterType.SB_VALUE_TYPE_BITFIELD, 0x6, "0x7", True),
+        (FilterType.SB_VALUE_TYPE_BITFIELD, 0x6, 4, False),
+        (FilterType.SB_VALUE_TYPE_BITFIELD, 0x6, "rw", False),
+    ],
+)
+def test_predicate_values(arg_type, argument, value, matched):
+    predicate = build_predicate("x", argument, arg_type)
+    assert predicate({"x": value}) is matched
+
+
+def test_batch_reports_unknown_operations(tmp_path, monkeypatch, capsys):
+    synthetic = generate_profile(nodes=20, operations=2)
+
+    @contextmanager
+    def synthetic_loader(path, operations):
+        yield read_profile(synthetic.encoded, operations)
+
+    monkeypatch.setattr(query, "open_profile", synthetic_loader)
+    (tmp_path / "operations").write_text("\n".join(synthetic.operations) + "\n")
+    requests = [{"operation": "no-such-op"}, {"operation": synthetic.operations[1]}]
+    (tmp_path / "batch").write_text("".join(json.dumps(r) + "\n" for r in requests))
+
+    argv = ["profile", "--operations", str(tmp_path / "operations")]
+    assert query.main(argv + ["--batch", str(tmp_path / "batch")]) == 0
+    first, second = map(json.loads, capsys.readouterr().out.splitlines())
+    assert first == {
+        "operation": "no-such-op",
+        "error": "Unknown operation: no-such-op",
+    }
+    assert second["operation"] == synthetic.operations[1]
@@ -0,0 +1,71 @@
+import itertools
+import random
+
+import pytest
+
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.nodes.terminal import TerminalNode
+from sandblaster.parsers.graph.graph import NodeGraph
+from sandblaster.parsers.graph.reduction import reduce_graph, topological_order
+
+ALLOW, DENY = "allow", "deny"
+
+
+def build_graph(spec):
+    nodes = {}
+    for offset, entry in spec.items():
+        if entry in (ALLOW, DENY):
+            raw = bytes([1, int(entry == DENY), 0, 0, 0, 0, 0, 0])
+            nodes[offset] = TerminalNode(offset, raw)
+        else:
+            arg, match, unmatch = entry
+            raw = bytes([0, 1, arg, 0, match, 0, unmatch, 0])
+            nodes[offset] = NonTerminalNode(offset, raw)
+    graph = NodeGraph(nodes)
+    graph.link()
+    return graph.nodes[0]
+
+
+def random_spec(seed, nodes=14, atoms=4):
+    rng = random.Random(seed)
+    spec = {nodes: ALLOW, nodes + 1: DENY, nodes + 2: ALLOW}
+    for n in range(nodes):
+        spec[n] = (
+            rng.randrange(atoms),
+            rng.randrange(n + 1, nodes + 3),
+            rng.randrange(n + 1, nodes + 3),
+        )
+    return spec
+
+
+def evaluate(node, assignment):
+    while isinstance(node, NonTerminalNode):
+        value = assignment[node.argument_id]
+        node = node.match if value else node.unmatch
+    return node.raw[1:]
+
+
+@pytest.mark.parametrize(
+    "spec, remaining",
+    [
+        # repeated test of the same atom on the match branch
+        ({0: (1, 1, 3), 1: (1, 2, 4), 2: ALLOW, 3: DENY, 4: DENY}, 3),
+        # both branches end in equivalent terminals
+        ({0: (1, 1, 3), 1: (2, 2, 4), 2: ALLOW, 3: DENY, 4: ALLOW}, 3),
+        # two identical tests are shared
+        (
+            {0: (1, 1, 2), 1: (2, 3, 4), 2: (3, 5, 4), 3: ALLOW, 4: DENY, 5: (2, 3, 4)},
+            5,
+        ),
+    ],
+)
+def test_reduce_graph(spec, remaining):
+    assert len(topological_order(reduce_graph(build_graph(spec)))) == remaining
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_reduced_graph_is_equivalent(seed):
+    root = build_graph(random_spec(seed))
+    reduced = reduce_graph(root)
+    for values in itertools.product((False, True), repeat=4):
+        assert evaluate(root, values) == evaluate(reduced, values)
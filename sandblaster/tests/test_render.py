@@ -0,0 +1,64 @@
+import json
+from importlib.resources import files
+
+import pytest
+
+from sandblaster.export import open_exporter
+from sandblaster.loader import load_filters
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.render import read_records, render_records
+from sandblaster.synthetic.reader import read_profile
+from sandblaster.tests.conftest import run_profile
+
+SYNTHETIC = {"nodes": 80, "atoms": 12, "operations": 4, "seed": 13}
+pytestmark = pytest.mark.parametrize(
+    "synthetic",
+    [{"policies": 0}, {"policies": 2}],
+    ids=["plain", "policies"],
+    indirect=True,
+)
+
+
+def decompile(synthetic, path, export_format, capsys):
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    with open_exporter(str(path), export_format) as exporter:
+        run_profile(profile, exporter=exporter)
+    return capsys.readouterr().out
+
+
+def render(synthetic, path, metadata=None) -> str:
+    lines = []
+    profile = read_profile(synthetic.encoded, synthetic.operations, metadata=metadata)
+    render_records(read_records(str(path)), profile, lines.append)
+    return "".join(f"{line}\n" for line in lines)
+
+
+@pytest.mark.parametrize("export_format", ["sbir", "jsonl"])
+def test_render_matches_run(synthetic, tmp_path, capsys, export_format):
+    path = tmp_path / f"profile.{export_format}"
+    expected = decompile(synthetic, path, export_format, capsys)
+    assert render(synthetic, path) == expected
+    for index in range(synthetic.encoded.header["policies_count"]):
+        assert f"(define-policy policy-{index}\n" in expected
+
+
+def test_render_applies_new_metadata(synthetic, tmp_path, capsys, monkeypatch):
+    monkeypatch.setenv("SANDBLASTER_CACHE_DIR", str(tmp_path))
+    path = tmp_path / "profile.sbir"
+    expected = decompile(synthetic, path, "sbir", capsys)
+
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    filter_id = next(
+        node.filter_id
+        for node in profile.payload.operation_nodes.nodes.values()
+        if isinstance(node, NonTerminalNode)
+    )
+    table = json.loads((files("sandblaster.misc") / "filters.json").read_text())
+    old = table[str(filter_id)]["name"]
+    table[str(filter_id)]["name"] = "renamed-filter"
+    filters_path = tmp_path / "filters.json"
+    filters_path.write_text(json.dumps(table))
+
+    rendered = render(synthetic, path, load_filters(str(filters_path)))
+    assert "(renamed-filter " in rendered
+    assert rendered == expected.replace(f"({old} ", "(renamed-filter ")
@@ -0,0 +1,61 @@
+from functools import cache
+
+import pytest
+
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.scan import scan_payload
+from sandblaster.synthetic.generator import SHAPES, generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+
+def count_paths(root):
+    @cache
+    def paths(offset):
+        node = nodes[offset]
+        if not isinstance(node, NonTerminalNode):
+            return 1
+        return paths(node.match.offset) + paths(node.unmatch.offset)
+
+    nodes = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.offset not in nodes:
+            nodes[node.offset] = node
+            if isinstance(node, NonTerminalNode):
+                stack += [node.match, node.unmatch]
+    return paths(root.offset)
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_scan_matches_brute_force(shape):
+    synthetic = generate_profile(nodes=40, atoms=10, operations=3, shape=shape)
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    payload = profile.payload
+    scan = scan_payload(payload, profile.filter_resolver.filters)
+
+    reached = {}
+    for op in scan.operations:
+        idx = payload.sb_ops.index(op.operation)
+        root = payload.operation_nodes.nodes[payload.op_table[idx]]
+        seen, stack = {}, [root]
+        while stack:
+            node = stack.pop()
+            if node.offset not in seen:
+                seen[node.offset] = node
+                if isinstance(node, NonTerminalNode):
+                    stack += [node.match, node.unmatch]
+        tests = [n for n in seen.values() if isinstance(n, NonTerminalNode)]
+        reached[root.offset] = {n.offset for n in tests}
+        assert op.nodes == len(tests)
+        assert op.sinks == len(seen) - len(tests)
+        assert op.atoms == len({(n.filter_id, n.argument_id) for n in tests})
+        assert op.paths == count_paths(root)
+
+    users = [o for offsets in reached.values() for o in offsets]
+    assert scan.reachable == len(set(users))
+    assert scan.shared == len({o for o in users if users.count(o) > 1})
+    assert sum(scan.filters.values()) == sum(
+        isinstance(n, NonTerminalNode) for n in payload.operation_nodes.nodes.values()
+    )
+    assert scan.global_vars == len(payload.global_vars)
@@ -0,0 +1,143 @@
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from sandblaster.server import DecompileServer, ProfileCache, send_request
+from sandblaster.synthetic.generator import generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+
+# Generated on first use, once the test cache directory is in place.
+@functools.cache
+def profiles():
+    return {
+        name: generate_profile(nodes=30, atoms=6, seed=seed)
+        for seed, name in enumerate(["a.sb", "b.sb", "c.sb"])
+    }
+
+
+@pytest.fixture
+def files(tmp_path):
+    ops = tmp_path / "ops"
+    ops.write_text("\n".join(profiles()["a.sb"].operations))
+    paths = {}
+    for name, profile in profiles().items():
+        paths[name] = tmp_path / name
+        paths[name].write_bytes(profile.data)
+    return {name: str(path) for name, path in paths.items()}, str(ops)
+
+
+@contextmanager
+def synthetic_loader(path, operations):
+    name = path.rsplit("/", 1)[-1]
+    yield read_profile(profiles()[name].encoded, operations)
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = DecompileServer(str(tmp_path / "s.sock"), 2, 2, synthetic_loader)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.run_until_complete(server.close())
+    loop.close()
+
+
+def test_cache_evicts_least_recently_used(files):
+    paths, ops = files
+    cache = ProfileCache(2, synthetic_loader)
+    for name in ["a.sb", "b.sb", "a.sb", "c.sb"]:
+        with cache.use((paths[name], ops)):
+            pass
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert [key[0].rsplit("/", 1)[-1] for key in cache.entries] == ["a.sb", "c.sb"]
+
+
+def test_requests(server, files):
+    paths, ops = files
+    op = profiles()["a.sb"].operations[0]
+    base = {"profile": paths["a.sb"], "operations": ops}
+
+    query = send_request(
+        server.socket_path, {"id": 1, "command": "query", "operation": op, **base}
+    )
+    assert query["ok"] and query["result"]["decisions"][0]["operation"] == op
+
+    decompiled = send_request(
+        server.socket_path,
+        {"id": 2, "command": "decompile", "filter": [op], **base},
+    )
+    (operation,) = decompiled["result"]["operations"]
+    assert operation["operation"] == op and operation["sbpl"]
+
+    diff = send_request(
+        server.socket_path,
+        {
+            "id": 3,
+            "command": "diff",
+            "profile_a": paths["a.sb"],
+            "profile_b": paths["a.sb"],
+            "operations": ops,
+        },
+    )
+    assert {r["status"] for r in diff["result"]["results"]} == {"equal"}
+
+    stats = send_request(server.socket_path, {"command": "stats"})["result"]
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+    error = send_request(server.socket_path, {"id": 4, "command": "nope"})
+    assert not error["ok"]
+
+
+def test_cache_loads_outside_the_global_lock(files):
+    paths, ops = files
+    started, finish, loads = threading.Event(), threading.Event(), []
+
+    @contextmanager
+    def slow_loader(path, operations):
+        loads.append(path)
+        if path == paths["a.sb"]:
+            started.set()
+            assert finish.wait(5)
+        with synthetic_loader(path, operations) as profile:
+            yield profile
+
+    cache = ProfileCache(4, slow_loader)
+
+    def use_a():
+        with cache.use((paths["a.sb"], ops)) as (entry,):
+            assert entry.profile is not None
+
+    threads = [threading.Thread(target=use_a) for _ in range(2)]
+    threads[0].start()
+    assert started.wait(5)
+    threads[1].start()
+    with cache.use((paths["b.sb"], ops)):
+        pass
+    finish.set()
+    for thread in threads:
+        thread.join()
+    assert loads.count(paths["a.sb"]) == 1
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_failed_load_is_not_cached(files):
+    paths, ops = files
+
+    @contextmanager
+    def broken_loader(path, operations):
+        raise ValueError("bad profile")
+        yield
+
+    cache = ProfileCache(2, broken_loader)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            with cache.use((paths["a.sb"], ops)):
+                pass
+    assert (cache.misses, len(cache.entries)) == (2, 0)
@@ -0,0 +1,110 @@
+import io
+import logging
+
+import pytest
+
+from sandblaster import snapshot as snapshots
+from sandblaster.loader import load_filters, open_profile
+from sandblaster.nodes.non_terminal import NonTerminalNode
+from sandblaster.snapshot import (
+    Snapshot,
+    blob_digest,
+    load_snapshot,
+    snapshot_path,
+    write_snapshot,
+)
+from sandblaster.synthetic.reader import read_profile
+
+SYNTHETIC = {"nodes": 80, "atoms": 16, "operations": 4, "seed": 11}
+
+
+def graph_atoms(nodes):
+    return sorted(
+        {
+            (node.filter_id, node.argument_id)
+            for node in nodes.nodes.values()
+            if isinstance(node, NonTerminalNode)
+        }
+    )
+
+
+def write_partial_snapshot(synthetic, path):
+    original = read_profile(synthetic.encoded, synthetic.operations)
+    keys = graph_atoms(original.payload.operation_nodes)
+    for key in keys[::2]:
+        original.filter_resolver.resolve(*key)
+    base_addr = synthetic.encoded.layout.base_addr
+    write_snapshot(path, original, base_addr, original.filter_resolver.recorded)
+    return original, keys
+
+
+@pytest.mark.parametrize("operation_filter", [None, 1])
+def test_snapshot_round_trip(synthetic, tmp_path, operation_filter):
+    path = tmp_path / "profile.sbsnap"
+    original, keys = write_partial_snapshot(synthetic, path)
+
+    if operation_filter is not None:
+        operation_filter = synthetic.operations[operation_filter:]
+    snapshot = Snapshot(path)
+    try:
+        filters, modifiers = load_filters()
+        loaded = load_snapshot(
+            snapshot,
+            io.BytesIO(synthetic.data),
+            synthetic.operations,
+            operation_filter,
+            filters,
+            modifiers,
+        )
+        expected = read_profile(
+            synthetic.encoded, synthetic.operations, operation_filter
+        ).payload
+        payload = loaded.payload
+        assert payload.ops_to_reverse == expected.ops_to_reverse
+        assert payload.op_table == expected.op_table
+        assert payload.policies == expected.policies
+        assert payload.global_vars == expected.global_vars
+        assert payload.regex_list == list(expected.regex_list)
+        assert {o: n.raw for o, n in payload.operation_nodes.nodes.items()} == {
+            o: n.raw for o, n in expected.operation_nodes.nodes.items()
+        }
+        assert set(snapshot.atoms()) == set(keys[::2])
+        for key in keys:
+            expected = original.filter_resolver.resolve(*key)
+            assert snapshot.get(key) == (expected if key in keys[::2] else None)
+            assert loaded.filter_resolver.resolve(*key) == expected
+        assert set(loaded.filter_resolver.recorded) == set(keys[1::2])
+    finally:
+        snapshot.close()
+
+
+def test_open_profile_extends_snapshot(synthetic, tmp_path, monkeypatch, caplog):
+    blob = tmp_path / "profile.sb"
+    blob.write_bytes(synthetic.data)
+    path = snapshot_path(blob_digest(synthetic.data), load_filters()[0].digest)
+    _, keys = write_partial_snapshot(synthetic, path)
+
+    with open_profile(str(blob), synthetic.operations) as profile:
+        for key in keys:
+            profile.filter_resolver.resolve(*key)
+    snapshot = Snapshot(path)
+    try:
+        assert set(snapshot.atoms()) == set(keys)
+    finally:
+        snapshot.close()
+
+    def broken(*args):
+        raise ValueError("unencodable")
+
+    monkeypatch.setattr(snapshots, "write_snapshot", broken)
+    with caplog.at_level(logging.WARNING):
+        with open_profile(str(blob), synthetic.operations) as profile:
+            profile.filter_resolver.recorded[(0xFFFF, 0)] = (None, None)
+    assert "Could not write snapshot" in caplog.text
+
+
+def test_rejects_other_versions(tmp_path):
+    path = tmp_path / "bad.sbsnap"
+    path.write_bytes(b"SBIR" + bytes(16))
+    with pytest.raises(ValueError):
+        Snapshot(path)
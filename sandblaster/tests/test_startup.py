@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import sandblaster
+from sandblaster.configs.filters import Filters, cache_dir
+
+HEAVY_MODULES = {"z3", "networkx", "automata", "construct", "pydot"}
+ROOT = os.path.dirname(os.path.dirname(sandblaster.__file__))
+
+
+def import_times(*args):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "sandblaster", *args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": ROOT},
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:") :].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1000
+    return result.returncode, times
+
+
+@pytest.mark.parametrize("args", [["--help"], ["query", "--help"], ["scan", "--help"]])
+def test_help_skips_heavy_imports(args):
+    returncode, times = import_times(*args)
+    assert returncode == 0
+    assert not HEAVY_MODULES & {name.split(".")[0] for name in times}
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        b"corrupt",
+        b"\x80\x04\x95",  # truncated
+        b"cbuiltins\nno_such_name\n.",  # AttributeError
+        b"cno_such_module\nname\n.",  # ImportError
+    ],
+)
+def test_filters_table_cache(tmp_path, monkeypatch, corrupt):
+    source = tmp_path / "filters.json"
+    source.write_text('{"1": {"name": "path"}}')
+    monkeypatch.setenv("SANDBLASTER_CACHE_DIR", str(tmp_path / "cache"))
+
+    assert Filters(str(source)).get(1) == {"name": "path"}
+    (cached,) = cache_dir().iterdir()
+    cached.write_bytes(corrupt)
+    assert Filters(str(source)).get(1) == {"name": "path"}
+
+    source.write_text('{"2": {"name": "subpath"}}')
+    assert not Filters(str(source)).exists(1)
+    assert len(list(cache_dir().iterdir())) == 2
@@ -0,0 +1,56 @@
+import pytest
+
+from sandblaster.nodes.terminal import TerminalNode
+from sandblaster.parsers.fsa_parser.processor import parse_fsm_string
+from sandblaster.parsers.regex_parser.processor import analyze
+from sandblaster.synthetic.encoder import encode_fsa, encode_regex
+from sandblaster.synthetic.generator import SHAPES, generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+FSA_CASES = [
+    ([["/aaa"]], ["/aaa"]),
+    ([["/aaa"], ["/bbb"]], ["/aaa", "/bbb"]),
+    (
+        [[("var", 1), "/Library"], ["/tmp", ("range", [(0x30, 0x39)])]],
+        ["${B}/Library", "/tmp[0-9]"],
+    ),
+    ([["/x" * 100, "/y" * 100], ["/z"]], ["/x" * 100 + "/y" * 100, "/z"]),
+]
+
+REGEX_CASES = [
+    (["^", "/a/b"], "^/a/b"),
+    (["^", "/a/", ("class*", [(0x61, 0x7A)]), "x"], "^/a/[a-z]*x"),
+    (["^", "/", ("class", [(0x61, 0x7A), (0x30, 0x39)]), "$"], "^/[0-9a-z]"),
+]
+
+
+@pytest.mark.parametrize("alternatives,expected", FSA_CASES)
+def test_encode_fsa(alternatives, expected):
+    assert parse_fsm_string(encode_fsa(alternatives), ["a", "b"]) == expected
+
+
+@pytest.mark.parametrize("tokens,expected", REGEX_CASES)
+def test_encode_regex(tokens, expected):
+    assert analyze(encode_regex(tokens)) == expected
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("complexity", [1, 4])
+def test_profile_round_trip(shape, complexity):
+    profile = generate_profile(
+        nodes=40, atoms=12, shape=shape, pattern_complexity=complexity, seed=7
+    )
+    loaded = read_profile(profile.encoded, profile.operations)
+    payload = loaded.payload
+
+    assert len(payload.op_table) == len(profile.operations)
+    assert payload.global_vars[0] == "home"
+    for offset, node in payload.operation_nodes.nodes.items():
+        start = profile.encoded.layout.operation_nodes_offset + offset * 8
+        assert node.raw == profile.data[start : start + 8]
+        if not isinstance(node, TerminalNode):
+            assert node.match.offset == node.match_offset
+            assert node.match_offset > offset and node.unmatch_offset > offset
+    for atom in profile.atoms:
+        _, argument = loaded.filter_resolver.resolve(*atom)
+        assert argument == profile.expected_arguments[atom]
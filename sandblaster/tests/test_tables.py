@@ -0,0 +1,63 @@
+import io
+import mmap
+
+import pytest
+from construct import Bytes, Int16ul, Struct, this
+
+from sandblaster.parsers.regex_parser.processor import analyze
+from sandblaster.parsers.specialized.globals_parser import GlobalVarsParser
+from sandblaster.parsers.specialized.regex_parser import RegexListParser
+from sandblaster.synthetic.encoder import encode_regex
+
+# construct-based reference decoders for the bulk table readers.
+GlobalVarEntry = Struct("strlen" / Int16ul, "name" / Bytes(this.strlen - 1))
+RegexEntry = Struct("length" / Int16ul, "data" / Bytes(this.length))
+
+
+def reference_table(infile, base_addr, count, offset, entry):
+    entries = []
+    for i in range(count):
+        infile.seek(offset + i * 2)
+        index = Int16ul.parse_stream(infile)
+        infile.seek(base_addr + index * 8)
+        entries.append(entry.parse_stream(infile))
+    return entries
+
+
+def string_table(records):
+    offsets, body = [], bytearray()
+    for record in records:
+        offsets.append(len(body) // 8)
+        body += len(record).to_bytes(2, "little") + record
+        body += bytes(-len(body) % 8)
+    table = b"".join(o.to_bytes(2, "little") for o in offsets)
+    base_addr = len(table) + -len(table) % 8
+    return table.ljust(base_addr, b"\0") + body, base_addr
+
+
+@pytest.mark.parametrize("count", [0, 1, 4_000])
+def test_global_vars_match_reference(count, tmp_path):
+    names = [f"var_{i}_é".encode() + b"\0" for i in range(count)]
+    data, base_addr = string_table(names)
+    path = tmp_path / "table"
+    path.write_bytes(data or b"\0")
+
+    expected = [
+        e.name.decode("utf-8", errors="replace")
+        for e in reference_table(io.BytesIO(data), base_addr, count, 0, GlobalVarEntry)
+    ]
+    assert GlobalVarsParser.parse(io.BytesIO(data), base_addr, count, 0) == expected
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assert GlobalVarsParser.parse(mm, base_addr, count, 0) == expected
+
+
+def test_regex_list_matches_reference():
+    bytecodes = [encode_regex(["^", f"/a{i}"]) for i in range(3)]
+    data, base_addr = string_table(bytecodes)
+
+    reference = reference_table(io.BytesIO(data), base_addr, 3, 0, RegexEntry)
+    regex_list = RegexListParser.parse(io.BytesIO(data), base_addr, 3, 0)
+    assert regex_list.bytecodes == [e.data for e in reference]
+    assert regex_list._analyzed == {}
+    assert regex_list[-1] == analyze(bytecodes[2])
+    assert list(regex_list) == [analyze(b) for b in bytecodes]
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from sandblaster.filters.terminal_resolver import TerminalResolver
+from sandblaster.loader import load_filters
+from sandblaster.nodes.terminal import TerminalNode
+from sandblaster.synthetic.generator import TERMINAL_FLAGS, generate_profile
+from sandblaster.synthetic.reader import read_profile
+
+
+@pytest.fixture(scope="module")
+def modifiers():
+    return load_filters()[1]
+
+
+def brute_force(modifiers, flags):
+    action = 1 if flags & 1 else 2
+    return [
+        m
+        for m in modifiers._filters.values()
+        if m["action_mask"]
+        and flags & m["action_mask"] == m["action_flag"]
+        and m["action"] & action
+    ]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_modifiers_by_flag_match_linear_scan(modifiers, seed):
+    rng = random.Random(seed)
+    resolver = TerminalResolver(modifiers, TERMINAL_FLAGS)
+    words = [*TERMINAL_FLAGS, 0x1, 0x5, 0x181, 0xFFF, 0xFFE]
+    words += [rng.getrandbits(12) for _ in range(200)]
+    for flags in words:
+        assert resolver.get_modifiers_by_flag(flags) == brute_force(modifiers, flags)
+
+
+def test_terminals_render_flag_modifiers():
+    synthetic = generate_profile(nodes=60, atoms=8, operations=2, seed=3)
+    profile = read_profile(synthetic.encoded, synthetic.operations)
+    resolver = profile.terminal_resolver
+    terminals = [
+        node
+        for node in profile.payload.operation_nodes.nodes.values()
+        if isinstance(node, TerminalNode) and node.modifier_flags & 0x4
+    ]
+    assert terminals
+    for node in terminals:
+        info = resolver.describe(node, profile.modifier_resolver, profile.payload)
+        assert info is resolver.describe(node, None, None)
+        assert ("(with report)" in info.parts) == (not node.modifier_flags & 1)
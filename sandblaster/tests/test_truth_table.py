@@ -0,0 +1,55 @@
+import random
+
+import networkx as nx
+import pytest
+import z3
+
+from sandblaster.parsers.analysis.expression import build_ite_expr
+from sandblaster.parsers.analysis.ir import to_z3
+from sandblaster.parsers.analysis.truth_table import minimize, minimize_graph
+
+
+def decision_graph(edges, ids):
+    graph = nx.DiGraph()
+    for node, atom in ids.items():
+        graph.add_node(node, id=atom)
+    for source, target, result in edges:
+        graph.add_edge(source, target, result=result)
+    return graph
+
+
+def random_graph(seed, nodes=12, atoms=5):
+    rng = random.Random(seed)
+    ids = {n: (1, rng.randrange(atoms)) for n in range(nodes)}
+    ids[nodes] = (0, 0)
+    edges = []
+    for n in range(nodes):
+        for result in (1, 0):
+            if rng.random() < 0.85:
+                edges.append((n, rng.randrange(n + 1, nodes + 1), result))
+    graph = decision_graph(edges, ids)
+    return graph.subgraph(nx.ancestors(graph, nodes) | {nodes}).copy()
+
+
+@pytest.mark.parametrize(
+    "on, count, expected",
+    [
+        (0b1000, 2, [{0: True, 1: True}]),
+        (0b1110, 2, [{0: True}, {1: True}]),
+        (0b0110, 2, [{0: True, 1: False}, {0: False, 1: True}]),
+        (0b11111010, 3, [{0: True}, {2: True}]),
+    ],
+)
+def test_minimize(on, count, expected):
+    assert minimize(on, count) == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_minimized_graph_is_equivalent(seed):
+    graph = random_graph(seed)
+    reference = z3.Or(
+        *[build_ite_expr(graph, n) for n, deg in graph.in_degree() if deg == 0]
+    )
+    solver = z3.Solver()
+    solver.add(reference != to_z3(minimize_graph(graph)))
+    assert solver.check() == z3.unsat